@@ -68,7 +68,8 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    'django.middleware.locale.LocaleMiddleware'
+    'django.middleware.locale.LocaleMiddleware',
+    'portal.jobs.JobRequesterMiddleware',
 ]
 
 ROOT_URLCONF = "gatherflow.urls"
@@ -97,9 +98,33 @@ DATABASES = {
         'PASSWORD': env('DB_PASSWORD'),
         'HOST': env('DB_HOST'),
         'PORT': env('DB_PORT'),
+        # Keep connections open between requests (seconds; 0 closes after each
+        # request) and ping them before reuse so a restarted server isn't an error.
+        'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=60),
+        'CONN_HEALTH_CHECKS': env.bool('DB_CONN_HEALTH_CHECKS', default=True),
+        # Behind PgBouncer in transaction mode a named cursor can't outlive its
+        # transaction, so ?stream= dumps fall back to client-side cursors.
+        'DISABLE_SERVER_SIDE_CURSORS': env.bool('DB_PGBOUNCER', default=False),
+        'OPTIONS': {},
     }
 }
 
+# psycopg 3 connection pool, one per worker process. Preferred under ASGI,
+# where persistent connections are not reused across requests. Django
+# requires CONN_MAX_AGE = 0 when pooling; the pool keeps connections warm instead.
+if env.bool('DB_POOL', default=False):
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+        'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+        # Seconds a request waits for a free connection before failing
+        'timeout': env.float('DB_POOL_TIMEOUT', default=10.0),
+        # Idle connections above min_size are closed after this many seconds
+        'max_idle': env.float('DB_POOL_MAX_IDLE', default=300.0),
+        'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=3600.0),
+    }
+
+
 WSGI_APPLICATION = "gatherflow.wsgi.application"
 X_FRAME_OPTIONS = "SAMEORIGIN"
 SILENCED_SYSTEM_CHECKS = ["security.W019"]
@@ -149,3 +174,121 @@ STATIC_URL = "static/"
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
+
+# Keyset pagination for the portal list endpoints
+PORTAL_PAGE_SIZE = env.int('PORTAL_PAGE_SIZE', default=100)
+PORTAL_MAX_PAGE_SIZE = env.int('PORTAL_MAX_PAGE_SIZE', default=1000)
+# Rows fetched per server-side cursor round trip for ?stream= dumps
+PORTAL_STREAM_CHUNK_SIZE = env.int('PORTAL_STREAM_CHUNK_SIZE', default=2000)
+
+# External farmer registry API
+FARMER_API_URL = env('FARMER_API_URL', default='https://example.com/api/farmer_details/')
+FARMER_API_CONNECT_TIMEOUT = env.float('FARMER_API_CONNECT_TIMEOUT', default=3.0)
+FARMER_API_READ_TIMEOUT = env.float('FARMER_API_READ_TIMEOUT', default=10.0)
+FARMER_API_POOL_SIZE = env.int('FARMER_API_POOL_SIZE', default=10)
+FARMER_API_CACHE_TTL = env.int('FARMER_API_CACHE_TTL', default=3600)
+FARMER_API_NEGATIVE_CACHE_TTL = env.int('FARMER_API_NEGATIVE_CACHE_TTL', default=60)
+FARMER_API_CACHE_SIZE = env.int('FARMER_API_CACHE_SIZE', default=2048)
+# Name of a CACHES alias (e.g. a shared Redis/Memcached cache) to use as a
+# second tier behind the in-process cache. Leave unset for in-process only.
+FARMER_API_CACHE_ALIAS = env('FARMER_API_CACHE_ALIAS', default=None)
+# Local mirror of the farmer registry (manage.py sync_farmer_registry)
+FARMER_REGISTRY_URL = env('FARMER_REGISTRY_URL', default='https://example.com/api/farmers/')
+FARMER_REGISTRY_PAGE_SIZE = env.int('FARMER_REGISTRY_PAGE_SIZE', default=1000)
+FARMER_REGISTRY_MIRROR = env.bool('FARMER_REGISTRY_MIRROR', default=True)
+
+# Offline tablet sync (portal/sync.py)
+SYNC_PULL_LIMIT = env.int('SYNC_PULL_LIMIT', default=500)
+# Pulls stop at the oldest open write transaction, less this lag for clock skew
+SYNC_SAFETY_LAG_SECONDS = env.int('SYNC_SAFETY_LAG_SECONDS', default=2)
+# Days tombstones are kept (manage.py purge_sync_tombstones); older tokens must resync
+SYNC_TOMBSTONE_TTL = env.int('SYNC_TOMBSTONE_TTL', default=90)
+
+# How long a stored Idempotency-Key response can be replayed (portal/idempotency.py)
+IDEMPOTENCY_KEY_TTL = env.int('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60)
+# A request still running after this long is assumed dead; a retry may run it again
+IDEMPOTENCY_IN_PROGRESS_TIMEOUT = env.int('IDEMPOTENCY_IN_PROGRESS_TIMEOUT', default=300)
+
+# Largest ?ids= batch accepted by the list endpoints (portal/batch.py)
+BATCH_MAX_IDS = env.int('BATCH_MAX_IDS', default=500)
+
+# Largest JSON array accepted by /api/bulk/<table>/ (portal/bulk.py)
+BULK_MAX_ROWS = env.int('BULK_MAX_ROWS', default=500)
+
+# Read replica for list/detail GETs and exports (portal/routers.py). Leave
+# DB_REPLICA_HOST unset to send everything to the primary.
+DATABASE_ROUTERS = ['portal.routers.ReplicaRouter']
+REPLICA_DATABASE = None
+if env('DB_REPLICA_HOST', default=None):
+    REPLICA_DATABASE = 'replica'
+    DATABASES[REPLICA_DATABASE] = {
+        **DATABASES['default'],
+        'NAME': env('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'HOST': env('DB_REPLICA_HOST'),
+        'PORT': env('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+# Seconds a client's reads stay on the primary after it writes
+REPLICA_STICKY_SECONDS = env.int('REPLICA_STICKY_SECONDS', default=10)
+
+# Child-labour classification thresholds (portal/classification.py). Run
+# manage.py reclassify_children after changing them.
+CHILD_LABOUR_MIN_LIGHT_WORK_AGE = env.int('CHILD_LABOUR_MIN_LIGHT_WORK_AGE', default=12)
+CHILD_LABOUR_MIN_WORKING_AGE = env.int('CHILD_LABOUR_MIN_WORKING_AGE', default=15)
+CHILD_LABOUR_LIGHT_WORK_MAX_HOURS = env.int('CHILD_LABOUR_LIGHT_WORK_MAX_HOURS', default=14)
+CHILD_LABOUR_MAX_HOURS = env.int('CHILD_LABOUR_MAX_HOURS', default=43)
+
+# Caches, e.g. CACHE_URL=redis://cache:6379/1. The default is per-process.
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+# ETag/Last-Modified responses for the table GETs (portal/conditional.py):
+# cache alias holding row/table versions and rendered bodies, and how long
+# bodies are kept. It must be shared by every worker; with a per-process
+# (locmem) cache nothing is cached and each GET reads its version.
+RESPONSE_CACHE_ALIAS = env('RESPONSE_CACHE_ALIAS', default='default')
+RESPONSE_CACHE_SECONDS = env.int('RESPONSE_CACHE_SECONDS', default=300)
+
+# Re-encoding of uploaded photos and signatures (portal/media.py)
+MEDIA_MAX_DIMENSION = env.int('MEDIA_MAX_DIMENSION', default=1600)
+MEDIA_JPEG_QUALITY = env.int('MEDIA_JPEG_QUALITY', default=80)
+MEDIA_THUMBNAIL_SIZE = env.int('MEDIA_THUMBNAIL_SIZE', default=320)
+
+# Resumable uploads (portal/uploads.py): where partial files are kept, the
+# largest file accepted, and how long an unfinished upload is kept
+UPLOAD_TEMP_DIR = env('UPLOAD_TEMP_DIR', default=None)
+UPLOAD_MAX_BYTES = env.int('UPLOAD_MAX_BYTES', default=50 * 1024 * 1024)
+UPLOAD_SESSION_TTL = env.int('UPLOAD_SESSION_TTL', default=24 * 60 * 60)
+# A chunk still being written after this many seconds belongs to a dead request
+UPLOAD_CLAIM_TIMEOUT = env.int('UPLOAD_CLAIM_TIMEOUT', default=300)
+
+# Opt-in: store each distinct media file once and hard-link every upload of
+# it (portal/storage.py). Needs MEDIA_ROOT on a filesystem with hard links;
+# run manage.py dedupe_media after turning it on.
+if env.bool('MEDIA_DEDUPLICATE', default=False):
+    STORAGES = {
+        'default': {'BACKEND': 'portal.storage.ContentAddressedStorage'},
+        'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    }
+
+# Background jobs (portal/jobs.py). "inline" runs them in the web process
+# right after commit; "database" queues them for manage.py run_jobs workers,
+# so only choose it once those workers are running.
+JOB_BACKEND = env('JOB_BACKEND', default='inline')
+JOB_MAX_ATTEMPTS = env.int('JOB_MAX_ATTEMPTS', default=5)
+JOB_RETRY_BASE_SECONDS = env.int('JOB_RETRY_BASE_SECONDS', default=10)
+JOB_RETRY_MAX_SECONDS = env.int('JOB_RETRY_MAX_SECONDS', default=3600)
+# A running job refreshes its lock every JOB_HEARTBEAT_SECONDS; one silent for
+# JOB_TIMEOUT_SECONDS is taken to have lost its worker
+JOB_HEARTBEAT_SECONDS = env.int('JOB_HEARTBEAT_SECONDS', default=60)
+JOB_TIMEOUT_SECONDS = env.int('JOB_TIMEOUT_SECONDS', default=600)
+# Look up farmer details for new covers in a job instead of during the save.
+# Covers are then saved before the lookup: an unknown farmer_code is no
+# longer a 400 from /api/cover/, the cover keeps blank farmer details and
+# the job fails (GET /api/jobs/?status=failed lists them).
+FARMER_DETAILS_IN_BACKGROUND = env.bool('FARMER_DETAILS_IN_BACKGROUND', default=False)
+
+# Analyst exports (portal/export.py): rows per Parquet row group / CSV block,
+# and a bearer token that lets scripts call /api/export/ without a staff login
+EXPORT_CHUNK_SIZE = env.int('EXPORT_CHUNK_SIZE', default=20000)
+EXPORT_API_TOKEN = env('EXPORT_API_TOKEN', default=None)
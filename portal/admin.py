@@ -1,6 +1,7 @@
 from django.contrib import admin
 from .models import (
     Cover_tbl,
+    FarmerRegistry,
     FarmerChild,
     ConsentLocation_tbl,
     FarmerIdentification_OwnerIdentificationTbl,
@@ -27,6 +28,7 @@ admin.site.index_title = "Child Labour Survey Administration"
 class CoverAdmin(admin.ModelAdmin):
     list_display = ('enumerator_name', 'farmer_code', 'farmer_first_name', 'farmer_surname')
     search_fields = ('enumerator_name', 'farmer_code', 'farmer_first_name', 'farmer_surname')
+    raw_id_fields = ('FarmerChild',)
 
 admin.site.register(Cover_tbl, CoverAdmin)
 admin.site.register(ConsentLocation_tbl)
@@ -38,7 +40,9 @@ admin.site.register(EndOfCollection)
 class FarmerIdentificationAdmin(admin.ModelAdmin):
     # Adjusted to reflect fields on FarmerIdentification_OwnerIdentificationTbl
     list_display = ('owner_identification', 'name_owner', 'first_name_owner')
+    list_select_related = ('owner_identification',)
     search_fields = ('name_owner', 'first_name_owner')
+    raw_id_fields = ('owner_identification',)
 
 admin.site.register(FarmerIdentification_OwnerIdentificationTbl, FarmerIdentificationAdmin)
 admin.site.register(FarmerIdentification_Info_OnVisit_tbl)
@@ -60,6 +64,8 @@ class AdultHouseholdMemberInline(admin.TabularInline):
 class AdultInHouseholdAdmin(admin.ModelAdmin):
     # Changed 'cover' to 'consent' because the model has a 'consent' field.
     list_display = ('consent', 'total_adults')
+    list_select_related = ('consent',)
+    raw_id_fields = ('consent',)
     inlines = [AdultHouseholdMemberInline]
 
 admin.site.register(ChildrenInHouseholdTbl)
@@ -76,3 +82,12 @@ admin.site.register(HouseholdSensitizationTbl)
 # Group 5: Farmer Child
 # ========================================================
 admin.site.register(FarmerChild)
+
+# ========================================================
+# Group 6: Farmer Registry Mirror
+# ========================================================
+class FarmerRegistryAdmin(admin.ModelAdmin):
+    list_display = ('farmer_code', 'first_name', 'surname', 'region', 'district', 'society_code', 'synced_at')
+    search_fields = ('farmer_code', 'first_name', 'surname')
+
+admin.site.register(FarmerRegistry, FarmerRegistryAdmin)
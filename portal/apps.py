@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class PortalConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "portal"
+
+    def ready(self):
+        from . import signals, tasks  # noqa: F401 (tasks registers the background job tasks)
+
+        signals.connect()
@@ -0,0 +1,107 @@
+"""
+Async CRUD for every survey table, under ``/api/async/<table>/``.
+
+Requests take the same bodies and list query parameters as the sync
+endpoints, but the responses are generic rather than hand-picked per table:
+a detail is ``{"data": row}`` with every column keyed by attname (files as
+URLs), a list is the usual page of ``.values()`` rows, and writes answer
+``{"message": ..., "id": ...}``. Extras some sync views add, such as image
+thumbnails, are left out. Rows are read
+with the async ORM (``aget``, ``afirst``, async iteration), and Cover_tbl
+farmer lookups await ``httpx`` instead of blocking a thread (with
+FARMER_DETAILS_IN_BACKGROUND they are queued as jobs, as in the sync views).
+Deleted rows release their image files through the same post_delete signal. Under ASGI
+(``uvicorn gatherflow.asgi:application``) one worker can therefore keep
+many slow uploads in flight. Under WSGI Django runs these views through
+``async_to_sync``, so they work but gain nothing there.
+
+``manage.py loadtest`` compares these routes against the sync ones.
+"""
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from .idempotency import idempotent
+from .interview import build_instance, field_values, serialize_row, validation_messages
+from .models import Cover_tbl
+from .pagination import apaginated_response
+from .routers import reads_from_replica
+from .tables import get_table
+
+
+async def _save(instance):
+    # With FARMER_DETAILS_IN_BACKGROUND, save() defers the lookup to a job as
+    # it does for the sync views; otherwise await it here instead of blocking.
+    if (
+        isinstance(instance, Cover_tbl)
+        and instance.farmer_details_outdated()
+        and not getattr(settings, "FARMER_DETAILS_IN_BACKGROUND", False)
+    ):
+        await instance.afetch_farmer_details()
+    await sync_to_async(instance.full_clean)()
+    await instance.asave()
+
+
+@csrf_exempt
+@reads_from_replica
+@idempotent
+async def async_table_view(request, table, pk=None):
+    """GET lists or retrieves, POST creates, PUT updates and DELETE removes rows of ``table``."""
+    model = get_table(table)
+    if model is None:
+        return JsonResponse({"error": f"Unknown table: {table}"}, status=404)
+
+    if request.method == "GET":
+        if pk is None:
+            return await apaginated_response(request, model.objects.values())
+        try:
+            instance = await model.objects.aget(pk=pk)
+        except model.DoesNotExist:
+            return JsonResponse({"error": "Not found"}, status=404)
+        return JsonResponse({"data": serialize_row(instance)}, status=200)
+
+    if request.method == "POST":
+        if pk is not None:
+            return JsonResponse({"error": "Method not allowed"}, status=405)
+        try:
+            instance = build_instance(model, json.loads(request.body), exclude=("updated_at",))
+            await _save(instance)
+            return JsonResponse({"message": "Created", "id": instance.pk}, status=201)
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON data"}, status=400)
+        except ValidationError as e:
+            return JsonResponse({"error": validation_messages(e)}, status=400)
+        except IntegrityError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+    if request.method in ("PUT", "DELETE"):
+        if pk is None:
+            return JsonResponse({"error": "ID is required"}, status=400)
+        try:
+            instance = await model.objects.aget(pk=pk)
+        except model.DoesNotExist:
+            return JsonResponse({"error": "Not found"}, status=404)
+
+        if request.method == "DELETE":
+            await instance.adelete()
+            return JsonResponse({"message": "Deleted"}, status=200)
+
+        try:
+            values = field_values(model, json.loads(request.body), exclude=("updated_at",))
+            for attname, value in values.items():
+                setattr(instance, attname, value)
+            await _save(instance)
+            return JsonResponse({"message": "Updated"}, status=200)
+        except json.JSONDecodeError:
+            return JsonResponse({"error": "Invalid JSON data"}, status=400)
+        except ValidationError as e:
+            return JsonResponse({"error": validation_messages(e)}, status=400)
+        except IntegrityError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({"error": "Method not allowed"}, status=405)
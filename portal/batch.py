@@ -0,0 +1,61 @@
+from django.conf import settings
+from django.http import JsonResponse
+
+from .filters import InvalidQuery, apply_list_params, trim
+
+
+def parse_ids(raw):
+    """Reads ``?ids=1,2,3`` into a de-duplicated list of ints, capped at BATCH_MAX_IDS."""
+    try:
+        ids = list(dict.fromkeys(int(value) for value in raw.split(",") if value.strip()))
+    except ValueError:
+        raise InvalidQuery("ids must be a comma-separated list of integers")
+    limit = getattr(settings, "BATCH_MAX_IDS", 500)
+    if not ids:
+        raise InvalidQuery("ids must not be empty")
+    if len(ids) > limit:
+        raise InvalidQuery(f"At most {limit} ids per request")
+    return ids
+
+
+def batch_queryset(request, queryset):
+    """Returns ``(queryset, ids, fields)`` for a ``?ids=`` request; raises InvalidQuery."""
+    ids = parse_ids(request.GET["ids"])
+    queryset, _, fields = apply_list_params(request, queryset)
+    return queryset.filter(id__in=ids), ids, fields
+
+
+def batch_body(rows, ids, fields, serialize=None):
+    data = {}
+    for row in rows:
+        pk = row["id"] if isinstance(row, dict) else row.id
+        if serialize is not None:
+            row = serialize(row)
+        data[str(pk)] = trim(row, fields)
+    missing = [pk for pk in ids if str(pk) not in data]
+    return {"data": data, "missing": missing}
+
+
+def batch_response(request, queryset, serialize=None):
+    """
+    Answers ``?ids=1,2,3`` on a list endpoint with one ``id__in`` query:
+
+        {"data": {"1": {...}, "3": {...}}, "missing": [2]}
+
+    Filters and ``?fields=`` apply as they do to the paginated list, so a
+    row that exists but is filtered out is reported as missing.
+    """
+    try:
+        queryset, ids, fields = batch_queryset(request, queryset)
+    except InvalidQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(batch_body(queryset, ids, fields, serialize), status=200)
+
+
+async def abatch_response(request, queryset, serialize=None):
+    """``batch_response`` for async views."""
+    try:
+        queryset, ids, fields = batch_queryset(request, queryset)
+    except InvalidQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(batch_body([row async for row in queryset], ids, fields, serialize), status=200)
@@ -0,0 +1,200 @@
+"""
+Array-body writes for one table at a time: ``/api/bulk/<table>/``.
+
+    POST    [{...}, {...}]            create, returns the new ids in order
+    PUT     [{"id": 1, ...}, ...]     partial update of the listed rows
+    DELETE  [1, 2, 3]                 delete by id
+
+A request is validated as a whole before anything is written, and a
+failure reports every bad row by its index. Foreign keys and unique
+columns are checked with one query per column rather than one per row, so
+a 19-child roster costs a few statements: one lookup per parent table,
+then a single INSERT, UPDATE or DELETE.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from .interview import SubmissionError, field_values, validation_messages
+from .signals import bulk_saved, bulk_saving
+
+
+def _check_size(rows):
+    limit = getattr(settings, "BULK_MAX_ROWS", 500)
+    if not isinstance(rows, list) or not rows:
+        raise SubmissionError({"rows": ["Expected a non-empty JSON array."]})
+    if len(rows) > limit:
+        raise SubmissionError({"rows": [f"At most {limit} rows per request."]})
+
+
+def _add_error(errors, index, field, messages):
+    errors.setdefault(index, {}).setdefault(field, []).extend(messages)
+
+
+def _clean_rows(model, instances, errors):
+    """
+    ``full_clean`` every instance except for foreign keys and unique columns,
+    which are checked in bulk: one ``IN (...)`` query per column.
+    """
+    fk_fields = [f for f in model._meta.concrete_fields if f.is_relation]
+    exclude = [f.name for f in fk_fields]
+    for i, instance in enumerate(instances):
+        try:
+            instance.full_clean(exclude=exclude, validate_unique=False)
+        except ValidationError as e:
+            messages = validation_messages(e)
+            for field, field_messages in (messages.items() if isinstance(messages, dict) else [("__all__", messages)]):
+                _add_error(errors, i, field, field_messages)
+
+    for field in fk_fields:
+        target = field.target_field
+        wanted = {}
+        for i, instance in enumerate(instances):
+            value = getattr(instance, field.attname)
+            if value in (None, ""):
+                setattr(instance, field.attname, None)
+                if not field.null:
+                    _add_error(errors, i, field.name, ["This field cannot be null."])
+                continue
+            try:
+                value = target.to_python(value)
+            except ValidationError as e:
+                _add_error(errors, i, field.name, e.messages)
+                continue
+            setattr(instance, field.attname, value)
+            wanted.setdefault(value, []).append(i)
+        if not wanted:
+            continue
+        found = set(field.related_model._base_manager.filter(**{f"{target.attname}__in": wanted}).values_list(target.attname, flat=True))
+        for value, indexes in wanted.items():
+            if value not in found:
+                for i in indexes:
+                    _add_error(errors, i, field.name, [f"{field.related_model.__name__} {value} does not exist."])
+
+    _check_unique(model, instances, errors)
+
+
+def _check_unique(model, instances, errors):
+    """
+    Reports unique-column clashes per row, with one ``IN (...)`` query per
+    unique column: values already taken by rows outside the request, and
+    values repeated within it.
+    """
+    own_pks = [instance.pk for instance in instances if instance.pk is not None]
+    for field in model._meta.concrete_fields:
+        if not field.unique or field.primary_key:
+            continue
+        wanted = {}
+        for i, instance in enumerate(instances):
+            value = getattr(instance, field.attname)
+            if value in (None, "") or field.name in errors.get(i, {}):
+                continue
+            wanted.setdefault(value, []).append(i)
+        if not wanted:
+            continue
+        taken = set(
+            model._base_manager.filter(**{f"{field.attname}__in": wanted})
+            .exclude(pk__in=own_pks)
+            .values_list(field.attname, flat=True)
+        )
+        for value, indexes in wanted.items():
+            # Within the request, the first row to use a value keeps it.
+            for i in indexes if value in taken else indexes[1:]:
+                _add_error(errors, i, field.name, instances[i].unique_error_message(model, (field.name,)).messages)
+
+
+def _saves_individually(model):
+    # Models with save() side effects (Cover_tbl's farmer lookup) can't be bulk-written.
+    return "save" in model.__dict__
+
+
+def bulk_create_rows(model, rows):
+    """Validates and inserts ``rows``. Returns the new ids in input order."""
+    _check_size(rows)
+    errors = {}
+    instances = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            errors[i] = {"__all__": ["Expected a JSON object."]}
+            row = {}
+        instances.append(model(**field_values(model, row, exclude=("updated_at",))))
+    _clean_rows(model, instances, errors)
+    if errors:
+        raise SubmissionError(errors)
+
+    with transaction.atomic():
+        if _saves_individually(model):
+            for instance in instances:
+                instance.save()
+        else:
+            model.objects.bulk_create(instances)
+            bulk_saved.send(sender=model, instances=instances, created=True)
+    return [instance.pk for instance in instances]
+
+
+def bulk_update_rows(model, rows):
+    """
+    Applies partial updates; every row needs an ``id``. Only the columns that
+    appear in the payload are written. Returns the number of rows updated.
+    """
+    _check_size(rows)
+    errors = {}
+    ids = []
+    for i, row in enumerate(rows):
+        try:
+            ids.append(int(row["id"]))
+        except (KeyError, TypeError, ValueError):
+            errors[i] = {"id": ["A valid id is required."]}
+            ids.append(None)
+    existing = model.objects.in_bulk([pk for pk in ids if pk is not None])
+
+    instances, touched = [], set()
+    for i, (pk, row) in enumerate(zip(ids, rows)):
+        if pk is None:
+            continue
+        instance = existing.get(pk)
+        if instance is None:
+            errors[i] = {"id": [f"{model.__name__} {pk} does not exist."]}
+            continue
+        values = field_values(model, row, exclude=("updated_at", "id"))
+        for attname, value in values.items():
+            setattr(instance, attname, value)
+        touched.update(values)
+        instances.append((i, instance))
+
+    row_errors = {}
+    _clean_rows(model, [instance for _, instance in instances], row_errors)
+    for position, messages in row_errors.items():
+        errors[instances[position][0]] = messages
+    if errors:
+        raise SubmissionError(errors)
+
+    instances = [instance for _, instance in instances]
+    with transaction.atomic():
+        if _saves_individually(model):
+            for instance in instances:
+                instance.save()
+        elif touched:
+            now = timezone.now()
+            for instance in instances:
+                instance.updated_at = now
+            names = [f.name for f in model._meta.concrete_fields if f.attname in touched]
+            bulk_saving.send(sender=model, instances=instances)
+            model.objects.bulk_update(instances, names + ["updated_at"])
+            bulk_saved.send(sender=model, instances=instances, created=False)
+    return len(instances)
+
+
+def bulk_delete_rows(model, ids):
+    """Deletes rows by id. Returns ``(deleted ids, missing ids)``."""
+    _check_size(ids)
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in ids))
+    except (TypeError, ValueError):
+        raise SubmissionError({"ids": ["Expected a JSON array of integer ids."]})
+    with transaction.atomic():
+        queryset = model.objects.filter(id__in=ids)
+        found = set(queryset.values_list("id", flat=True))
+        queryset.delete()
+    return [pk for pk in ids if pk in found], [pk for pk in ids if pk not in found]
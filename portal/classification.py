@@ -0,0 +1,110 @@
+"""
+Child-labour classification of ChildLabourFact rows.
+
+Each child gets a category and the codes of every rule it met. Categories
+from most to least severe:
+
+    hazardous_work   any hazardous task in the last 7 days or 12 months,
+                     agrochemical exposure, or an injury while working on cocoa
+    child_labour     working below CHILD_LABOUR_MIN_LIGHT_WORK_AGE, or more
+                     hours than allowed for the child's age band
+    light_work       any other work
+    no_issue         no work reported
+
+The rules are SQL conditions over the fact columns. ``classify`` evaluates
+them for a whole queryset in one UPDATE, so reclassifying a batch costs one
+statement however many children it holds. Rows without work details keep a
+blank classification.
+
+When the thresholds change, ``manage.py reclassify_children`` updates rows
+classified under older settings; ``classification_rules`` holds the version
+each row was classified with.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import Case, CharField, Func, Q, Value, When
+
+from .models import ChildLabourFact
+
+DEFAULT_THRESHOLDS = {
+    # Youngest age at which light work is allowed.
+    "min_light_work_age": 12,
+    # Age from which a child may do non-hazardous work beyond light work.
+    "min_working_age": 15,
+    # Weekly hours allowed between min_light_work_age and min_working_age.
+    "light_work_max_hours": 14,
+    # Weekly hours allowed from min_working_age up to 17.
+    "max_hours": 43,
+}
+
+
+def get_thresholds():
+    return {
+        name: getattr(settings, f"CHILD_LABOUR_{name.upper()}", default)
+        for name, default in DEFAULT_THRESHOLDS.items()
+    }
+
+
+def rules_version(thresholds=None):
+    """Short, stable digest of the thresholds, stored with each classification."""
+    thresholds = thresholds or get_thresholds()
+    return hashlib.sha1(json.dumps(thresholds, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def get_rules(thresholds=None):
+    """``[(category, reason code, condition)]``, most severe category first."""
+    t = thresholds or get_thresholds()
+    worked = Q(light_tasks_7days__gt=0) | Q(total_work_hours__gt=0) | Q(worked_on_cocoa=True)
+    return [
+        ("hazardous_work", "hazardous_task_7days", Q(hazardous_tasks_7days__gt=0)),
+        ("hazardous_work", "hazardous_task_12months", Q(hazardous_tasks_12months__gt=0)),
+        ("hazardous_work", "agrochemical_exposure", Q(agrochemical_exposure=True)),
+        ("hazardous_work", "injured_working_on_cocoa", Q(injured=True, worked_on_cocoa=True)),
+        ("child_labour", "below_light_work_age", worked & Q(age__lt=t["min_light_work_age"])),
+        (
+            "child_labour",
+            "light_work_hours_exceeded",
+            Q(age__gte=t["min_light_work_age"], age__lt=t["min_working_age"], total_work_hours__gt=t["light_work_max_hours"]),
+        ),
+        ("child_labour", "working_hours_exceeded", Q(age__gte=t["min_working_age"], total_work_hours__gt=t["max_hours"])),
+        ("light_work", "worked", worked),
+    ]
+
+
+class _ReasonArray(Func):
+    """``ARRAY[...]`` of the matching reason codes, with the non-matches (NULLs) dropped."""
+
+    template = "array_remove(ARRAY[%(expressions)s]::varchar[], NULL)"
+    output_field = ArrayField(CharField(max_length=40))
+
+
+def classify(queryset, thresholds=None):
+    """Classifies every fact row in ``queryset`` with one UPDATE. Returns the row count."""
+    thresholds = thresholds or get_thresholds()
+    rules = get_rules(thresholds)
+    no_details = Q(light_tasks_7days__isnull=True)
+
+    # The first matching rule decides the category, so they are checked in order of severity.
+    category = Case(
+        When(no_details, then=Value("")),
+        *(When(condition, then=Value(name)) for name, _, condition in rules),
+        default=Value("no_issue"),
+        output_field=CharField(),
+    )
+    reasons = Case(
+        When(no_details, then=Value([], output_field=_ReasonArray.output_field)),
+        default=_ReasonArray(*(Case(When(condition, then=Value(code)), output_field=CharField()) for _, code, condition in rules)),
+    )
+    return queryset.update(
+        classification=category,
+        classification_reasons=reasons,
+        classification_rules=Value(rules_version(thresholds)),
+    )
+
+
+def stale_facts():
+    """Fact rows classified under thresholds other than the current ones."""
+    return ChildLabourFact.objects.exclude(classification_rules=rules_version())
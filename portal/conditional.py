@@ -0,0 +1,174 @@
+"""
+Conditional GETs for the table endpoints.
+
+Every detail and list response carries an ``ETag`` and ``Last-Modified``
+derived from the data's version: the row's ``updated_at`` for a detail,
+and for a list the table's latest ``updated_at`` and latest delete
+(SyncTombstone). ``updated_at`` is stamped at save time, not at commit, so
+a long transaction can commit rows stamped before the current latest one.
+The list version therefore also counts the rows and sums their ``xmin``
+(the id of the transaction that wrote each row version), which every
+committed insert, update or delete changes. A list filtered on cover or consent columns (``?region=``)
+also depends on the tables it joins through, so their versions are folded
+in too: a cover that gains its region makes the consent list change. A tablet that polls with ``If-None-Match`` or
+``If-Modified-Since`` gets a bodyless ``304 Not Modified`` while nothing
+has changed.
+
+Versions and rendered response bodies are kept in Django's cache
+(RESPONSE_CACHE_ALIAS). Saves and deletes drop the versions of the row and
+its table (portal/signals.py), and the body keys include the version, so a
+stale body is never served. With warm entries a poll costs no queries at
+all; after a write it costs one small version query, plus the view's own
+queries if the body changed.
+
+The alias must name a cache every worker shares (Redis, Memcached, ...):
+a drop in one process has to reach the others. With a per-process
+LocMemCache, or no alias, nothing is cached and each GET reads its
+version from the database.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db.models import BigIntegerField, Count, Max, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import http_date, parse_http_date_safe, parse_etags
+
+from .models import SyncTombstone
+from .routers import replica_alias
+from .tables import TABLE_SLUGS
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def _cache():
+    """The shared response cache, or None when there is no cache every worker can see."""
+    alias = getattr(settings, "RESPONSE_CACHE_ALIAS", None)
+    if not alias:
+        return None
+    cache = caches[alias]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def _timeout():
+    # A version read from a lagging replica must not outlive the lag window.
+    if replica_alias():
+        return getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+    return getattr(settings, "RESPONSE_CACHE_SECONDS", 300)
+
+
+def version_key(model, pk=None):
+    slug = TABLE_SLUGS.get(model, model._meta.model_name)
+    return f"portal:version:{slug}" if pk is None else f"portal:version:{slug}:{pk}"
+
+
+def _timestamp(*values):
+    values = [value for value in values if value is not None]
+    return max(values).timestamp() if values else 0.0
+
+
+def _read_version(model, pk):
+    """
+    ``updated_at`` of one row as a POSIX timestamp (None if it doesn't exist),
+    or for the table ``(latest change as a timestamp, row count, sum of xmin)``.
+    """
+    if pk is not None:
+        updated_at = model.objects.filter(pk=pk).values_list("updated_at", flat=True).first()
+        return None if updated_at is None else updated_at.timestamp()
+    slug = TABLE_SLUGS.get(model, model._meta.model_name)
+    latest_delete = SyncTombstone.objects.filter(table=slug).order_by("-deleted_at").values("deleted_at")[:1]
+    versions = model.objects.aggregate(
+        updated=Max("updated_at"),
+        deleted=Max(Subquery(latest_delete)),
+        rows=Count("id"),
+        xmins=Sum(RawSQL("xmin::text::bigint", (), output_field=BigIntegerField())),
+    )
+    return _timestamp(versions["updated"], versions["deleted"]), versions["rows"], versions["xmins"] or 0
+
+
+def get_version(model, pk=None):
+    """The cached version of a row or table, read from the database on a miss."""
+    cache = _cache()
+    if cache is None:
+        return _read_version(model, pk)
+    key = version_key(model, pk)
+    version = cache.get(key)
+    if version is None:
+        version = _read_version(model, pk)
+        if version is not None:
+            cache.set(key, version, _timeout())
+    return version
+
+
+def get_list_version(request, model):
+    """
+    ``(last modified, version)`` of a list: the versions of the table and of
+    every table its filters join through, and the latest change among them.
+    """
+    from .filters import joined_tables  # filters imports the interview tree, which imports the signals
+
+    versions = tuple(get_version(table) for table in [model, *joined_tables(request, model)])
+    return max(version[0] for version in versions), versions
+
+
+def forget(model, pks):
+    """Drops the cached versions of the given rows and of their table."""
+    cache = _cache()
+    if cache is not None:
+        cache.delete_many([version_key(model)] + [version_key(model, pk) for pk in pks])
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match is not None:
+        tags = parse_etags(if_none_match)
+        return "*" in tags or etag in tags
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return if_modified_since is not None and int(last_modified) <= if_modified_since
+
+
+def conditional_get(model):
+    """
+    Adds ETag/Last-Modified, 304 handling and a response cache to the GETs
+    of a table view. The row id, when there is one, is the view's only URL
+    argument. Other methods pass straight through.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in SAFE_METHODS:
+                return view_func(request, *args, **kwargs)
+            pk = next((value for value in kwargs.values() if value is not None), None)
+            if pk is not None:
+                version = last_modified = get_version(model, pk)
+            else:
+                last_modified, version = get_list_version(request, model)
+            if version is None:
+                return view_func(request, *args, **kwargs)  # the view's 404
+
+            digest = hashlib.sha1(f"{version_key(model, pk)}:{version}:{request.get_full_path()}".encode()).hexdigest()
+            etag = f'"{digest}"'
+            if _not_modified(request, etag, last_modified):
+                response = HttpResponseNotModified()
+            else:
+                cache = _cache()
+                body_key = f"portal:response:{digest}"
+                cached = cache.get(body_key) if cache is not None else None
+                if cached is not None:
+                    response = HttpResponse(cached[1], content_type=cached[0])
+                else:
+                    response = view_func(request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+                    if cache is not None and not response.streaming:
+                        cache.set(body_key, (response["Content-Type"], response.content), getattr(settings, "RESPONSE_CACHE_SECONDS", 300))
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,146 @@
+"""
+Rolled-up dashboard counts in DashboardCounter, read by ``/api/stats/``.
+
+Counters are kept per (region, district, enumerator_code) of the interview's
+cover. The metrics are:
+
+    interviews_started       ConsentLocation_tbl rows
+    farmers_unavailable      consent rows with farmer_available = "No", by reason_unavailable
+    interviews_completed     EndOfCollection rows
+    children_surveyed        ChildInHouseholdTbl rows that could be surveyed
+    children_unavailable     children that could not be surveyed, by child_unavailability_reason
+
+Creates add to the counters and deletes subtract from them, with an
+increment per touched counter instead of a recount. A single-row update
+compares the row's contribution before and after the save. Bulk updates,
+and covers moved to another region, district or enumerator, recount just
+the groups involved. ``manage.py rebuild_dashboard_counters`` recounts
+everything.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+
+from .models import ChildInHouseholdTbl, ConsentLocation_tbl, Cover_tbl, DashboardCounter, EndOfCollection
+
+GROUP_FIELDS = ("region", "district", "enumerator_code")
+UNSPECIFIED = "unspecified"
+METRICS = ("interviews_started", "farmers_unavailable", "interviews_completed", "children_surveyed", "children_unavailable")
+SPLIT_METRICS = ("farmers_unavailable", "children_unavailable")
+
+# Counted tables, with the ORM path from each to its cover and the columns its metrics split on.
+SOURCES = {
+    ConsentLocation_tbl: ("cover", ("farmer_available", "reason_unavailable")),
+    EndOfCollection: ("sensitization__consent__cover", ()),
+    ChildInHouseholdTbl: ("household__consent__cover", ("child_can_be_surveyed", "child_unavailability_reason")),
+}
+
+
+def _metrics(model, row):
+    """``[(metric, dimension)]`` that one row of ``model`` counts towards."""
+    if model is ConsentLocation_tbl:
+        metrics = [("interviews_started", "")]
+        if row["farmer_available"] == "No":
+            metrics.append(("farmers_unavailable", row["reason_unavailable"] or UNSPECIFIED))
+        return metrics
+    if model is EndOfCollection:
+        return [("interviews_completed", "")]
+    if row["child_can_be_surveyed"] == "yes":
+        return [("children_surveyed", "")]
+    if row["child_can_be_surveyed"] == "no":
+        return [("children_unavailable", row["child_unavailability_reason"] or UNSPECIFIED)]
+    return []
+
+
+def count_rows(model, queryset):
+    """
+    ``Counter`` of ``(region, district, enumerator_code, metric, dimension)``
+    for the rows of ``queryset``, from one GROUP BY query. Rows without a cover are skipped.
+    """
+    cover_path, columns = SOURCES[model]
+    group = {name: F(f"{cover_path}__{name}") for name in GROUP_FIELDS}
+    rows = (
+        queryset.filter(**{f"{cover_path}__isnull": False})
+        .values(*columns, **group)
+        .annotate(n=Count("pk"))
+        .order_by()
+    )
+    counts = Counter()
+    for row in rows:
+        key = tuple(row[name] for name in GROUP_FIELDS)
+        for metric, dimension in _metrics(model, row):
+            counts[key + (metric, dimension)] += row["n"]
+    return counts
+
+
+def apply(deltas):
+    """Adds ``deltas`` to the counters: one INSERT for new counters, one UPDATE per changed counter."""
+    deltas = sorted((key, n) for key, n in deltas.items() if n)
+    if not deltas:
+        return
+    names = GROUP_FIELDS + ("metric", "dimension")
+    with transaction.atomic():
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(**dict(zip(names, key))) for key, _ in deltas], ignore_conflicts=True
+        )
+        for key, n in deltas:
+            DashboardCounter.objects.filter(**dict(zip(names, key))).update(count=F("count") + n)
+
+
+def _group_filter(prefix, groups):
+    condition = Q()
+    for group in groups:
+        condition |= Q(**{prefix + name: value for name, value in zip(GROUP_FIELDS, group)})
+    return condition
+
+
+def recount(groups):
+    """Recomputes every counter of the given ``(region, district, enumerator_code)`` groups."""
+    groups = set(groups)
+    if not groups:
+        return
+    totals = Counter()
+    for model, (cover_path, _) in SOURCES.items():
+        totals.update(count_rows(model, model.objects.filter(_group_filter(f"{cover_path}__", groups))))
+    names = GROUP_FIELDS + ("metric", "dimension")
+    with transaction.atomic():
+        DashboardCounter.objects.filter(_group_filter("", groups)).delete()
+        DashboardCounter.objects.bulk_create([DashboardCounter(**dict(zip(names, key)), count=n) for key, n in totals.items() if n])
+
+
+def groups_of(model, pks):
+    """The ``(region, district, enumerator_code)`` groups the given rows belong to."""
+    if model is Cover_tbl:
+        return set(Cover_tbl.objects.filter(pk__in=pks).values_list(*GROUP_FIELDS))
+    cover_path, _ = SOURCES[model]
+    return set(model.objects.filter(pk__in=pks).values_list(*(f"{cover_path}__{name}" for name in GROUP_FIELDS)))
+
+
+def negate(counts):
+    return Counter({key: -n for key, n in counts.items()})
+
+
+def stats(filters=None, group_by=GROUP_FIELDS):
+    """
+    Dashboard numbers per group, summed from the counters: one row per
+    ``group_by`` combination with a total for each plain metric and a
+    ``{dimension: count}`` dict for the split ones.
+    """
+    rows = (
+        DashboardCounter.objects.filter(**(filters or {}))
+        .values(*group_by, "metric", "dimension")
+        .annotate(total=Sum("count"))
+        .order_by(*group_by, "metric", "dimension")
+    )
+    groups = {}
+    for row in rows:
+        key = tuple(row[name] for name in group_by)
+        group = groups.setdefault(
+            key, {**dict(zip(group_by, key)), **{metric: {} if metric in SPLIT_METRICS else 0 for metric in METRICS}}
+        )
+        if row["metric"] in SPLIT_METRICS:
+            group[row["metric"]][row["dimension"]] = row["total"]
+        else:
+            group[row["metric"]] = row["total"]
+    return list(groups.values())
@@ -0,0 +1,44 @@
+"""
+Database connection reporting for ``/api/db/pool/``.
+
+With DB_POOL on, every worker process holds one psycopg pool per database
+alias and the report carries the pool's own counters (``get_stats()``):
+current size, idle connections, requests waiting, time spent waiting and
+errors. Without a pool it describes the persistent-connection setup
+instead. Either way the numbers are for the worker that answered, so
+scrape each worker (or run one) when sizing DB_POOL_MAX_SIZE.
+"""
+import os
+
+from django.db import connections
+
+
+def describe_connection(connection):
+    """Connection settings and, when pooled, live pool counters for one alias."""
+    settings_dict = connection.settings_dict
+    pool = getattr(connection, "pool", None)
+    info = {
+        "vendor": connection.vendor,
+        "conn_max_age": settings_dict["CONN_MAX_AGE"],
+        "health_checks": settings_dict["CONN_HEALTH_CHECKS"],
+        "server_side_cursors": not settings_dict.get("DISABLE_SERVER_SIDE_CURSORS", False),
+        "connected": connection.connection is not None,
+        "pool": None,
+    }
+    if pool is not None:
+        info["pool"] = {
+            "min_size": pool.min_size,
+            "max_size": pool.max_size,
+            "timeout": pool.timeout,
+            "max_idle": pool.max_idle,
+            "max_lifetime": pool.max_lifetime,
+            **pool.get_stats(),
+        }
+    return info
+
+
+def connection_stats():
+    return {
+        "pid": os.getpid(),
+        "databases": {alias: describe_connection(connections[alias]) for alias in connections},
+    }
@@ -0,0 +1,203 @@
+"""
+Columnar exports of the survey data for analysts.
+
+A source is any portal table (by its API slug) or ``children``: one row
+per child from ChildLabourFact, with the farmer, community and child
+identifiers joined on. That is the flat sheet behind the CLMRS household
+profiling report. Either can be written as:
+
+* Parquet, with one typed column per field. Datetimes are UTC timestamps,
+  integers stay integers, and choice codes are dictionary-encoded
+  categoricals;
+* gzip-compressed CSV, with the raw choice codes.
+
+Rows are read from a server-side cursor and written EXPORT_CHUNK_SIZE at
+a time, one Parquet row group or CSV block per chunk. Memory stays bounded
+whatever the table size, and an HTTP export starts sending before the last
+row is read. Used by ``manage.py export_survey`` and ``/api/export/<source>/``.
+"""
+import csv
+import gzip
+import io
+import json
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F
+from multiselectfield import MultiSelectField
+
+from .models import ChildLabourFact
+from .tables import PORTAL_TABLES
+
+FORMATS = {
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+    "csv": ("application/gzip", ".csv.gz"),
+}
+CHILDREN = "children"
+
+# Identifiers joined onto each ChildLabourFact row for the per-child export.
+CHILD_EXTRA_COLUMNS = {
+    "farmer_code": "cover__farmer_code",
+    "community_name": "child__household__consent__community_name",
+    "child_identifier": "child__child_identifier",
+}
+
+
+class ExportError(ValueError):
+    """Raised for an unknown source or format."""
+
+
+def sources():
+    return [CHILDREN, *PORTAL_TABLES]
+
+
+def get_source(name):
+    """``(queryset, [(column, model field)])`` for an export source."""
+    if name == CHILDREN:
+        columns = [(f.attname, f) for f in ChildLabourFact._meta.concrete_fields if f.name != "refreshed_at"]
+        for column, path in CHILD_EXTRA_COLUMNS.items():
+            columns.append((column, _resolve(ChildLabourFact, path)))
+        queryset = ChildLabourFact.objects.annotate(**{column: F(path) for column, path in CHILD_EXTRA_COLUMNS.items()})
+        return queryset, columns
+    model = PORTAL_TABLES.get(name)
+    if model is None:
+        raise ExportError(f"Unknown source: {name}")
+    return model.objects.all(), [(f.attname, f) for f in model._meta.concrete_fields]
+
+
+def _resolve(model, path):
+    *relations, name = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model._meta.get_field(name)
+
+
+def _rows(queryset, columns):
+    """Chunks of row tuples, read through a server-side cursor."""
+    chunk_size = getattr(settings, "EXPORT_CHUNK_SIZE", 20000)
+    chunk = []
+    for row in queryset.order_by("pk").values_list(*(name for name, _ in columns)).iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _plain(value):
+    """Values without a native column type (lists, dicts, UUIDs) as strings."""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple, set)):
+        return ",".join(str(item) for item in value)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+
+class _Sink(io.RawIOBase):
+    """A write-only file that hands back what was written since the last ``drain()``."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer += data
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def _arrow_type(pa, field):
+    """The Arrow type of a model field's column."""
+    if isinstance(field, MultiSelectField):
+        return pa.string()
+    if isinstance(field, models.BooleanField):
+        base = pa.bool_()
+    elif isinstance(field, (models.AutoField, models.IntegerField, models.ForeignKey)):
+        base = pa.int64()
+    elif isinstance(field, models.FloatField):
+        base = pa.float64()
+    elif isinstance(field, models.DecimalField):
+        base = pa.decimal128(field.max_digits, field.decimal_places)
+    elif isinstance(field, models.DateTimeField):
+        base = pa.timestamp("us", tz="UTC")
+    elif isinstance(field, models.DateField):
+        base = pa.date32()
+    else:
+        return pa.dictionary(pa.int32(), pa.string()) if field.choices else pa.string()
+    return pa.dictionary(pa.int32(), base) if field.choices else base
+
+
+def _native(field):
+    return not isinstance(field, MultiSelectField) and isinstance(field, (
+        models.BooleanField, models.AutoField, models.IntegerField, models.ForeignKey,
+        models.FloatField, models.DecimalField, models.DateField,
+    ))
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        raise ExportError("Parquet export needs pyarrow (pip install pyarrow)")
+
+
+def iter_parquet(queryset, columns):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(name, _arrow_type(pa, field)) for name, field in columns])
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for chunk in _rows(queryset, columns):
+            arrays = []
+            for i, (name, field) in enumerate(columns):
+                values = [row[i] for row in chunk]
+                if not _native(field):
+                    values = [_plain(value) for value in values]
+                column_type = schema.field(name).type
+                if pa.types.is_dictionary(column_type):
+                    arrays.append(pa.array(values, type=column_type.value_type).dictionary_encode())
+                else:
+                    arrays.append(pa.array(values, type=column_type))
+            writer.write_batch(pa.record_batch(arrays, schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_csv_gzip(queryset, columns):
+    sink = _Sink()
+    text = io.StringIO()
+    writer = csv.writer(text)
+    with gzip.GzipFile(fileobj=sink, mode="wb") as compressed:
+        writer.writerow([name for name, _ in columns])
+        for chunk in _rows(queryset, columns):
+            writer.writerows([[_plain(value) if isinstance(value, (list, tuple, set, dict)) else value for value in row] for row in chunk])
+            compressed.write(text.getvalue().encode())
+            text.seek(0)
+            text.truncate()
+            yield sink.drain()
+    yield sink.drain()
+
+
+def iter_export(queryset, columns, fmt):
+    """The bytes of an export, chunk by chunk."""
+    if fmt == "parquet":
+        _require_pyarrow()
+        return iter_parquet(queryset, columns)
+    if fmt == "csv":
+        return iter_csv_gzip(queryset, columns)
+    raise ExportError("format must be one of: " + ", ".join(FORMATS))
@@ -0,0 +1,148 @@
+"""
+Keeps ChildLabourFact in step with the survey tables.
+
+A fact row is rebuilt from its child, the child's latest education/work
+details, and the interview's cover and consent rows. Saves are picked up
+through ``post_save`` and, for the bulk write paths that skip it, the
+``bulk_saved`` signal (portal/signals.py). Refreshing a batch of children
+costs two SELECTs, one upsert and one classification UPDATE
+(portal/classification.py), however many children are in it.
+
+``manage.py rebuild_child_labour_facts`` recomputes the whole table; run
+it nightly to pick up anything written behind the ORM's back.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from .classification import classify
+from .models import ChildEducationDetailsTbl, ChildInHouseholdTbl, ChildLabourFact, ConsentLocation_tbl, Cover_tbl
+
+# Tables a fact row is built from.
+SOURCE_MODELS = (Cover_tbl, ConsentLocation_tbl, ChildInHouseholdTbl, ChildEducationDetailsTbl)
+
+CONSENT_PATH = "household__consent__"
+COVER_PATH = CONSENT_PATH + "cover__"
+
+# Every task key on the hazardous-work lists, apart from "none".
+HAZARDOUS_TASKS = frozenset(key for key, _ in ChildEducationDetailsTbl.HEAVY_TASK_CHOICES if key != "none")
+AGROCHEMICAL_TASK = "handling_agrochemicals"
+
+EDUCATION_COLUMNS = (
+    "child_id", "work_on_cocoa", "work_in_house", "performed_tasks", "tasks_done_in_7days",
+    "heavy_tasks_12months", "agrochemicals_applied", "child_on_farm_during_agro", "suffered_injury",
+    "child_educated", "child_school_7days", "missed_school",
+    "total_hours_light_work_school", "total_hours_light_work_non_school",
+    "total_hours_school_days", "total_hours_non_school_days",
+)
+
+# Columns written by the upsert; the classification columns are set by classify() afterwards.
+UPDATE_FIELDS = [
+    f.name for f in ChildLabourFact._meta.concrete_fields
+    if not f.primary_key and f.name != "child" and not f.name.startswith("classification")
+]
+
+
+def _task_keys(value):
+    """Task keys from a MultiSelectField value or a comma-separated string."""
+    if not value:
+        return set()
+    if isinstance(value, str):
+        value = value.split(",")
+    return {key.strip() for key in value if key and key.strip() and key.strip() != "none"}
+
+
+def _yes(value):
+    if value in (None, ""):
+        return None
+    return str(value).lower() == "yes"
+
+
+def _hours(*values):
+    values = [value for value in values if value is not None]
+    return sum(values) if values else None
+
+
+def _any(*flags):
+    if all(flag is None for flag in flags):
+        return None
+    return any(flags)
+
+
+def build_fact(child, details):
+    """``ChildLabourFact`` for one ``child`` row and its ``details`` (or None)."""
+    year = (child["interview_start_time"] or timezone.now()).year
+    fact = ChildLabourFact(
+        child_id=child["id"],
+        cover_id=child["cover_id"],
+        region=child["region"] or "",
+        district=child["district"] or "",
+        society_code=child["society_code"] or "",
+        enumerator_code=child["enumerator_code"] or "",
+        interview_start_time=child["interview_start_time"],
+        child_gender=child["child_gender"] or "",
+        child_year_birth=child["child_year_birth"],
+        age=None if child["child_year_birth"] is None else max(year - child["child_year_birth"], 0),
+        surveyed=_yes(child["child_can_be_surveyed"]) is True,
+    )
+    if details is None:
+        return fact
+
+    hazardous_7days = _task_keys(details["tasks_done_in_7days"]) & HAZARDOUS_TASKS
+    hazardous_12months = _task_keys(details["heavy_tasks_12months"]) & HAZARDOUS_TASKS
+    fact.worked_on_cocoa = _yes(details["work_on_cocoa"])
+    fact.worked_in_house = _yes(details["work_in_house"])
+    fact.light_tasks_7days = len(_task_keys(details["performed_tasks"]))
+    fact.hazardous_tasks_7days = len(hazardous_7days)
+    fact.hazardous_tasks_12months = len(hazardous_12months)
+    fact.agrochemical_exposure = _any(
+        _yes(details["agrochemicals_applied"]),
+        _yes(details["child_on_farm_during_agro"]),
+        AGROCHEMICAL_TASK in hazardous_7days | hazardous_12months,
+    )
+    fact.injured = _yes(details["suffered_injury"])
+    fact.enrolled_in_school = None if details["child_educated"] is None else details["child_educated"] == 1
+    fact.attended_school_7days = _yes(details["child_school_7days"])
+    fact.missed_school_7days = _yes(details["missed_school"])
+    fact.light_work_hours = _hours(details["total_hours_light_work_school"], details["total_hours_light_work_non_school"])
+    fact.hazardous_work_hours = _hours(details["total_hours_school_days"], details["total_hours_non_school_days"])
+    fact.total_work_hours = _hours(fact.light_work_hours, fact.hazardous_work_hours)
+    return fact
+
+
+def refresh_children(child_ids):
+    """Recomputes and reclassifies the fact rows for ``child_ids``. Returns how many were written."""
+    child_ids = list(child_ids)
+    if not child_ids:
+        return 0
+    children = ChildInHouseholdTbl.objects.filter(id__in=child_ids).values(
+        "id", "child_gender", "child_year_birth", "child_can_be_surveyed",
+        cover_id=F(CONSENT_PATH + "cover_id"),
+        region=F(COVER_PATH + "region"),
+        district=F(COVER_PATH + "district"),
+        society_code=F(COVER_PATH + "society_code"),
+        enumerator_code=F(COVER_PATH + "enumerator_code"),
+        interview_start_time=F(CONSENT_PATH + "interview_start_time"),
+    )
+    # A child normally has one details row; if there are several, the latest wins.
+    details = {}
+    for row in ChildEducationDetailsTbl.objects.filter(child_id__in=child_ids).order_by("id").values(*EDUCATION_COLUMNS):
+        details[row["child_id"]] = row
+
+    facts = [build_fact(child, details.get(child["id"])) for child in children]
+    ChildLabourFact.objects.bulk_create(facts, update_conflicts=True, unique_fields=["child"], update_fields=UPDATE_FIELDS)
+    classify(ChildLabourFact.objects.filter(child_id__in=child_ids))
+    return len(facts)
+
+
+def affected_children(model, instances):
+    """Ids of the children whose facts depend on ``instances`` of ``model``."""
+    pks = [instance.pk for instance in instances]
+    if model is ChildInHouseholdTbl:
+        return pks
+    if model is ChildEducationDetailsTbl:
+        return {instance.child_id for instance in instances if instance.child_id is not None}
+    if model is ConsentLocation_tbl:
+        return ChildInHouseholdTbl.objects.filter(household__consent_id__in=pks).values_list("id", flat=True)
+    if model is Cover_tbl:
+        return ChildInHouseholdTbl.objects.filter(**{CONSENT_PATH + "cover_id__in": pks}).values_list("id", flat=True)
+    return []
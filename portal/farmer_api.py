@@ -0,0 +1,272 @@
+import asyncio
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import httpx
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from requests.adapters import HTTPAdapter
+
+EXTERNAL_API_URL = "https://example.com/api/farmer_details/"  # Replace with actual API URL
+
+# Stored in place of "farmer not found" so misses are cached too.
+NOT_FOUND = {}
+
+
+def _api_url():
+    return getattr(settings, "FARMER_API_URL", EXTERNAL_API_URL)
+
+
+class FarmerDetailsCache:
+    """
+    Small in-process TTL + LRU cache.
+
+    Entries expire ``ttl`` seconds after being stored and the least recently
+    used entry is dropped once ``maxsize`` is reached. Safe to share between
+    the threads of one worker.
+    """
+
+    def __init__(self, maxsize=2048, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss or an expired entry."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+local_cache = FarmerDetailsCache(
+    maxsize=getattr(settings, "FARMER_API_CACHE_SIZE", 2048),
+    ttl=getattr(settings, "FARMER_API_CACHE_TTL", 3600),
+)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """One pooled ``requests.Session`` per process, so TCP/TLS connections are reused."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                pool_size = getattr(settings, "FARMER_API_POOL_SIZE", 10)
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=1)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _shared_cache():
+    alias = getattr(settings, "FARMER_API_CACHE_ALIAS", None)
+    return caches[alias] if alias else None
+
+
+def _cache_key(farmer_code):
+    return f"farmer_details:{farmer_code}"
+
+
+def _cache_ttl(details):
+    if not details:  # NOT_FOUND, or an empty dict read back from the shared cache
+        return getattr(settings, "FARMER_API_NEGATIVE_CACHE_TTL", 60)
+    return getattr(settings, "FARMER_API_CACHE_TTL", 3600)
+
+
+def _cache_store(farmer_code, details):
+    ttl = _cache_ttl(details)
+    local_cache.set(farmer_code, details, ttl=ttl)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.set(_cache_key(farmer_code), details, ttl)
+
+
+def _read_response(farmer_code, status_code, read_json):
+    """
+    NOT_FOUND for a 404, the details for a 200. Anything else (5xx, 429, a
+    body that isn't JSON) is a failed lookup, not an unknown farmer, so it
+    raises and isn't cached.
+    """
+    if status_code == 404:
+        return NOT_FOUND
+    if status_code != 200:
+        raise ValidationError(f"Farmer lookup for {farmer_code} failed: HTTP {status_code}")
+    try:
+        return read_json()
+    except ValueError as e:
+        raise ValidationError(f"Farmer lookup for {farmer_code} failed: invalid JSON ({e})")
+
+
+def request_farmer_details(farmer_code):
+    """Calls the external API directly. Returns the details dict or NOT_FOUND."""
+    timeout = (
+        getattr(settings, "FARMER_API_CONNECT_TIMEOUT", 3),
+        getattr(settings, "FARMER_API_READ_TIMEOUT", 10),
+    )
+    try:
+        response = get_session().get(f"{_api_url()}{farmer_code}", timeout=timeout)
+    except requests.RequestException as e:
+        raise ValidationError(f"Farmer lookup for {farmer_code} failed: {e}")
+    return _read_response(farmer_code, response.status_code, response.json)
+
+
+def _mirror_enabled():
+    return getattr(settings, "FARMER_REGISTRY_MIRROR", True)
+
+
+def lookup_mirror(farmer_code):
+    """Reads the local FarmerRegistry mirror (one unique-index lookup)."""
+    from .models import FarmerRegistry
+
+    return (
+        FarmerRegistry.objects.filter(farmer_code=farmer_code)
+        .values(*FarmerRegistry.DETAIL_FIELDS)
+        .first()
+    )
+
+
+def store_mirror(farmer_code, details):
+    """Writes an API answer through to the mirror so other workers find it locally."""
+    from .models import FarmerRegistry
+
+    FarmerRegistry.objects.update_or_create(
+        farmer_code=farmer_code,
+        defaults={field: details.get(field) or "" for field in FarmerRegistry.DETAIL_FIELDS},
+    )
+
+
+def fetch_farmer_details(farmer_code):
+    """
+    Returns the external farmer record for ``farmer_code``, or None if the API
+    does not know it.
+
+    Looks in the in-process cache, the local FarmerRegistry mirror, then the
+    shared Django cache (when FARMER_API_CACHE_ALIAS is set) and only then
+    goes over the network.
+    """
+    details = local_cache.get(farmer_code)
+    if details is None and _mirror_enabled():
+        details = lookup_mirror(farmer_code)
+        if details is not None:
+            local_cache.set(farmer_code, details)
+    if details is None:
+        shared = _shared_cache()
+        if shared is not None:
+            details = shared.get(_cache_key(farmer_code))
+            if details is not None:
+                local_cache.set(farmer_code, details, ttl=_cache_ttl(details))
+    if details is None:
+        details = request_farmer_details(farmer_code)
+        _cache_store(farmer_code, details)
+        if details and _mirror_enabled():
+            store_mirror(farmer_code, details)
+    return details or None
+
+
+# Keyed by event loop: a client's connections belong to the loop that opened
+# them, and a client goes away with its loop.
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """
+    One pooled ``httpx.AsyncClient`` per event loop. An ASGI worker runs a
+    single loop, so in practice this is one client per process.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool_size = getattr(settings, "FARMER_API_POOL_SIZE", 10)
+        client = _async_clients[loop] = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=httpx.AsyncHTTPTransport(retries=1),
+        )
+    return client
+
+
+async def arequest_farmer_details(farmer_code):
+    """Async ``request_farmer_details``: awaits the API without holding a thread."""
+    timeout = httpx.Timeout(
+        getattr(settings, "FARMER_API_READ_TIMEOUT", 10),
+        connect=getattr(settings, "FARMER_API_CONNECT_TIMEOUT", 3),
+    )
+    try:
+        response = await get_async_client().get(f"{_api_url()}{farmer_code}", timeout=timeout)
+    except httpx.HTTPError as e:
+        raise ValidationError(f"Farmer lookup for {farmer_code} failed: {e}")
+    return _read_response(farmer_code, response.status_code, response.json)
+
+
+async def alookup_mirror(farmer_code):
+    from .models import FarmerRegistry
+
+    return await (
+        FarmerRegistry.objects.filter(farmer_code=farmer_code)
+        .values(*FarmerRegistry.DETAIL_FIELDS)
+        .afirst()
+    )
+
+
+async def afetch_farmer_details(farmer_code):
+    """Async ``fetch_farmer_details``, with the same cache, mirror and API order."""
+    details = local_cache.get(farmer_code)
+    if details is None and _mirror_enabled():
+        details = await alookup_mirror(farmer_code)
+        if details is not None:
+            local_cache.set(farmer_code, details)
+    shared = _shared_cache()
+    if details is None and shared is not None:
+        details = await shared.aget(_cache_key(farmer_code))
+        if details is not None:
+            local_cache.set(farmer_code, details, ttl=_cache_ttl(details))
+    if details is None:
+        details = await arequest_farmer_details(farmer_code)
+        local_cache.set(farmer_code, details, ttl=_cache_ttl(details))
+        if shared is not None:
+            await shared.aset(_cache_key(farmer_code), details, _cache_ttl(details))
+        if details and _mirror_enabled():
+            await sync_to_async(store_mirror)(farmer_code, details)
+    return details or None
+
+
+def invalidate(farmer_code):
+    local_cache.delete(farmer_code)
+    shared = _shared_cache()
+    if shared is not None:
+        shared.delete(_cache_key(farmer_code))
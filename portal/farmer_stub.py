@@ -0,0 +1,153 @@
+"""
+Local stand-in for the external farmer API, for tests and offline development.
+
+    with FarmerStubServer({"F001": {"first_name": "Ama", ...}}) as stub:
+        with override_settings(FARMER_API_URL=stub.url):
+            ...
+        assert stub.hits["F001"] == 1
+
+``GET /api/farmers/`` pages through the same farmers in the registry format
+``manage.py sync_farmer_registry`` reads (``results`` plus a ``next`` link,
+filtered by ``updated_since`` against each farmer's optional ``updated_at``).
+
+Run ``python -m portal.farmer_stub [port] [--delay SECONDS] [--any]`` to serve
+a few sample farmers; ``--any`` answers every code (for load tests) and
+``--delay`` makes each answer slow, like the real API on a bad day.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+SAMPLE_FARMERS = {
+    "FARM-0001": {
+        "first_name": "Kofi",
+        "surname": "Mensah",
+        "country": "Ghana",
+        "region": "Ashanti",
+        "district": "Amansie West",
+        "society_code": "SOC-001",
+        "risk_classification": "High",
+        "client": "TOUTON",
+    },
+    "FARM-0002": {
+        "first_name": "Ama",
+        "surname": "Owusu",
+        "country": "Ghana",
+        "region": "Western North",
+        "district": "Sefwi Wiawso",
+        "society_code": "SOC-014",
+        "risk_classification": "Low",
+        "client": "TOUTON",
+    },
+}
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class FarmerStubServer:
+    """Serves ``GET /api/farmer_details/<farmer_code>`` and ``GET /api/farmers/`` from an in-memory dict."""
+
+    path_prefix = "/api/farmer_details/"
+    registry_path = "/api/farmers/"
+
+    def __init__(self, farmers=None, host="127.0.0.1", port=0, delay=0, any_code=False):
+        self.farmers = dict(SAMPLE_FARMERS if farmers is None else farmers)
+        self.delay = delay
+        self.any_code = any_code
+        self.fail_with = None  # set to a status code to make every request fail with it
+        self.hits = Counter()
+        self.registry_queries = []  # query parameters of each registry page request
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if urlsplit(self.path).path == stub.registry_path:
+                    return self.send_json(200, stub.registry_page(self.path))
+                code = self.path[len(stub.path_prefix):] if self.path.startswith(stub.path_prefix) else None
+                stub.hits[code] += 1
+                if stub.delay:
+                    time.sleep(stub.delay)
+                farmer = stub.farmers.get(code)
+                if farmer is None and stub.any_code and code:
+                    farmer = dict(SAMPLE_FARMERS["FARM-0001"], society_code=f"SOC-{code}")
+                if stub.fail_with:
+                    self.send_json(stub.fail_with, {"error": "unavailable"})
+                elif farmer is None:
+                    self.send_json(404, {"error": "not found"})
+                else:
+                    self.send_json(200, farmer)
+
+            def send_json(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _Server((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{self.path_prefix}"
+
+    @property
+    def registry_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}{self.registry_path}"
+
+    def registry_page(self, path):
+        query = {key: values[0] for key, values in parse_qs(urlsplit(path).query).items()}
+        self.registry_queries.append(query)
+        records = [{"farmer_code": code, **farmer} for code, farmer in sorted(self.farmers.items())]
+        if "updated_since" in query:
+            since = datetime.fromisoformat(query["updated_since"])
+            records = [r for r in records if r.get("updated_at") and datetime.fromisoformat(r["updated_at"]) > since]
+        page, size = int(query.get("page", 1)), int(query.get("page_size", 100))
+        more = len(records) > page * size
+        return {
+            "results": records[(page - 1) * size:page * size],
+            "next": self.registry_url + "?" + urlencode({**query, "page": page + 1}) if more else None,
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a stand-in farmer API.")
+    parser.add_argument("port", nargs="?", type=int, default=8001)
+    parser.add_argument("--delay", type=float, default=0, help="Seconds to wait before each answer.")
+    parser.add_argument("--any", action="store_true", help="Answer every farmer code, not just the samples.")
+    options = parser.parse_args()
+    stub = FarmerStubServer(port=options.port, delay=options.delay, any_code=options.any)
+    print(f"Farmer API stub listening on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()
@@ -0,0 +1,212 @@
+"""
+Query-string grammar shared by every list endpoint.
+
+    ?region=Ashanti&district=Obuasi          filter by the interview's cover
+    ?enumerator_code=ENUM-0042
+    ?interview_start_time__gte=2025-01-01    range lookups: gt, gte, lt, lte
+    ?end_time__lt=2025-02-01T00:00:00Z
+    ?child_gender=Girl&child_year_birth__in=2010,2011
+    ?fields=id,farmer_code                   return only these keys
+    ?ordering=-interview_start_time          one field, "-" for descending
+    ?ids=1,2,3                               keyed batch lookup (portal/batch.py)
+
+Any concrete column of the listed table can be filtered on. Cover columns
+(region, district, society_code, enumerator_code, farmer_code) and consent
+columns (interview_start_time, community_type) also work on every table
+below them in the interview. They are joined through the foreign keys, so
+the database uses the indexes on those tables. Unknown parameters are
+rejected rather than ignored, so a typo cannot turn into a full-table
+download.
+"""
+from datetime import datetime
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.utils import timezone
+from multiselectfield import MultiSelectField
+
+from .interview import INTERVIEW_TREE
+from .models import ConsentLocation_tbl, Cover_tbl
+
+# Handled by pagination/streaming rather than by the filters.
+RESERVED_PARAMS = {"cursor", "page_size", "stream", "fields", "ordering", "ids", "format"}
+
+COVER_FIELDS = ("region", "district", "society_code", "enumerator_code", "farmer_code")
+CONSENT_FIELDS = ("interview_start_time", "community_type")
+LOOKUPS = ("exact", "in", "gt", "gte", "lt", "lte")
+
+# Column types that compare meaningfully from a query-string value.
+FILTERABLE_TYPES = {
+    "AutoField", "BigAutoField", "BigIntegerField", "BooleanField", "CharField",
+    "DateField", "DateTimeField", "DecimalField", "FloatField", "ForeignKey",
+    "IntegerField", "OneToOneField", "PositiveIntegerField",
+    "PositiveSmallIntegerField", "SmallIntegerField", "TextField", "UUIDField",
+}
+
+
+class InvalidQuery(ValueError):
+    """Raised for a list query parameter we cannot translate into a filter."""
+
+
+@lru_cache(maxsize=None)
+def _ancestor_paths():
+    """``{model: {ancestor model: ORM path prefix}}`` for every table in the interview tree."""
+    paths = {Cover_tbl: {Cover_tbl: ""}}
+
+    def walk(tree, parent):
+        for _, model, fk_name, subtree in tree:
+            paths[model] = {ancestor: f"{fk_name}__{prefix}" for ancestor, prefix in paths[parent].items()}
+            paths[model][model] = ""
+            walk(subtree, model)
+
+    walk(INTERVIEW_TREE, Cover_tbl)
+    return paths
+
+
+def _is_filterable(field):
+    return field.get_internal_type() in FILTERABLE_TYPES and not isinstance(field, MultiSelectField)
+
+
+@lru_cache(maxsize=None)
+def filterable_fields(model):
+    """``{query param name: (ORM path, model field)}`` for ``model``."""
+    fields = {}
+    ancestors = _ancestor_paths().get(model, {})
+    for ancestor, names in ((Cover_tbl, COVER_FIELDS), (ConsentLocation_tbl, CONSENT_FIELDS)):
+        if ancestor in ancestors:
+            for name in names:
+                fields[name] = (ancestors[ancestor] + name, ancestor._meta.get_field(name))
+    for field in model._meta.concrete_fields:
+        if _is_filterable(field):
+            fields[field.attname] = (field.attname, field)
+            fields[field.name] = (field.attname, field)
+    return fields
+
+
+def _to_python(field, raw, param):
+    try:
+        value = field.to_python(raw)
+    except ValidationError as e:
+        raise InvalidQuery(f"{param}: {' '.join(e.messages)}")
+    if isinstance(value, datetime) and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def filter_queryset(request, queryset):
+    """Applies every non-reserved query parameter as a filter on ``queryset``."""
+    fields = filterable_fields(queryset.model)
+    filters = {}
+    for param, raw in request.GET.items():
+        if param in RESERVED_PARAMS:
+            continue
+        name, _, lookup = param.rpartition("__")
+        if lookup not in LOOKUPS:
+            name, lookup = param, "exact"
+        if name not in fields:
+            raise InvalidQuery(f"Unknown filter: {param}")
+        path, field = fields[name]
+        if lookup == "in":
+            filters[f"{path}__in"] = [_to_python(field, value, param) for value in raw.split(",") if value]
+        else:
+            filters[f"{path}__{lookup}"] = _to_python(field, raw, param)
+    return queryset.filter(**filters) if filters else queryset
+
+
+def joined_tables(request, model):
+    """
+    The ancestor tables that the query's filters join through, nearest
+    first. Which rows of ``model`` match depends on their rows as well.
+    """
+    ancestors = _ancestor_paths().get(model, {})
+    fields = filterable_fields(model)
+    depth = 0
+    for param in request.GET:
+        if param in RESERVED_PARAMS:
+            continue
+        name, _, lookup = param.rpartition("__")
+        if lookup not in LOOKUPS:
+            name = param
+        if name in fields and fields[name][1].model is not model:
+            depth = max(depth, len(ancestors[fields[name][1].model]))
+    # Prefixes along one chain nest, so shorter ones are the tables in between.
+    return [ancestor for ancestor, prefix in sorted(ancestors.items(), key=lambda item: len(item[1])) if 0 < len(prefix) <= depth]
+
+
+def get_ordering(request, model):
+    """
+    Reads ``?ordering=[-]field`` and returns ``(field, descending)``, or None for the
+    default id order. Only non-null columns of the table itself can be used,
+    since the keyset cursor needs a value on every row.
+    """
+    ordering = request.GET.get("ordering")
+    if not ordering:
+        return None
+    descending = ordering.startswith("-")
+    name = ordering.lstrip("-")
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        raise InvalidQuery(f"Cannot order by {name}")
+    if not field.concrete or field.is_relation or field.null or not _is_filterable(field):
+        raise InvalidQuery(f"Cannot order by {name}")
+    return field.name, descending
+
+
+def get_fields(request):
+    """Reads ``?fields=a,b`` into a list, or None when every field is wanted."""
+    fields = request.GET.get("fields")
+    if not fields:
+        return None
+    return [name for name in fields.split(",") if name]
+
+
+def project_queryset(queryset, fields, ordering=None):
+    """
+    Checks the ``fields`` names and narrows ``.values()`` querysets to them.
+
+    ``.values()`` querysets are re-projected with ``.values(*fields)``; ``id``
+    and the ordering column are always loaded because the pagination cursor
+    is built from them. Model querysets are left whole: their rows go through
+    a serialize function that reads every column, and each column deferred
+    by ``.only()`` would cost a query per row. ``trim`` drops the extra keys.
+    """
+    model = queryset.model
+    required = ["id"] + ([ordering[0]] if ordering else [])
+    if queryset._fields is not None:
+        available = set(queryset._fields) or {f.attname for f in model._meta.concrete_fields}
+        wanted = fields or list(queryset._fields)
+        unknown = [name for name in wanted if name not in available]
+        if unknown:
+            raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+        if not wanted:
+            return queryset
+        return queryset.values(*dict.fromkeys(wanted + required))
+
+    if not fields:
+        return queryset
+    known = {f.attname for f in model._meta.concrete_fields} | {f.name for f in model._meta.concrete_fields}
+    unknown = [name for name in fields if name not in known]
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+    return queryset
+
+
+def apply_list_params(request, queryset):
+    """
+    Applies the filters, ``?ordering=`` and ``?fields=`` to a list queryset.
+    Returns ``(queryset, ordering, fields)``; pass ``fields`` to ``trim`` once
+    the cursor has been built, since rows may carry more keys than were asked for.
+    """
+    ordering = get_ordering(request, queryset.model)
+    fields = get_fields(request)
+    queryset = filter_queryset(request, queryset)
+    queryset = project_queryset(queryset, fields, ordering)
+    return queryset, ordering, fields
+
+
+def trim(row, fields):
+    """Drops keys not asked for in ``?fields=`` from a serialized row."""
+    if fields is None:
+        return row
+    return {key: value for key, value in row.items() if key in fields}
@@ -0,0 +1,166 @@
+"""
+Idempotency keys for POST handlers.
+
+Tablets send an ``Idempotency-Key`` header (any unique string, usually a
+UUID) with each create. The first request with a key runs the view and
+stores its response; a retry with the same key and body gets the stored
+response back, marked ``Idempotent-Replayed: true``, without touching the
+survey tables. Reusing a key for a different body is a 422, and a retry that
+arrives while the first request is still running is a 409. A request still
+marked running after IDEMPOTENCY_IN_PROGRESS_TIMEOUT seconds is taken to
+have died with its worker, and the next retry runs the view again.
+
+Multipart bodies (photo uploads) are fingerprinted from their form fields
+and a streamed hash of each file rather than from ``request.body``, which
+Django refuses to load past DATA_UPLOAD_MAX_MEMORY_SIZE.
+
+Keys are scoped to the request path and kept for IDEMPOTENCY_KEY_TTL
+seconds; ``manage.py purge_idempotency_keys`` deletes expired ones.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def get_ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+
+def get_in_progress_timeout():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_IN_PROGRESS_TIMEOUT", 300))
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(b"\n")
+    digest.update(request.path.encode())
+    digest.update(b"\n")
+    if request.content_type == "multipart/form-data":
+        for name, values in sorted(request.POST.lists()):
+            digest.update(json.dumps([name, values]).encode())
+        for name, files in sorted(request.FILES.lists()):
+            for upload in files:
+                digest.update(json.dumps([name, upload.name, upload.size]).encode())
+                for chunk in upload.chunks():
+                    digest.update(chunk)
+    else:
+        digest.update(request.body)
+    return digest.hexdigest()
+
+
+def replay(record):
+    response = HttpResponse(bytes(record.response_body), status=record.status_code, content_type=record.content_type or None)
+    response[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _claim(key, path, fingerprint):
+    """
+    Returns ``(record, created)``. A single indexed lookup on (key, path) when
+    the key has been seen; otherwise inserts the in-progress placeholder.
+    """
+    record = IdempotencyKey.objects.filter(key=key, path=path).first()
+    now = timezone.now()
+    if record is not None and (
+        record.created_at < now - get_ttl()
+        or (record.status_code is None and record.created_at < now - get_in_progress_timeout())
+    ):
+        # Expired, or its request died without recording a response.
+        record.delete()
+        record = None
+    if record is not None:
+        return record, False
+    try:
+        with transaction.atomic():
+            return IdempotencyKey.objects.create(key=key, path=path, fingerprint=fingerprint), True
+    except IntegrityError:
+        # Another worker claimed the key between our lookup and insert.
+        return IdempotencyKey.objects.get(key=key, path=path), False
+
+
+def _begin(request, key):
+    """
+    Returns ``(response, record)``: a response to send straight back (replay,
+    conflict or error), or the freshly claimed record to complete after the view runs.
+    """
+    if len(key) > 255:
+        return JsonResponse({"error": f"{HEADER} must be at most 255 characters"}, status=400), None
+    fingerprint = request_fingerprint(request)
+    record, created = _claim(key, request.path, fingerprint)
+    if created:
+        return None, record
+    if record.fingerprint != fingerprint:
+        return JsonResponse({"error": f"{HEADER} was already used for a different request"}, status=422), None
+    if record.status_code is None:
+        return JsonResponse({"error": "A request with this Idempotency-Key is still in progress"}, status=409), None
+    return replay(record), None
+
+
+def _finish(record, response):
+    if response.status_code >= 500 or response.streaming:
+        # Let the client retry server errors with the same key.
+        record.delete()
+        return
+    # An update rather than save(): a retry may have taken over the key while we ran.
+    IdempotencyKey.objects.filter(pk=record.pk).update(
+        status_code=response.status_code,
+        content_type=response.get("Content-Type", ""),
+        response_body=response.content,
+    )
+
+
+def idempotent(view_func):
+    """
+    Makes POSTs to ``view_func`` safe to retry when the client sends an
+    Idempotency-Key. Other methods, and POSTs without the header, pass through.
+    Works on both sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if request.method != "POST" or not key:
+                return await view_func(request, *args, **kwargs)
+            early, record = await sync_to_async(_begin)(request, key)
+            if early is not None:
+                return early
+            try:
+                response = await view_func(request, *args, **kwargs)
+            except Exception:
+                await record.adelete()
+                raise
+            await sync_to_async(_finish)(record, response)
+            return response
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if request.method != "POST" or not key:
+            return view_func(request, *args, **kwargs)
+        early, record = _begin(request, key)
+        if early is not None:
+            return early
+        try:
+            response = view_func(request, *args, **kwargs)
+        except Exception:
+            record.delete()
+            raise
+        _finish(record, response)
+        return response
+
+    return wrapper
@@ -0,0 +1,198 @@
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Prefetch
+
+from .models import (
+    Cover_tbl,
+    ConsentLocation_tbl,
+    FarmerIdentification_OwnerIdentificationTbl,
+    FarmerIdentification_Info_OnVisit_tbl,
+    WorkersInTheFarmTbl,
+    AdultInHouseholdTbl,
+    ChildHouseholdDetailsTbl,
+    AdultHouseholdMember,
+    ChildrenInHouseholdTbl,
+    ChildInHouseholdTbl,
+    ChildEducationDetailsTbl,
+    ChildRemediationTbl,
+    HouseholdSensitizationTbl,
+    EndOfCollection,
+)
+from .signals import bulk_saved
+
+# The household interview as a tree hanging off Cover_tbl.
+# Each node is (related_name, model, name of the FK pointing at the parent, children).
+# Payload keys are the related_names, so a submitted tree has the same shape
+# as the one returned by GET /api/interview/<cover_id>/.
+INTERVIEW_TREE = (
+    ("consent_location", ConsentLocation_tbl, "cover", (
+        ("farmer_identification", FarmerIdentification_Info_OnVisit_tbl, "identification_on_visit", (
+            ("owner_identification", FarmerIdentification_OwnerIdentificationTbl, "owner_identification", ()),
+            ("worker_in_farm", WorkersInTheFarmTbl, "workers_in_farm", ()),
+        )),
+        ("adult_in_household", AdultInHouseholdTbl, "consent", (
+            ("members", AdultHouseholdMember, "household", ()),
+        )),
+        ("child_in_household", ChildrenInHouseholdTbl, "consent", (
+            ("children", ChildInHouseholdTbl, "household", (
+                ("child_household_details", ChildHouseholdDetailsTbl, "child_in_household", ()),
+                ("education_details", ChildEducationDetailsTbl, "child", ()),
+            )),
+        )),
+        ("child_remediation", ChildRemediationTbl, "consent", ()),
+        ("household_sensitization", HouseholdSensitizationTbl, "consent", (
+            ("end_of_collection", EndOfCollection, "sensitization", ()),
+        )),
+    )),
+)
+
+
+class SubmissionError(Exception):
+    """A submitted payload failed validation. ``errors`` maps a row path to its messages."""
+
+    def __init__(self, errors):
+        super().__init__("Submission failed validation")
+        self.errors = errors
+
+
+def field_values(model, data, exclude=()):
+    """
+    Picks the concrete, non-pk fields of ``model`` out of a JSON dict, keyed by attname.
+    Foreign keys may be given by field name or attname (``consent`` or ``consent_id``).
+    """
+    values = {}
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.name in exclude:
+            continue
+        if field.name in data:
+            values[field.attname] = data[field.name]
+        elif field.attname in data:
+            values[field.attname] = data[field.attname]
+    return values
+
+
+def build_instance(model, data, exclude=()):
+    """Builds an unsaved ``model`` from a JSON dict, keeping only concrete fields."""
+    return model(**field_values(model, data, exclude))
+
+
+def validation_messages(error):
+    return error.message_dict if hasattr(error, "error_dict") else error.messages
+
+
+def _validate(instance, path, errors, exclude=()):
+    try:
+        instance.full_clean(exclude=list(exclude), validate_unique=False)
+    except ValidationError as e:
+        errors[path] = validation_messages(e)
+
+
+def submit_interview(payload):
+    """
+    Writes a whole household interview in one transaction.
+
+    Every table is written with a single ``bulk_create`` (PostgreSQL returns
+    the new ids), so a full interview costs one INSERT per table no matter how
+    many household members or children it holds. Nodes may carry a
+    ``client_id``; the result maps those to the server ids, per table:
+
+        {"cover": {"c1": 12}, "children": {"k1": 301, "k2": 302}, ...}
+
+    Raises SubmissionError with a dict of ``path -> errors`` if any node is
+    invalid; nothing is written in that case.
+    """
+    errors = {}
+    cover = build_instance(Cover_tbl, payload)
+    _validate(cover, "cover", errors)
+
+    tree_levels = []
+    _walk(INTERVIEW_TREE, [("cover", payload)], tree_levels, errors)
+    if errors:
+        raise SubmissionError(errors)
+
+    id_map = {}
+    with transaction.atomic():
+        cover.save()
+        _record_ids(id_map, "cover", [(payload, cover)])
+        saved = {"cover": [cover]}
+        for key, model, fk_name, nodes, parent_key in tree_levels:
+            parents = saved[parent_key]
+            instances = []
+            for parent_index, item, instance in nodes:
+                setattr(instance, fk_name, parents[parent_index])
+                instances.append(instance)
+            model.objects.bulk_create(instances)
+            bulk_saved.send(sender=model, instances=instances, created=True)
+            saved[key] = instances
+            _record_ids(id_map, key, [(item, instance) for _, item, instance in nodes])
+    return cover, id_map
+
+
+def _walk(tree, parents, levels, errors, parent_key="cover"):
+    """
+    Flattens the payload into one entry per table, parents before children:
+    ``(key, model, fk_name, [(parent_index, item, instance)], parent_key)``.
+    """
+    for key, model, fk_name, subtree in tree:
+        nodes = []
+        children = []
+        for parent_index, (parent_path, parent_data) in enumerate(parents):
+            items = parent_data.get(key) or []
+            if isinstance(items, dict):
+                items = [items]
+            for i, item in enumerate(items):
+                path = f"{parent_path}.{key}[{i}]"
+                instance = build_instance(model, item, exclude=(fk_name,))
+                _validate(instance, path, errors, exclude=(fk_name,))
+                nodes.append((parent_index, item, instance))
+                children.append((path, item))
+        if not nodes:
+            continue
+        levels.append((key, model, fk_name, nodes, parent_key))
+        if subtree:
+            _walk(subtree, children, levels, errors, parent_key=key)
+
+
+def _record_ids(id_map, key, pairs):
+    ids = {str(item["client_id"]): instance.pk for item, instance in pairs if item.get("client_id") is not None}
+    if ids:
+        id_map.setdefault(key, {}).update(ids)
+
+
+def prefetch_lookups(tree=INTERVIEW_TREE, prefix=""):
+    """One ``Prefetch`` per table in ``tree``, each ordered by id."""
+    lookups = []
+    for key, model, _, subtree in tree:
+        path = prefix + key
+        lookups.append(Prefetch(path, queryset=model.objects.order_by("id")))
+        lookups.extend(prefetch_lookups(subtree, path + "__"))
+    return lookups
+
+
+def serialize_row(instance):
+    """Concrete columns keyed by attname, like ``.values()``; files become their URL."""
+    row = {}
+    for field in instance._meta.concrete_fields:
+        value = field.value_from_object(instance)
+        if isinstance(field, models.FileField):
+            value = value.url if value else None
+        row[field.attname] = value
+    return row
+
+
+def _serialize_tree(instance, tree):
+    row = serialize_row(instance)
+    for key, _, _, subtree in tree:
+        row[key] = [_serialize_tree(child, subtree) for child in getattr(instance, key).all()]
+    return row
+
+
+def get_interview(cover_id):
+    """
+    Loads a whole household interview as nested dicts, in the shape
+    ``submit_interview`` accepts. Costs one query per table in
+    INTERVIEW_TREE plus one for the cover, however large the household.
+    Raises Cover_tbl.DoesNotExist.
+    """
+    cover = Cover_tbl.objects.prefetch_related(*prefetch_lookups()).get(pk=cover_id)
+    return _serialize_tree(cover, INTERVIEW_TREE)
@@ -0,0 +1,197 @@
+"""
+A database-backed job queue for slow side effects.
+
+Work that doesn't need to finish before the response (farmer enrichment,
+image re-encoding, file deletes, report rebuilds) is queued as a
+BackgroundJob row with ``enqueue()``. The row is written in the caller's
+transaction, so a job exists exactly when the write that asked for it
+committed. No broker is needed.
+
+``manage.py run_jobs`` runs a worker. Run as many as you like: each claims
+the oldest due job with ``SELECT ... FOR UPDATE SKIP LOCKED``, so workers
+never take the same job. A task that raises is retried with exponential
+backoff (JOB_RETRY_BASE_SECONDS, doubling up to JOB_RETRY_MAX_SECONDS)
+until ``max_attempts``; raising ``PermanentFailure`` fails it at once.
+While a job runs, its worker refreshes ``locked_at`` every
+JOB_HEARTBEAT_SECONDS. A running job whose heartbeat stopped for
+JOB_TIMEOUT_SECONDS belonged to a worker that died: it is requeued, or
+failed if it has used up its attempts (it may be what kills the worker).
+``GET /api/jobs/<id>/`` reports a job's status to staff and to the user
+whose request queued it (recorded by JobRequesterMiddleware).
+
+Tasks are plain functions registered with ``@task("name")`` (see
+portal/tasks.py). They take the payload as keyword arguments, so payloads
+must be JSON. With JOB_BACKEND = "inline", the default, each job runs
+in-process right after the transaction commits, so nothing is left queued
+when no worker is running. Set JOB_BACKEND = "database" once ``run_jobs``
+workers are deployed.
+"""
+import logging
+import os
+import socket
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+_tasks = {}
+_requester = ContextVar("portal_job_requester", default=None)
+
+
+class PermanentFailure(Exception):
+    """Raised by a task when retrying cannot help, e.g. the farmer code does not exist."""
+
+
+def task(name):
+    """Registers the decorated function as the task called ``name``."""
+    def decorator(func):
+        _tasks[name] = func
+        return func
+
+    return decorator
+
+
+class JobRequesterMiddleware:
+    """Remembers the request's user, so jobs queued while serving it record who asked."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _requester.set(request.user)
+        try:
+            return self.get_response(request)
+        finally:
+            _requester.reset(token)
+
+
+def _requested_by():
+    user = _requester.get()
+    # request.user is lazy: only jobs queued by a request load it.
+    return user if user is not None and user.is_authenticated else None
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def enqueue(name, payload=None, delay=0, max_attempts=None):
+    """Queues a run of task ``name`` with ``payload`` as its keyword arguments. Returns the job."""
+    if name not in _tasks:
+        raise ValueError(f"Unknown task: {name}")
+    job = BackgroundJob.objects.create(
+        name=name,
+        payload=payload or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or getattr(settings, "JOB_MAX_ATTEMPTS", 5),
+        requested_by=_requested_by(),
+    )
+    if getattr(settings, "JOB_BACKEND", "inline") == "inline":
+        transaction.on_commit(lambda: run_claimed(_claim(BackgroundJob.objects.filter(pk=job.pk), worker_name())))
+    return job
+
+
+def backoff(attempts):
+    base = getattr(settings, "JOB_RETRY_BASE_SECONDS", 10)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), getattr(settings, "JOB_RETRY_MAX_SECONDS", 3600)))
+
+
+def _claim(queryset, worker):
+    now = timezone.now()
+    with transaction.atomic():
+        job = queryset.select_for_update(skip_locked=True).filter(status=BackgroundJob.QUEUED).first()
+        if job is None:
+            return None
+        job.status = BackgroundJob.RUNNING
+        job.attempts += 1
+        job.locked_by = worker
+        job.locked_at = now
+        job.save(update_fields=["status", "attempts", "locked_by", "locked_at"])
+    return job
+
+
+def claim(worker):
+    """Marks the oldest due job as running for ``worker`` and returns it, or None if nothing is due."""
+    due = BackgroundJob.objects.filter(run_after__lte=timezone.now()).order_by("run_after", "id")
+    return _claim(due, worker)
+
+
+def beat(job):
+    """Marks a running job as still alive."""
+    BackgroundJob.objects.filter(pk=job.pk, status=BackgroundJob.RUNNING, locked_by=job.locked_by).update(locked_at=timezone.now())
+
+
+@contextmanager
+def heartbeat(job):
+    """Calls ``beat(job)`` from a separate thread, on its own connection, until the block exits."""
+    stop = threading.Event()
+
+    def run():
+        try:
+            while not stop.wait(getattr(settings, "JOB_HEARTBEAT_SECONDS", 60)):
+                beat(job)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name=f"heartbeat-{job.pk}", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_claimed(job):
+    """Runs a claimed job and records the outcome: done, queued again for a retry, or failed."""
+    if job is None:
+        return None
+    func = _tasks.get(job.name)
+    try:
+        if func is None:
+            raise PermanentFailure(f"Unknown task: {job.name}")
+        with heartbeat(job), transaction.atomic():
+            func(**job.payload)
+    except Exception as e:
+        job.last_error = f"{type(e).__name__}: {e}"
+        if isinstance(e, PermanentFailure) or job.attempts >= job.max_attempts:
+            job.status = BackgroundJob.FAILED
+            job.finished_at = timezone.now()
+            logger.exception("Job %s failed", job)
+        else:
+            job.status = BackgroundJob.QUEUED
+            job.run_after = timezone.now() + backoff(job.attempts)
+            logger.warning("Job %s failed, retrying at %s", job, job.run_after, exc_info=True)
+    else:
+        job.status = BackgroundJob.DONE
+        job.finished_at = timezone.now()
+        job.last_error = ""
+    job.locked_by = ""
+    job.save(update_fields=["status", "finished_at", "last_error", "run_after", "locked_by"])
+    return job
+
+
+def requeue_stale():
+    """
+    Puts back jobs whose worker stopped heartbeating without recording an
+    outcome, and fails those with no attempts left. Returns how many were requeued.
+    """
+    now = timezone.now()
+    stale = BackgroundJob.objects.filter(
+        status=BackgroundJob.RUNNING, locked_at__lt=now - timedelta(seconds=getattr(settings, "JOB_TIMEOUT_SECONDS", 600))
+    )
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=BackgroundJob.FAILED, locked_by="", finished_at=now, last_error="Worker stopped while running the job",
+    )
+    if failed:
+        logger.error("Failed %s job(s) whose worker stopped on their last attempt", failed)
+    return stale.update(status=BackgroundJob.QUEUED, locked_by="", run_after=now)
@@ -0,0 +1,27 @@
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from portal.storage import BLOB_DIR, ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = (
+        "Move media files saved before content-addressed storage was enabled "
+        "into the blob store, so identical files share one copy on disk."
+    )
+
+    def handle(self, *args, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError("The default storage is not ContentAddressedStorage (see MEDIA_DEDUPLICATE).")
+        root = default_storage.location
+        checked = shared = 0
+        for directory, subdirs, files in os.walk(root):
+            if directory == root and BLOB_DIR in subdirs:
+                subdirs.remove(BLOB_DIR)
+            for filename in files:
+                name = os.path.relpath(os.path.join(directory, filename), root)
+                shared += default_storage.adopt(name)
+                checked += 1
+        self.stdout.write(self.style.SUCCESS(f"{checked} files checked, {shared} duplicates now share a blob"))
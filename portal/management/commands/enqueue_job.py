@@ -0,0 +1,21 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import jobs
+
+
+class Command(BaseCommand):
+    help = 'Queue a background job, e.g. "enqueue_job reports.rebuild" from cron for the nightly rebuild.'
+
+    def add_arguments(self, parser):
+        parser.add_argument("name")
+        parser.add_argument("--payload", default="{}", help="Task keyword arguments as a JSON object.")
+        parser.add_argument("--delay", type=int, default=0, help="Seconds to wait before the job may run.")
+
+    def handle(self, *args, **options):
+        try:
+            job = jobs.enqueue(options["name"], json.loads(options["payload"]), delay=options["delay"])
+        except (ValueError, TypeError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Queued {job}"))
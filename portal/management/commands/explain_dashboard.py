@@ -0,0 +1,132 @@
+import json
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from portal.models import (
+    ChildInHouseholdTbl,
+    ChildrenInHouseholdTbl,
+    ConsentLocation_tbl,
+    Cover_tbl,
+    FarmerChild,
+)
+
+REGIONS = ["Ashanti", "Western", "Western North", "Central", "Eastern", "Bono", "Bono East", "Ahafo", "Volta", "Oti"]
+SCAN_NODES = ("Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Index Scan")
+
+
+def dashboard_queries():
+    """The filters the dashboard and field reports run, by name."""
+    since = timezone.now() - timedelta(days=30)
+    return {
+        "covers by region/district": Cover_tbl.objects.filter(region="Ashanti", district="Ashanti-3"),
+        "covers by society": Cover_tbl.objects.filter(society_code="SOC-0007"),
+        "covers by enumerator": Cover_tbl.objects.filter(enumerator_code="ENUM-00042"),
+        "consents in last 30 days": ConsentLocation_tbl.objects.filter(interview_start_time__gte=since),
+        "consents by community and date": ConsentLocation_tbl.objects.filter(community_type="Camp", interview_start_time__gte=since),
+        "unavailable farmers": ConsentLocation_tbl.objects.filter(farmer_available="No", interview_start_time__gte=since),
+        "children by gender and birth year": ChildInHouseholdTbl.objects.filter(child_gender="Girl", child_year_birth__range=(2010, 2012)),
+        "unavailable children": ChildInHouseholdTbl.objects.filter(child_can_be_surveyed="no"),
+    }
+
+
+def scans(plan):
+    """Yields (node type, relation or index) for every scan node in a JSON plan."""
+    if plan.get("Node Type") in SCAN_NODES:
+        yield plan["Node Type"], plan.get("Index Name") or plan.get("Relation Name")
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the dashboard queries and report which scan each one uses. "
+        "Use --seed to run against synthetic rows (rolled back afterwards)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic interviews before explaining.")
+        parser.add_argument("--analyze", action="store_true", help="Run EXPLAIN ANALYZE and report execution times.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("explain_dashboard reads PostgreSQL JSON plans.")
+
+        with transaction.atomic():
+            if options["seed"]:
+                started = time.perf_counter()
+                self.seed(options["seed"])
+                with connection.cursor() as cursor:
+                    for model in (Cover_tbl, ConsentLocation_tbl, ChildInHouseholdTbl):
+                        cursor.execute(f'ANALYZE "{model._meta.db_table}"')
+                self.stdout.write(f"Seeded {options['seed']} interviews in {time.perf_counter() - started:.1f}s")
+
+            seq_scans = 0
+            for name, queryset in dashboard_queries().items():
+                plan = json.loads(queryset.explain(format="json", analyze=options["analyze"]))[0]
+                found = list(scans(plan["Plan"]))
+                seq_scans += sum(node == "Seq Scan" for node, _ in found)
+                line = f"{name:<36} " + ", ".join(f"{node} on {target}" for node, target in found)
+                if options["analyze"]:
+                    line += f"  ({plan['Execution Time']:.2f} ms)"
+                self.stdout.write(line)
+
+            # Never keep the synthetic rows.
+            transaction.set_rollback(True)
+
+        style = self.style.SUCCESS if seq_scans == 0 else self.style.WARNING
+        self.stdout.write(style(f"{seq_scans} sequential scan(s)"))
+
+    def seed(self, count):
+        rng = random.Random(0)
+        now = timezone.now()
+        child = FarmerChild.objects.create(name="Benchmark")
+        covers = Cover_tbl.objects.bulk_create(
+            Cover_tbl(
+                enumerator_name="Benchmark",
+                enumerator_code=f"BENCH-ENUM-{i:07d}",
+                farmer_code=f"BENCH-FARM-{i:07d}",
+                society_code=f"SOC-{rng.randrange(400):04d}",
+                region=(region := rng.choice(REGIONS)),
+                district=f"{region}-{rng.randrange(12)}",
+                FarmerChild=child,
+            )
+            for i in range(count)
+        )
+        consents = ConsentLocation_tbl.objects.bulk_create(
+            ConsentLocation_tbl(
+                cover=cover,
+                interview_start_time=now - timedelta(minutes=rng.randrange(2 * 365 * 24 * 60)),
+                gps_point="0,0",
+                community_type=rng.choice(["Town", "Village", "Camp"]),
+                farmer_resides_in_community="Yes",
+                farmer_available="No" if rng.random() < 0.05 else "Yes",
+            )
+            for cover in covers
+        )
+        households = ChildrenInHouseholdTbl.objects.bulk_create(
+            ChildrenInHouseholdTbl(consent=consent, children_present="Yes", num_children_5_to_17=3)
+            for consent in consents
+        )
+        ChildInHouseholdTbl.objects.bulk_create(
+            (
+                ChildInHouseholdTbl(
+                    household=household,
+                    child_declared_in_cover="yes",
+                    child_identifier=n + 1,
+                    child_can_be_surveyed="no" if rng.random() < 0.1 else "yes",
+                    child_first_name="Bench",
+                    child_surname="Mark",
+                    child_gender=rng.choice(["Boy", "Girl"]),
+                    child_year_birth=rng.randrange(2007, 2021),
+                    child_birth_certificate="Yes",
+                )
+                for household in households
+                for n in range(3)
+            ),
+            batch_size=5000,
+        )
@@ -0,0 +1,37 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portal import export
+from portal.routers import replica_reads
+
+
+class Command(BaseCommand):
+    help = (
+        "Write survey tables, or the flattened per-child sheet (\"children\"), "
+        "to Parquet or gzip CSV files for analysts. Rows are streamed in "
+        "EXPORT_CHUNK_SIZE chunks from the replica when one is configured."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("sources", nargs="*", help=f"Tables to export (default: all). One of: {', '.join(export.sources())}")
+        parser.add_argument("--format", choices=list(export.FORMATS), default="parquet")
+        parser.add_argument("--output-dir", default="exports")
+
+    def handle(self, *args, **options):
+        names = options["sources"] or export.sources()
+        fmt = options["format"]
+        os.makedirs(options["output_dir"], exist_ok=True)
+        with replica_reads():
+            for name in names:
+                try:
+                    queryset, columns = export.get_source(name)
+                    chunks = export.iter_export(queryset, columns, fmt)
+                except export.ExportError as e:
+                    raise CommandError(str(e))
+                path = os.path.join(options["output_dir"], name + export.FORMATS[fmt][1])
+                with open(path, "wb") as f:
+                    for chunk in chunks:
+                        f.write(chunk)
+                self.stdout.write(f"{name}: {path}")
+        self.stdout.write(self.style.SUCCESS(f"{len(names)} exports written to {options['output_dir']}"))
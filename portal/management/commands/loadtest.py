@@ -0,0 +1,77 @@
+import asyncio
+import itertools
+import statistics
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire concurrent requests at one or more running URLs and compare throughput "
+        "and latency. Typical comparison of the sync (WSGI) and async (ASGI) paths "
+        "against a slow farmer API:\n"
+        "  python -m portal.farmer_stub 8001 --any --delay 0.5\n"
+        "  FARMER_API_URL=http://127.0.0.1:8001/api/farmer_details/ FARMER_REGISTRY_MIRROR=False \\\n"
+        "    gunicorn gatherflow.wsgi -b :8000 -w 1 --threads 8\n"
+        "  FARMER_API_URL=... uvicorn gatherflow.asgi:application --port 8002 --workers 1\n"
+        "  manage.py loadtest http://127.0.0.1:8000/api/cover/ http://127.0.0.1:8002/api/async/cover/ \\\n"
+        "    --method POST --body '{\"enumerator_name\": \"Load\", \"farmer_code\": \"LT-{n}\", \"FarmerChild\": 1}'"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+")
+        parser.add_argument("--requests", type=int, default=200, help="Requests per URL.")
+        parser.add_argument("--concurrency", type=int, default=50)
+        parser.add_argument("--method", default="GET")
+        parser.add_argument("--body", help="JSON body; {n} is replaced by a unique number per request.")
+        parser.add_argument("--timeout", type=float, default=60)
+
+    def handle(self, *args, **options):
+        counter = itertools.count(time.time_ns() // 1000)
+        for url in options["urls"]:
+            try:
+                result = asyncio.run(self.run(url, options, counter))
+            except httpx.HTTPError as e:
+                raise CommandError(f"{url}: {e}")
+            self.report(url, *result)
+
+    async def run(self, url, options, counter):
+        semaphore = asyncio.Semaphore(options["concurrency"])
+        latencies, statuses = [], []
+        limits = httpx.Limits(max_connections=options["concurrency"])
+
+        async with httpx.AsyncClient(timeout=options["timeout"], limits=limits) as client:
+            async def one():
+                body = options["body"].replace("{n}", str(next(counter))) if options["body"] else None
+                async with semaphore:
+                    started = time.perf_counter()
+                    try:
+                        response = await client.request(
+                            options["method"], url, content=body,
+                            headers={"Content-Type": "application/json"} if body else None,
+                        )
+                        statuses.append(response.status_code)
+                    except httpx.TransportError as e:
+                        statuses.append(type(e).__name__)
+                    latencies.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(options["requests"])))
+            elapsed = time.perf_counter() - started
+        return latencies, statuses, elapsed
+
+    def report(self, url, latencies, statuses, elapsed):
+        latencies = sorted(latencies)
+        cuts = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        errors = [s for s in statuses if not isinstance(s, int) or s >= 400]
+        self.stdout.write(
+            f"{url}\n"
+            f"  {len(statuses)} requests in {elapsed:.2f}s = {len(statuses) / elapsed:.1f} req/s, "
+            f"{len(errors)} errors\n"
+            f"  latency p50 {cuts[49] * 1000:.0f} ms, p95 {cuts[94] * 1000:.0f} ms, "
+            f"p99 {cuts[98] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms"
+        )
+        if errors:
+            self.stdout.write(self.style.WARNING(f"  first errors: {errors[:5]}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from portal import media
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-encode survey photos and signatures that haven't been processed "
+        "yet: uploads from before the pipeline existed, or ones whose "
+        "background processing was lost to a restart."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Process at most this many images per column.")
+
+    def handle(self, *args, **options):
+        total = 0
+        for model, field_names in media.IMAGE_FIELDS.items():
+            for field_name in field_names:
+                pks = media.unprocessed(model, field_name).order_by("pk").values_list("pk", flat=True)
+                if options["limit"]:
+                    pks = pks[: options["limit"]]
+                done = sum(1 for pk in list(pks) if media.process_image(model, pk, field_name))
+                total += done
+                self.stdout.write(f"{model.__name__}.{field_name}: {done} processed")
+        self.stdout.write(self.style.SUCCESS(f"{total} images processed"))
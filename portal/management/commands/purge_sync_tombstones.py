@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from portal.models import SyncTombstone
+from portal.sync import get_tombstone_ttl
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete sync tombstones older than SYNC_TOMBSTONE_TTL days. Tablets "
+        "holding a token that old are told to pull from scratch. Safe to run from cron."
+    )
+
+    def handle(self, *args, **options):
+        deleted, _ = SyncTombstone.objects.filter(deleted_at__lt=timezone.now() - get_tombstone_ttl()).delete()
+        self.stdout.write(self.style.SUCCESS(f"Purged {deleted} sync tombstones"))
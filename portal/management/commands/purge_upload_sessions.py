@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from portal import uploads
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions older than UPLOAD_SESSION_TTL, with their temporary files. Safe to run from cron."
+
+    def handle(self, *args, **options):
+        count = 0
+        for session in uploads.expired().iterator():
+            uploads.cancel(session)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {count} upload sessions"))
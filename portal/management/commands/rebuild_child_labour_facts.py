@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from portal import facts
+from portal.models import ChildInHouseholdTbl, ChildLabourFact
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every ChildLabourFact row from the survey tables. Saves keep "
+        "the table current on their own; run this nightly from cron to catch "
+        "rows changed outside the ORM. Rows are upserted in batches, so "
+        "dashboards keep reading the old values until each batch lands."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = timezone.now()
+        last_id, total = 0, 0
+        while True:
+            ids = list(
+                ChildInHouseholdTbl.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[: options["batch_size"]]
+            )
+            if not ids:
+                break
+            with transaction.atomic():
+                total += facts.refresh_children(ids)
+            last_id = ids[-1]
+            self.stdout.write(f"{total} children refreshed")
+
+        stale, _ = ChildLabourFact.objects.filter(refreshed_at__lt=started).delete()
+        self.stdout.write(self.style.SUCCESS(f"Child labour facts rebuilt: {total} rows, {stale} stale rows removed"))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from portal import classification
+from portal.models import ChildLabourFact
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run the child-labour classification over ChildLabourFact, one UPDATE "
+        "per batch. By default only rows classified under different thresholds "
+        "are touched; --all reclassifies every row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true", help="Reclassify every row, not just stale ones.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        queryset = ChildLabourFact.objects.all() if options["all"] else classification.stale_facts()
+        thresholds = classification.get_thresholds()
+        last_id, total = 0, 0
+        while True:
+            ids = list(queryset.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[: options["batch_size"]])
+            if not ids:
+                break
+            with transaction.atomic():
+                total += classification.classify(ChildLabourFact.objects.filter(id__in=ids), thresholds)
+            last_id = ids[-1]
+            self.stdout.write(f"{total} children reclassified")
+
+        self.stdout.write(self.style.SUCCESS(f"Reclassified {total} children (rules {classification.rules_version(thresholds)})"))
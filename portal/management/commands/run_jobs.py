@@ -0,0 +1,49 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from portal import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a background job worker. Start as many as the load needs (one "
+        "per core is a good start); they share the queue without stepping on "
+        "each other. Ctrl-C or SIGTERM lets the current job finish, then stops."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Exit when no job is due instead of waiting for more.")
+        parser.add_argument("--max-jobs", type=int, default=None, help="Exit after this many jobs, e.g. to recycle the process.")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait between polls of an empty queue.")
+
+    def stop(self, signum, frame):
+        self.stopping = True
+
+    def handle(self, *args, **options):
+        worker = jobs.worker_name()
+        done = 0
+        last_requeue = 0.0
+        self.stopping = False
+        previous = {signum: signal.signal(signum, self.stop) for signum in (signal.SIGTERM, signal.SIGINT)}
+        self.stdout.write(f"Worker {worker} started")
+        try:
+            while not self.stopping and (options["max_jobs"] is None or done < options["max_jobs"]):
+                close_old_connections()
+                if time.monotonic() - last_requeue > 60:
+                    jobs.requeue_stale()
+                    last_requeue = time.monotonic()
+                job = jobs.run_claimed(jobs.claim(worker))
+                if job is None:
+                    if options["once"]:
+                        break
+                    time.sleep(options["sleep"])
+                    continue
+                done += 1
+                self.stdout.write(f"{job} after {job.attempts} attempt(s)")
+        finally:
+            for signum, handler in previous.items():
+                signal.signal(signum, handler)
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} stopped after {done} jobs"))
@@ -0,0 +1,70 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+import requests
+
+from portal import farmer_api
+from portal.models import FarmerRegistry
+
+
+class Command(BaseCommand):
+    help = (
+        "Mirror the external farmer registry into FarmerRegistry. "
+        "Incremental by default: only farmers changed since the newest "
+        "source_updated_at already mirrored are requested."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Re-download the whole registry.")
+        parser.add_argument("--page-size", type=int, default=getattr(settings, "FARMER_REGISTRY_PAGE_SIZE", 1000))
+
+    def handle(self, *args, **options):
+        params = {"page_size": options["page_size"]}
+        if not options["full"]:
+            since = FarmerRegistry.objects.aggregate(since=Max("source_updated_at"))["since"]
+            if since is not None:
+                params["updated_since"] = since.isoformat()
+
+        timeout = (
+            getattr(settings, "FARMER_API_CONNECT_TIMEOUT", 3),
+            getattr(settings, "FARMER_API_READ_TIMEOUT", 10),
+        )
+        session = farmer_api.get_session()
+        url = getattr(settings, "FARMER_REGISTRY_URL", farmer_api.EXTERNAL_API_URL)
+        total = 0
+        while url:
+            try:
+                response = session.get(url, params=params, timeout=timeout)
+                response.raise_for_status()
+            except requests.RequestException as e:
+                raise CommandError(f"Registry request failed after {total} farmers: {e}")
+            page = response.json()
+            total += self.upsert(page.get("results", []))
+            # The "next" link already carries the query string.
+            url, params = page.get("next"), None
+            self.stdout.write(f"{total} farmers synced")
+
+        self.stdout.write(self.style.SUCCESS(f"Farmer registry sync complete: {total} farmers"))
+
+    def upsert(self, records):
+        """Writes one page with a single INSERT ... ON CONFLICT (farmer_code) DO UPDATE."""
+        rows = [
+            FarmerRegistry(
+                farmer_code=record["farmer_code"],
+                source_updated_at=parse_datetime(record["updated_at"]) if record.get("updated_at") else None,
+                **{field: record.get(field) or "" for field in FarmerRegistry.DETAIL_FIELDS},
+            )
+            for record in records
+            if record.get("farmer_code")
+        ]
+        FarmerRegistry.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=["farmer_code"],
+            update_fields=[*FarmerRegistry.DETAIL_FIELDS, "source_updated_at", "synced_at"],
+        )
+        for row in rows:
+            farmer_api.invalidate(row.farmer_code)
+        return len(rows)
@@ -0,0 +1,160 @@
+"""
+Re-encoding of uploaded survey photos and signatures.
+
+Phone cameras upload 4-8 MB JPEGs with EXIF (including the GPS position)
+attached. After an upload is committed, each image is rewritten in the
+background:
+
+* photos are rotated upright, shrunk to fit MEDIA_MAX_DIMENSION and saved
+  as a JPEG without metadata, plus a MEDIA_THUMBNAIL_SIZE WebP thumbnail;
+* signatures become 1-bit PNGs, which is all a pen stroke needs.
+
+Processed files live in a ``processed/`` directory next to the original,
+which is deleted once the row points at its replacement. Rows are updated
+with a conditional UPDATE, so an image replaced by a newer upload while it
+was being processed is left alone.
+
+Work runs as background jobs (portal/jobs.py). ``manage.py process_media``
+picks up anything left unprocessed, e.g. uploads from before the pipeline.
+"""
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from . import conditional, jobs
+from .models import ChildEducationDetailsTbl, EndOfCollection, HouseholdSensitizationTbl
+from .tables import TABLE_SLUGS
+
+logger = logging.getLogger(__name__)
+
+# Image columns by model; signatures get the 1-bit treatment.
+IMAGE_FIELDS = {
+    ChildEducationDetailsTbl: ("child_photo",),
+    HouseholdSensitizationTbl: ("picture_sensitization",),
+    EndOfCollection: ("picture_of_respondent", "signature_producer"),
+}
+SIGNATURE_FIELDS = {(EndOfCollection, "signature_producer")}
+
+PROCESSED_DIR = "processed"
+
+
+def is_processed(name):
+    return posixpath.basename(posixpath.dirname(name)) == PROCESSED_DIR
+
+
+def _processed_name(name, extension):
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, PROCESSED_DIR, stem + extension)
+
+
+def thumbnail_name(name):
+    return posixpath.splitext(name)[0] + ".thumb.webp"
+
+
+def thumbnail_url(fieldfile):
+    """URL of a processed photo's thumbnail, or None while it hasn't been processed."""
+    if not fieldfile or not is_processed(fieldfile.name) or fieldfile.name.endswith(".png"):
+        return None
+    return fieldfile.storage.url(thumbnail_name(fieldfile.name))
+
+
+def _encode(image, format, **options):
+    buffer = BytesIO()
+    image.save(buffer, format=format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def reencode_photo(image):
+    """``(full size, thumbnail)`` files for a photo, upright and without metadata."""
+    image = ImageOps.exif_transpose(image).convert("RGB")
+    max_dimension = getattr(settings, "MEDIA_MAX_DIMENSION", 1600)
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    # Saving without exif= drops the metadata, GPS included.
+    full = _encode(image, "JPEG", quality=getattr(settings, "MEDIA_JPEG_QUALITY", 80), optimize=True, progressive=True)
+    size = getattr(settings, "MEDIA_THUMBNAIL_SIZE", 320)
+    image.thumbnail((size, size), Image.Resampling.LANCZOS)
+    return full, _encode(image, "WEBP", quality=75, method=6)
+
+
+def reencode_signature(image):
+    """A 1-bit PNG of a signature, on white."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ("RGBA", "LA", "P"):
+        background = Image.new("RGBA", image.size, "white")
+        image = Image.alpha_composite(background, image.convert("RGBA"))
+    max_dimension = getattr(settings, "MEDIA_MAX_DIMENSION", 1600)
+    image = image.convert("L")
+    image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    return _encode(image.point(lambda value: 255 if value > 160 else 0, mode="1"), "PNG", optimize=True)
+
+
+def process_image(model, pk, field_name):
+    """
+    Re-encodes one row's image. Returns the new file name, or None when there
+    was nothing to do (no image, already processed, or not an image).
+    """
+    name = model.objects.filter(pk=pk).values_list(field_name, flat=True).first()
+    if not name or is_processed(name):
+        return None
+    storage = model._meta.get_field(field_name).storage
+    try:
+        with storage.open(name) as source, Image.open(source) as image:
+            if (model, field_name) in SIGNATURE_FIELDS:
+                new_name = storage.save(_processed_name(name, ".png"), reencode_signature(image))
+                thumbnail = None
+            else:
+                full, small = reencode_photo(image)
+                new_name = storage.save(_processed_name(name, ".jpg"), full)
+                thumbnail = storage.save(thumbnail_name(new_name), small)
+    except (FileNotFoundError, UnidentifiedImageError, OSError):
+        logger.warning("Could not process %s.%s for row %s: %s", model.__name__, field_name, pk, name, exc_info=True)
+        return None
+
+    # Only swap if the row still points at the file we read.
+    swapped = model.objects.filter(pk=pk, **{field_name: name}).update(**{field_name: new_name, "updated_at": timezone.now()})
+    if swapped:
+        conditional.forget(model, [pk])
+        storage.delete(name)
+        return new_name
+    storage.delete(new_name)
+    if thumbnail:
+        storage.delete(thumbnail)
+    return None
+
+
+def schedule(model, pk, field_name):
+    """Queues the image for re-encoding by a background worker."""
+    jobs.enqueue("media.process", {"table": TABLE_SLUGS[model], "pk": pk, "field_name": field_name})
+
+
+def image_names(instance, field_names=None):
+    """Names of a row's stored image files (or just ``field_names``'), thumbnails included."""
+    names = []
+    for field_name in field_names or IMAGE_FIELDS[type(instance)]:
+        fieldfile = getattr(instance, field_name)
+        if fieldfile:
+            names.append(fieldfile.name)
+            if thumbnail_url(fieldfile):
+                names.append(thumbnail_name(fieldfile.name))
+    return names
+
+
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def unprocessed(model, field_name):
+    """Rows of ``model`` whose ``field_name`` image hasn't been processed yet."""
+    return (
+        model.objects.exclude(**{f"{field_name}__isnull": True})
+        .exclude(**{field_name: ""})
+        .exclude(**{f"{field_name}__contains": f"/{PROCESSED_DIR}/"})
+    )
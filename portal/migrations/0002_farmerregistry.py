@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FarmerRegistry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("farmer_code", models.CharField(max_length=50, unique=True)),
+                ("first_name", models.CharField(blank=True, max_length=100)),
+                ("surname", models.CharField(blank=True, max_length=100)),
+                ("country", models.CharField(blank=True, max_length=100)),
+                ("region", models.CharField(blank=True, max_length=100)),
+                ("district", models.CharField(blank=True, max_length=100)),
+                ("society_code", models.CharField(blank=True, max_length=50)),
+                ("risk_classification", models.CharField(blank=True, max_length=50)),
+                ("client", models.CharField(blank=True, max_length=50)),
+                (
+                    "source_updated_at",
+                    models.DateTimeField(
+                        blank=True,
+                        db_index=True,
+                        help_text="Last change time reported by the registry.",
+                        null=True,
+                    ),
+                ),
+                ("synced_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
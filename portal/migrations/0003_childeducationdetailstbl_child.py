@@ -0,0 +1,24 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0002_farmerregistry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="childeducationdetailstbl",
+            name="child",
+            field=models.ForeignKey(
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="education_details",
+                to="portal.childinhouseholdtbl",
+            ),
+        ),
+    ]
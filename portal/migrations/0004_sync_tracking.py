@@ -0,0 +1,256 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0003_childeducationdetailstbl_child"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("table", models.CharField(max_length=50)),
+                ("object_id", models.BigIntegerField()),
+                ("client_uuid", models.UUIDField(blank=True, null=True)),
+                ("deleted_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="adulthouseholdmember",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="adulthouseholdmember",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="adultinhouseholdtbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="adultinhouseholdtbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="childeducationdetailstbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childeducationdetailstbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="childhouseholddetailstbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childhouseholddetailstbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="childinhouseholdtbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childinhouseholdtbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="childremediationtbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childremediationtbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="childreninhouseholdtbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childreninhouseholdtbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="consentlocation_tbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="consentlocation_tbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="cover_tbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="cover_tbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="endofcollection",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="endofcollection",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="farmerchild",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="farmerchild",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="farmeridentification_info_onvisit_tbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="farmeridentification_info_onvisit_tbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="farmeridentification_owneridentificationtbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="farmeridentification_owneridentificationtbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="householdsensitizationtbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="householdsensitizationtbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+        migrations.AddField(
+            model_name="workersinthefarmtbl",
+            name="client_uuid",
+            field=models.UUIDField(
+                blank=True,
+                help_text="Identifier assigned by the field tablet.",
+                null=True,
+                unique=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="workersinthefarmtbl",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:28
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Build the indexes without locking the survey tables against writes.
+    atomic = False
+
+    dependencies = [
+        ("portal", "0005_idempotencykey"),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="childinhouseholdtbl",
+            index=models.Index(
+                fields=["child_gender", "child_year_birth"],
+                name="child_gender_birth_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="childinhouseholdtbl",
+            index=models.Index(
+                condition=models.Q(("child_can_be_surveyed", "no")),
+                fields=["household"],
+                name="child_unavailable_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="consentlocation_tbl",
+            index=models.Index(
+                fields=["interview_start_time"], name="consent_start_time_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="consentlocation_tbl",
+            index=models.Index(
+                fields=["community_type", "interview_start_time"],
+                name="consent_community_time_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="consentlocation_tbl",
+            index=models.Index(
+                condition=models.Q(("farmer_available", "No")),
+                fields=["interview_start_time"],
+                name="consent_unavailable_idx",
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cover_tbl",
+            index=models.Index(
+                fields=["region", "district"], name="cover_region_district_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="cover_tbl",
+            index=models.Index(fields=["society_code"], name="cover_society_code_idx"),
+        ),
+    ]
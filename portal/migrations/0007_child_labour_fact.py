@@ -0,0 +1,122 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0006_dashboard_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChildLabourFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("region", models.CharField(blank=True, max_length=100)),
+                ("district", models.CharField(blank=True, max_length=100)),
+                ("society_code", models.CharField(blank=True, max_length=100)),
+                ("enumerator_code", models.CharField(blank=True, max_length=100)),
+                ("interview_start_time", models.DateTimeField(blank=True, null=True)),
+                ("child_gender", models.CharField(blank=True, max_length=4)),
+                ("child_year_birth", models.IntegerField(blank=True, null=True)),
+                (
+                    "surveyed",
+                    models.BooleanField(
+                        default=False,
+                        help_text="The child could be surveyed in person.",
+                    ),
+                ),
+                ("worked_on_cocoa", models.BooleanField(null=True)),
+                ("worked_in_house", models.BooleanField(null=True)),
+                (
+                    "light_tasks_7days",
+                    models.PositiveSmallIntegerField(
+                        help_text="Number of light tasks done in the last 7 days.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "hazardous_tasks_7days",
+                    models.PositiveSmallIntegerField(
+                        help_text="Number of hazardous tasks done on the cocoa farm in the last 7 days.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "hazardous_tasks_12months",
+                    models.PositiveSmallIntegerField(
+                        help_text="Number of hazardous tasks done on the cocoa farm in the last 12 months.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "agrochemical_exposure",
+                    models.BooleanField(
+                        help_text="Applied agrochemicals, was on the farm while they were applied, or handled them as a task.",
+                        null=True,
+                    ),
+                ),
+                ("injured", models.BooleanField(null=True)),
+                ("enrolled_in_school", models.BooleanField(null=True)),
+                ("attended_school_7days", models.BooleanField(null=True)),
+                ("missed_school_7days", models.BooleanField(null=True)),
+                (
+                    "light_work_hours",
+                    models.PositiveIntegerField(
+                        help_text="Hours of light work in the last 7 days, school and non-school days.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "hazardous_work_hours",
+                    models.PositiveIntegerField(
+                        help_text="Hours of hazardous work in the last 7 days, school and non-school days.",
+                        null=True,
+                    ),
+                ),
+                ("refreshed_at", models.DateTimeField(auto_now=True)),
+                (
+                    "child",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="labour_fact",
+                        to="portal.childinhouseholdtbl",
+                    ),
+                ),
+                (
+                    "cover",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="portal.cover_tbl",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["region", "district", "society_code"],
+                        name="fact_location_idx",
+                    ),
+                    models.Index(
+                        fields=["enumerator_code"], name="fact_enumerator_idx"
+                    ),
+                    models.Index(
+                        fields=["interview_start_time"], name="fact_start_time_idx"
+                    ),
+                ],
+            },
+        ),
+    ]
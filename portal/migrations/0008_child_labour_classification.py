@@ -0,0 +1,66 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:54
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0007_child_labour_fact"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="childlabourfact",
+            name="age",
+            field=models.PositiveSmallIntegerField(
+                blank=True, help_text="Age in the year of the interview.", null=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="childlabourfact",
+            name="classification",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("hazardous_work", "Hazardous work"),
+                    ("child_labour", "Child labour"),
+                    ("light_work", "Light work"),
+                    ("no_issue", "No issue"),
+                ],
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childlabourfact",
+            name="classification_reasons",
+            field=django.contrib.postgres.fields.ArrayField(
+                base_field=models.CharField(max_length=40),
+                blank=True,
+                default=list,
+                size=None,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childlabourfact",
+            name="classification_rules",
+            field=models.CharField(
+                blank=True,
+                help_text="Version of the thresholds the classification was made with.",
+                max_length=12,
+            ),
+        ),
+        migrations.AddField(
+            model_name="childlabourfact",
+            name="total_work_hours",
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddIndex(
+            model_name="childlabourfact",
+            index=models.Index(
+                fields=["classification", "region", "district"],
+                name="fact_classification_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0008_child_labour_classification"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DashboardCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("region", models.CharField(blank=True, max_length=100)),
+                ("district", models.CharField(blank=True, max_length=100)),
+                ("enumerator_code", models.CharField(blank=True, max_length=50)),
+                ("metric", models.CharField(max_length=40)),
+                ("dimension", models.CharField(blank=True, max_length=100)),
+                ("count", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "region",
+                            "district",
+                            "enumerator_code",
+                            "metric",
+                            "dimension",
+                        ),
+                        name="dashboard_counter_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
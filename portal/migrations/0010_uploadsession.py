@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 11:04
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("portal", "0009_dashboardcounter"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UploadSession",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("table", models.CharField(max_length=50)),
+                ("object_id", models.BigIntegerField()),
+                ("field_name", models.CharField(max_length=50)),
+                ("filename", models.CharField(max_length=255)),
+                (
+                    "length",
+                    models.BigIntegerField(
+                        help_text="Total size of the file in bytes."
+                    ),
+                ),
+                ("offset", models.BigIntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True, db_index=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
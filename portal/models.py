@@ -1,13 +1,17 @@
+import uuid
+
 from django.db import models
 from django.core.validators import RegexValidator
 from django.contrib.postgres.fields import ArrayField
+from django.conf import settings
+from django.utils import timezone
 from django.db import models
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from django.forms import ValidationError
 from .helper import generate_code
+from . import farmer_api
 from multiselectfield import MultiSelectField
 from datetime import datetime
-import requests
 
 # Validators
 letters_only_validator = RegexValidator(regex=r'^[A-Za-z]+$',message='This field must contain only letters (no spaces).')
@@ -16,17 +20,162 @@ allowed_chars_validator = RegexValidator(regex=r'^[0-9A-Za-z\'\s]+$',message="On
 name_validator = RegexValidator( regex=r'^[0-9A-Za-z\s\']+$',message="Only letters, numbers, spaces, and apostrophes are allowed. Accents are not allowed.")
 
 
+###########################################################################################
+# OFFLINE SYNC TRACKING
+###########################################################################################
+
+class SyncTrackedModel(models.Model):
+    """
+    Columns the tablet sync protocol relies on (see portal/sync.py).
+    `updated_at` is bumped on every save; `client_uuid` is the id the tablet
+    gave the record offline, so re-pushing the same record updates it instead
+    of creating a duplicate.
+    """
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    client_uuid = models.UUIDField(null=True, blank=True, unique=True, help_text="Identifier assigned by the field tablet.")
+
+    class Meta:
+        abstract = True
+
+
+class TracksUploadedFiles:
+    """
+    Remembers the file names a row was loaded with, so portal/signals.py only
+    queues image processing when a save actually brought in a new upload.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_files = {
+            name: values[index] for index, name in enumerate(field_names)
+            if isinstance(cls._meta.get_field(name), models.FileField)
+        }
+        return instance
+
+
+class SyncTombstone(models.Model):
+    """Remembers deleted survey rows so tablets can drop them on their next pull."""
+    table = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    client_uuid = models.UUIDField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.table} #{self.object_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    A write request seen with an `Idempotency-Key` header, and the response it got
+    (see portal/idempotency.py). `status_code` is null while the first request is
+    still running.
+    """
+    key = models.CharField(max_length=255)
+    path = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64, help_text="SHA-256 of the request method, path and body.")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    response_body = models.BinaryField(blank=True, default=b"")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["key", "path"], name="idempotency_key_path_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.key} {self.path} ({self.status_code or 'in progress'})"
+
+
+class UploadSession(models.Model):
+    """
+    A resumable upload of one image for one survey row (see portal/uploads.py).
+    The bytes received so far sit in a temporary file; `offset` is how many
+    there are. `claimed_at` is set while a request is writing a chunk, and
+    `completed_at` once the file is attached to the row.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    table = models.CharField(max_length=50)
+    object_id = models.BigIntegerField()
+    field_name = models.CharField(max_length=50)
+    filename = models.CharField(max_length=255)
+    length = models.BigIntegerField(help_text="Total size of the file in bytes.")
+    offset = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.filename} for {self.table} #{self.object_id} ({self.offset}/{self.length})"
+
+
+class BackgroundJob(models.Model):
+    """
+    A unit of work queued for `manage.py run_jobs` (see portal/jobs.py).
+    `name` picks the registered task and `payload` holds its keyword arguments.
+    Failed attempts are retried after `run_after` until `max_attempts` is reached.
+    """
+    QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+    STATUS_CHOICES = [(QUEUED, "Queued"), (RUNNING, "Running"), (DONE, "Done"), (FAILED, "Failed")]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+",
+        help_text="The signed-in user whose request queued the job.",
+    )
+
+    class Meta:
+        indexes = [
+            # The worker's claim query: the oldest due job still queued.
+            models.Index(fields=["status", "run_after"], name="background_job_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
 ###########################################################################################
 # COVER QUESTIONNAIRE MODEL
 ###########################################################################################
-EXTERNAL_API_URL = "https://example.com/api/farmer_details/"  # Replace with actual API URL
 
-class FarmerChild(models.Model):
+class FarmerRegistry(models.Model):
+    """Local mirror of the external farmer registry, refreshed by `manage.py sync_farmer_registry`."""
+    farmer_code = models.CharField(max_length=50, unique=True)
+    first_name = models.CharField(max_length=100, blank=True)
+    surname = models.CharField(max_length=100, blank=True)
+    country = models.CharField(max_length=100, blank=True)
+    region = models.CharField(max_length=100, blank=True)
+    district = models.CharField(max_length=100, blank=True)
+    society_code = models.CharField(max_length=50, blank=True)
+    risk_classification = models.CharField(max_length=50, blank=True)
+    client = models.CharField(max_length=50, blank=True)
+    source_updated_at = models.DateTimeField(null=True, blank=True, db_index=True, help_text="Last change time reported by the registry.")
+    synced_at = models.DateTimeField(auto_now=True)
+
+    # Field names as the registry API spells them.
+    DETAIL_FIELDS = ("first_name", "surname", "country", "region", "district", "society_code", "risk_classification", "client")
+
+    def __str__(self):
+        return f"{self.farmer_code} - {self.first_name} {self.surname}"
+
+
+class FarmerChild(SyncTrackedModel):
     name = models.CharField(max_length=100, help_text="Child's full name")
     def __str__(self):
         return f"{self.name}"
     
-class Cover_tbl(models.Model):
+class Cover_tbl(SyncTrackedModel):
     
     enumerator_name = models.CharField(max_length=100, help_text="Enumerator name (letters only, no spaces).")
     enumerator_code = models.CharField(max_length=50, blank=True, unique=True)
@@ -41,29 +190,69 @@ class Cover_tbl(models.Model):
     client = models.CharField(max_length=50, blank=True)
     num_farmer_children = models.IntegerField(default=0, verbose_name="Number of children (5-17 years)")
     FarmerChild = models.ForeignKey(FarmerChild, on_delete=models.CASCADE, related_name="children")
+
+    class Meta:
+        indexes = [
+            # Dashboard drill-down: region, then district within it.
+            models.Index(fields=["region", "district"], name="cover_region_district_idx"),
+            models.Index(fields=["society_code"], name="cover_society_code_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember which farmer_code the stored farmer details belong to.
+        if "farmer_code" in field_names:
+            instance._loaded_farmer_code = values[field_names.index("farmer_code")]
+        return instance
+
+    def apply_farmer_details(self, data):
+        if data is None:
+            raise ValidationError(f"Farmer Code {self.farmer_code} not found in external database.")
+        self.farmer_first_name = data.get("first_name", "")
+        self.farmer_surname = data.get("surname", "")
+        self.country = data.get("country", "")
+        self.region = data.get("region", "")
+        self.district = data.get("district", "")
+        self.society_code = data.get("society_code", "")
+        self.risk_classification = data.get("risk_classification", "")
+        self.client = data.get("client", "")
+
     def fetch_farmer_details(self):
-        """Fetches farmer details from external API and populates fields."""
+        """Fetches farmer details from external API (via the farmer cache) and populates fields."""
         if self.farmer_code:
-            response = requests.get(f"{EXTERNAL_API_URL}{self.farmer_code}")
-            if response.status_code == 200:
-                data = response.json()
-                self.farmer_first_name = data.get("first_name", "")
-                self.farmer_surname = data.get("surname", "")
-                self.country = data.get("country", "")
-                self.region = data.get("region", "")
-                self.district = data.get("district", "")
-                self.society_code = data.get("society_code", "")
-                self.risk_classification = data.get("risk_classification", "")
-                self.client = data.get("client", "")
-            else:
-                raise ValidationError(f"Farmer Code {self.farmer_code} not found in external database.")
+            self.apply_farmer_details(farmer_api.fetch_farmer_details(self.farmer_code))
+
+    async def afetch_farmer_details(self):
+        """
+        Async variant for the ASGI views. Marks the details as loaded, so the
+        following save() does not repeat the lookup synchronously.
+        """
+        if self.farmer_code:
+            self.apply_farmer_details(await farmer_api.afetch_farmer_details(self.farmer_code))
+            self._loaded_farmer_code = self.farmer_code
+
+    def farmer_details_outdated(self):
+        """True when farmer_code changed since the farmer details were last loaded."""
+        return self.farmer_code != getattr(self, "_loaded_farmer_code", None)
 
     def save(self, *args, **kwargs):
-        """Auto-fetch farmer details before saving."""
-        self.fetch_farmer_details()
+        """
+        Auto-fetch farmer details before saving, unless farmer_code is unchanged.
+        With FARMER_DETAILS_IN_BACKGROUND the lookup is queued as a job instead
+        (portal/signals.py) and the details arrive a moment after the save.
+        An unknown farmer code is then no longer a ValidationError: the cover
+        is saved with blank farmer details and the job fails.
+        """
+        if self.farmer_details_outdated():
+            if getattr(settings, "FARMER_DETAILS_IN_BACKGROUND", False):
+                self._farmer_details_pending = True
+            else:
+                self.fetch_farmer_details()
         if not self.enumerator_code and self.enumerator_name:
             self.enumerator_code = generate_code(self.enumerator_name, prefix="ENUM")
         super().save(*args, **kwargs)
+        self._loaded_farmer_code = self.farmer_code
 
     def __str__(self):
         return f"{self.farmer_code} - {self.farmer_first_name} {self.farmer_surname}"
@@ -73,7 +262,7 @@ class Cover_tbl(models.Model):
     # CONSENT AND LOCATION MODEL
     ###########################################################################################
 
-class ConsentLocation_tbl(models.Model):
+class ConsentLocation_tbl(SyncTrackedModel):
     COMMUNITY_CHOICES = [
         ('Town', 'Town'),
         ('Village', 'Village'),
@@ -111,12 +300,20 @@ class ConsentLocation_tbl(models.Model):
     # Who is available to answer for the farmer?
     available_answer_by = models.CharField(max_length=20,choices=ANSWER_BY_CHOICES,blank=True,help_text="Who is available to answer for the farmer?")    
     refusal_toa_participate_reason_survey = models.CharField(max_length=500,blank=True,help_text="If the farmer refused to participate, provide the reason here." )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["interview_start_time"], name="consent_start_time_idx"),
+            models.Index(fields=["community_type", "interview_start_time"], name="consent_community_time_idx"),
+            # Unavailable farmers are a small slice that the follow-up reports read on their own.
+            models.Index(fields=["interview_start_time"], condition=models.Q(farmer_available="No"), name="consent_unavailable_idx"),
+        ]
         
 #################################################################################
 #FARMER IDENTIFICATION - INFORMATION ON THE VISIT
 #################################################################################
 
-class FarmerIdentification_Info_OnVisit_tbl(models.Model):
+class FarmerIdentification_Info_OnVisit_tbl(SyncTrackedModel):
 
     CORRECT_RESPONSE_PROVIDED = [
         ('Yes', 'Yes'),
@@ -168,7 +365,7 @@ class FarmerIdentification_Info_OnVisit_tbl(models.Model):
 #################################################################################
 
     
-class FarmerIdentification_OwnerIdentificationTbl(models.Model):
+class FarmerIdentification_OwnerIdentificationTbl(SyncTrackedModel):
     
       # Nationality of the owner
     NATIONALITY_OWNER_CHOICES = [
@@ -201,7 +398,7 @@ class FarmerIdentification_OwnerIdentificationTbl(models.Model):
     #################################################################################
     # A simple yes/no choice coded as "01" for Agree and "02" for Disagree.\
         
-class WorkersInTheFarmTbl(models.Model):
+class WorkersInTheFarmTbl(SyncTrackedModel):
     
     AGREE_OR_DISAGREE = [
         ('Agree', 'Agree'),
@@ -268,14 +465,14 @@ class WorkersInTheFarmTbl(models.Model):
     # ADULT OF THE RESPONDENTS HOUSEHOLD - INFORMATION ON THE ADULTS LIVING IN THE HOUSEHOLD
     #################################################################################
     
-class AdultInHouseholdTbl(models.Model):
+class AdultInHouseholdTbl(SyncTrackedModel):
     consent = models.ForeignKey(ConsentLocation_tbl, on_delete=models.CASCADE, related_name='adult_in_household', null=True)
     total_adults = models.PositiveIntegerField(verbose_name="Total number of adults in the household (producer/manager/owner not included)",help_text="Household means people that dwell under the same roof and share the same meal.",validators=[MinValueValidator(1)])
     def __str__(self):
         return f"Household {self.id} - {self.total_adults} adults"
 
 
-class AdultHouseholdMember(models.Model):
+class AdultHouseholdMember(SyncTrackedModel):
     RELATIONSHIP_CHOICES = [
         ('Husband/Wife', 'Husband/Wife'),
         ('Son/Daughter', 'Son/Daughter'),
@@ -340,13 +537,13 @@ class AdultHouseholdMember(models.Model):
     main_work = models.CharField( max_length=30, choices=MAIN_WORK_CHOICES, verbose_name="Main work/occupation")
     main_work_other = models.CharField(max_length=100,blank=True,verbose_name="Specify main work (if Other)",help_text="If 'Other' is selected, please specify." )
     def __str__(self):
-        return f"{self.full_name} (Household {self.household.id})"
+        return f"{self.full_name} (Household {self.household_id})"
 
     #################################################################################
     # CHILDREN IN THE RESPONDENT'S HOUSEHOLD MODEL
     #################################################################################
 
-class ChildrenInHouseholdTbl(models.Model):
+class ChildrenInHouseholdTbl(SyncTrackedModel):
 
     words_validator = RegexValidator(regex=r'^[A-Za-z\s]+$',message='This field must contain only letters and spaces.')
     capital_letters_numbers_validator = RegexValidator(regex=r'^[A-Z0-9\s]+$',message="Only capital letters, numbers, and spaces are allowed.")
@@ -361,7 +558,7 @@ class ChildrenInHouseholdTbl(models.Model):
     num_children_5_to_17 = models.PositiveSmallIntegerField(verbose_name="Number of children between ages 5 and 17",validators=[MinValueValidator(1), MaxValueValidator(19)],help_text="Count the producer's children as well as other children living in the household (cannot be negative or exceed 19).")
 
 
-class ChildInHouseholdTbl(models.Model):
+class ChildInHouseholdTbl(SyncTrackedModel):
        # Gender choices
     GENDER_CHOICES = [
         ('Boy', 'Boy'),
@@ -410,13 +607,19 @@ class ChildInHouseholdTbl(models.Model):
     child_birth_certificate = models.CharField(max_length=3,choices=BIRTH_CERTIFICATE_CHOICES,verbose_name="Does the child have a birth certificate?")
     child_birth_certificate_reason = models.CharField(max_length=200,blank=True,verbose_name="If no, please specify why",help_text="Provide a reason if the child does not have a birth certificate.")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["child_gender", "child_year_birth"], name="child_gender_birth_idx"),
+            models.Index(fields=["household"], condition=models.Q(child_can_be_surveyed="no"), name="child_unavailable_idx"),
+        ]
+
 
 
 ############################################
 # ChildHouseholdDetails Model
 ############################################
 
-class ChildHouseholdDetailsTbl(models.Model):
+class ChildHouseholdDetailsTbl(SyncTrackedModel):
 
     capital_letters_numbers_validator = RegexValidator(regex=r'^[A-Z0-9\s]+$', message="Only capital letters, numbers, and spaces are allowed.")
 
@@ -454,7 +657,7 @@ class ChildHouseholdDetailsTbl(models.Model):
 ############################################
 # ChildEducationDetails Model   
 ############################################
-class ChildEducationDetailsTbl(models.Model):
+class ChildEducationDetailsTbl(TracksUploadedFiles, SyncTrackedModel):
     # Choice options
     FATHER_LOCATION_CHOICES = [
         ('same_household', 'In the same household'),
@@ -851,6 +1054,7 @@ class ChildEducationDetailsTbl(models.Model):
         ('other', "Other"),
     ]
     # Model fields
+    child = models.ForeignKey(ChildInHouseholdTbl, on_delete=models.CASCADE, related_name="education_details", null=True)
     child_father_location = models.CharField(max_length=50, choices=FATHER_LOCATION_CHOICES, null=True, blank=True, help_text="Where does the child's father live?")
     child_father_country = models.CharField(max_length=50, choices=COUNTRY_CHOICES, null=True, blank=True, help_text="Father's country of residence.")
     child_father_country_other = models.CharField(max_length=100, null=True, blank=True, help_text="If 'Other' is selected, specify the country (in capital letters).")
@@ -965,7 +1169,7 @@ class ChildEducationDetailsTbl(models.Model):
 
 
     def __str__(self):
-        return f"12-Month Task Assessment for Child Survey Record #{self.child.pk}"
+        return f"12-Month Task Assessment for Child Survey Record #{self.child_id}"
 
     def clean(self):
         """Validate that the total hours are within acceptable bounds."""
@@ -975,7 +1179,7 @@ class ChildEducationDetailsTbl(models.Model):
             raise ValidationError("Total hours during NON-SCHOOL DAYS must be between 0 and 1015.")
     
     def __str__(self):
-        return f"Light Duty Assessment (12) for Child Survey Record #{self.child.pk}"
+        return f"Light Duty Assessment (12) for Child Survey Record #{self.child_id}"
 
       
     def clean(self):
@@ -986,10 +1190,10 @@ class ChildEducationDetailsTbl(models.Model):
             raise ValidationError("Total hours on non-school days must be between 0 and 1015.")
     
     def __str__(self):
-        return f"Heavy Work Assessment for Child Survey Record #{self.child.pk}"
+        return f"Heavy Work Assessment for Child Survey Record #{self.child_id}"
 
     def __str__(self):
-        return f"Cocoa Farm Heavy Work (12 months) for Child Survey Record #{self.child.pk}"
+        return f"Cocoa Farm Heavy Work (12 months) for Child Survey Record #{self.child_id}"
     def clean(self):
         errors = {}
         if not (0 <= self.total_hours_school_days < 1016):
@@ -1000,7 +1204,7 @@ class ChildEducationDetailsTbl(models.Model):
             raise ValidationError(errors)
     
     def __str__(self):
-        return f"Heavy Work & Health Assessment for Child Survey Record #{self.child.pk}"
+        return f"Heavy Work & Health Assessment for Child Survey Record #{self.child_id}"
 
 
 
@@ -1010,7 +1214,7 @@ class ChildEducationDetailsTbl(models.Model):
 
 # from django.db import models
 
-class ChildRemediationTbl(models.Model):
+class ChildRemediationTbl(SyncTrackedModel):
     SCHOOL_FEES_CHOICES = [
         ('yes', 'Yes'),
         ('no', 'No'),
@@ -1037,7 +1241,7 @@ class ChildRemediationTbl(models.Model):
     community_remediation_other = models.CharField(max_length=200,blank=True,null=True,help_text="If 'Other' is selected, specify in capital letters.")
     
     def __str__(self):
-        return f"Child Remediation Assessment for Survey Record #{self.survey.pk}"
+        return f"Child Remediation Assessment for Consent Record #{self.consent_id}"
 
 
 
@@ -1051,7 +1255,7 @@ class ChildRemediationTbl(models.Model):
 
   
 
-class HouseholdSensitizationTbl(models.Model):
+class HouseholdSensitizationTbl(TracksUploadedFiles, SyncTrackedModel):
     
     YES_NO_CHOICES = [
         ('yes', 'Yes'),
@@ -1069,7 +1273,7 @@ class HouseholdSensitizationTbl(models.Model):
     feedback_observations = models.TextField(blank=True,null=True,help_text="What are your observations regarding the reaction from the parents on the sensitization provided?")
     
     def __str__(self):
-        return f"Sensitization Assessment for Survey Record #{self.survey.pk}"
+        return f"Sensitization Assessment for Consent Record #{self.consent_id}"
 
 
 
@@ -1080,7 +1284,7 @@ class HouseholdSensitizationTbl(models.Model):
 
 # from django.db import models
 
-class EndOfCollection(models.Model):
+class EndOfCollection(TracksUploadedFiles, SyncTrackedModel):
     sensitization = models.ForeignKey(HouseholdSensitizationTbl,on_delete=models.CASCADE,related_name='end_of_collection',null=True)
     feedback_enum = models.TextField(help_text="Feedback from enumerator. This field is required.")
     picture_of_respondent = models.ImageField(upload_to='respondent_pictures/',blank=True,null=True,help_text="Picture of the respondent. Required if farmer_available is True.")
@@ -1089,6 +1293,88 @@ class EndOfCollection(models.Model):
     end_time = models.DateTimeField(blank=True,null=True,help_text="End time of the survey. Required if sp6_code, farmer_code, and client are set.")
     
     def __str__(self):
-        return f"End of Collection for Survey Record #{self.survey.pk}"
+        return f"End of Collection for Sensitization Record #{self.sensitization_id}"
+
+
+
+
+####################################################################################################
+# Reporting
+####################################################################################################
+
+class ChildLabourFact(models.Model):
+    """
+    One row per surveyed child with the interview keys and the child-labour
+    indicators already worked out, so reports don't have to join four tables
+    and parse task lists on every query. Kept current by portal/facts.py;
+    `manage.py rebuild_child_labour_facts` recomputes it from scratch.
+    """
+    CLASSIFICATION_CHOICES = [
+        ('hazardous_work', 'Hazardous work'),
+        ('child_labour', 'Child labour'),
+        ('light_work', 'Light work'),
+        ('no_issue', 'No issue'),
+    ]
+
+    child = models.OneToOneField(ChildInHouseholdTbl, on_delete=models.CASCADE, related_name="labour_fact")
+    cover = models.ForeignKey(Cover_tbl, on_delete=models.CASCADE, null=True, related_name="+")
+    region = models.CharField(max_length=100, blank=True)
+    district = models.CharField(max_length=100, blank=True)
+    society_code = models.CharField(max_length=100, blank=True)
+    enumerator_code = models.CharField(max_length=100, blank=True)
+    interview_start_time = models.DateTimeField(null=True, blank=True)
+    child_gender = models.CharField(max_length=4, blank=True)
+    child_year_birth = models.IntegerField(null=True, blank=True)
+    age = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Age in the year of the interview.")
+    surveyed = models.BooleanField(default=False, help_text="The child could be surveyed in person.")
+    # The indicators below are null when the child has no education/work details.
+    worked_on_cocoa = models.BooleanField(null=True)
+    worked_in_house = models.BooleanField(null=True)
+    light_tasks_7days = models.PositiveSmallIntegerField(null=True, help_text="Number of light tasks done in the last 7 days.")
+    hazardous_tasks_7days = models.PositiveSmallIntegerField(null=True, help_text="Number of hazardous tasks done on the cocoa farm in the last 7 days.")
+    hazardous_tasks_12months = models.PositiveSmallIntegerField(null=True, help_text="Number of hazardous tasks done on the cocoa farm in the last 12 months.")
+    agrochemical_exposure = models.BooleanField(null=True, help_text="Applied agrochemicals, was on the farm while they were applied, or handled them as a task.")
+    injured = models.BooleanField(null=True)
+    enrolled_in_school = models.BooleanField(null=True)
+    attended_school_7days = models.BooleanField(null=True)
+    missed_school_7days = models.BooleanField(null=True)
+    light_work_hours = models.PositiveIntegerField(null=True, help_text="Hours of light work in the last 7 days, school and non-school days.")
+    hazardous_work_hours = models.PositiveIntegerField(null=True, help_text="Hours of hazardous work in the last 7 days, school and non-school days.")
+    total_work_hours = models.PositiveIntegerField(null=True)
+    # Set by portal/classification.py; blank until the child has work details.
+    classification = models.CharField(max_length=20, choices=CLASSIFICATION_CHOICES, blank=True)
+    classification_reasons = ArrayField(models.CharField(max_length=40), default=list, blank=True)
+    classification_rules = models.CharField(max_length=12, blank=True, help_text="Version of the thresholds the classification was made with.")
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["classification", "region", "district"], name="fact_classification_idx"),
+            models.Index(fields=["region", "district", "society_code"], name="fact_location_idx"),
+            models.Index(fields=["enumerator_code"], name="fact_enumerator_idx"),
+            models.Index(fields=["interview_start_time"], name="fact_start_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"Child labour facts for child #{self.child_id}"
 
 
+class DashboardCounter(models.Model):
+    """
+    Running count of one dashboard metric for one region/district/enumerator,
+    optionally split by a reason (`dimension`). Maintained by portal/counters.py.
+    """
+    region = models.CharField(max_length=100, blank=True)
+    district = models.CharField(max_length=100, blank=True)
+    enumerator_code = models.CharField(max_length=50, blank=True)
+    metric = models.CharField(max_length=40)
+    dimension = models.CharField(max_length=100, blank=True)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["region", "district", "enumerator_code", "metric", "dimension"], name="dashboard_counter_uniq"),
+        ]
+
+    def __str__(self):
+        return f"{self.region}/{self.district}/{self.enumerator_code} {self.metric} {self.dimension}: {self.count}"
@@ -0,0 +1,100 @@
+"""
+Read-replica routing.
+
+When settings.REPLICA_DATABASE names a database alias, GET/HEAD requests to
+views wrapped in ``replica_reads`` read from it, as do commands that run
+inside ``with replica_reads():``. Everything else uses ``default``:
+
+* every write, and every read after a write in the same request;
+* a client's reads for REPLICA_STICKY_SECONDS after it made a successful
+  write, so a tablet that just uploaded an interview and lists it sees it.
+  This is tracked with a cookie, since the replica may lag behind;
+* views that are not wrapped, such as the sync pull, whose change tokens
+  must come from the primary's clock.
+
+Without REPLICA_DATABASE the router never picks a database and Django
+behaves as before.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+STICKY_COOKIE = "portal_primary"
+SAFE_METHODS = ("GET", "HEAD")
+
+# {"alias": <replica alias or None>} for the request or command being served.
+# A dict rather than the alias itself so a write deep inside the ORM can pin
+# the rest of the request to the primary.
+_reads = ContextVar("portal_replica_reads", default=None)
+
+
+def replica_alias():
+    return getattr(settings, "REPLICA_DATABASE", None)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Sends reads inside the block to the replica, until the first write."""
+    token = _reads.set({"alias": replica_alias() if enabled else None})
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+def _wants_replica(request):
+    return request.method in SAFE_METHODS and STICKY_COOKIE not in request.COOKIES
+
+
+def _stick_to_primary(request, response):
+    if request.method not in SAFE_METHODS and response.status_code < 400 and replica_alias():
+        response.set_cookie(STICKY_COOKIE, "1", max_age=getattr(settings, "REPLICA_STICKY_SECONDS", 10), httponly=True, samesite="Lax")
+    return response
+
+
+def reads_from_replica(view_func):
+    """
+    Lets safe requests to ``view_func`` read from the replica, and marks the
+    client as sticky to the primary after a successful write. Works on both
+    sync and async views.
+    """
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            with replica_reads(_wants_replica(request)):
+                response = await view_func(request, *args, **kwargs)
+            return _stick_to_primary(request, response)
+
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads(_wants_replica(request)):
+            response = view_func(request, *args, **kwargs)
+        return _stick_to_primary(request, response)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _reads.get()
+        return state["alias"] if state else None
+
+    def db_for_write(self, model, **hints):
+        state = _reads.get()
+        if state:
+            state["alias"] = None
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == replica_alias():
+            return False
+        return None
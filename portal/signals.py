@@ -0,0 +1,139 @@
+from django.db import transaction
+from django.db.models.query import QuerySet
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import Signal
+
+from . import conditional, counters, facts, jobs, media
+from .models import ChildEducationDetailsTbl, Cover_tbl, SyncTombstone
+from .tables import PORTAL_TABLES, TABLE_SLUGS
+
+# Sent with ``instances`` and ``created`` after rows are written by
+# bulk_create/bulk_update, which don't send post_save.
+bulk_saved = Signal()
+# Sent with ``instances`` just before bulk_update writes them.
+bulk_saving = Signal()
+
+
+def record_tombstone(sender, instance, **kwargs):
+    """Leaves a tombstone so tablets learn about the delete on their next sync pull."""
+    SyncTombstone.objects.create(table=TABLE_SLUGS[sender], object_id=instance.pk, client_uuid=instance.client_uuid)
+
+
+def forget_versions(sender, instance=None, instances=None, **kwargs):
+    """Makes the next conditional GET of the rows and their table re-read the version."""
+    conditional.forget(sender, [obj.pk for obj in instances or [instance]])
+
+
+def refresh_facts(sender, instance=None, instances=None, **kwargs):
+    """Recomputes the ChildLabourFact rows that depend on the saved rows."""
+    facts.refresh_children(facts.affected_children(sender, instances or [instance]))
+
+
+def refresh_facts_after_delete(sender, instance, origin=None, **kwargs):
+    # Deleting a child (or anything above it) cascades to its fact row;
+    # only a details row deleted on its own leaves a fact to recompute.
+    deleted_directly = origin is instance or (isinstance(origin, QuerySet) and origin.model is sender)
+    if deleted_directly:
+        refresh_facts(sender, instance)
+
+
+def _own_counts(sender, instance):
+    return counters.count_rows(sender, sender.objects.filter(pk=instance.pk))
+
+
+def remember_counts(sender, instance, **kwargs):
+    """Before an update or delete, notes what the row currently counts towards."""
+    if not instance._state.adding and instance.pk is not None:
+        instance._counted = _own_counts(sender, instance)
+
+
+def count_saved(sender, instance, created, **kwargs):
+    after = _own_counts(sender, instance)
+    before = {} if created else getattr(instance, "_counted", {})
+    counters.apply({key: after.get(key, 0) - before.get(key, 0) for key in after.keys() | before.keys()})
+    instance._counted = after
+
+
+def count_bulk_saved(sender, instances, created=True, **kwargs):
+    pks = [instance.pk for instance in instances]
+    if created:
+        counters.apply(counters.count_rows(sender, sender.objects.filter(pk__in=pks)))
+    else:
+        before = set().union(*(getattr(instance, "_counter_groups", ()) for instance in instances))
+        counters.recount(before | counters.groups_of(sender, pks))
+
+
+def remember_bulk_groups(sender, instances, **kwargs):
+    """Before a bulk update, notes the groups the rows count towards, in case they move."""
+    groups = counters.groups_of(sender, [instance.pk for instance in instances])
+    for instance in instances:
+        instance._counter_groups = groups
+
+
+def count_deleted(sender, instance, **kwargs):
+    counters.apply(counters.negate(getattr(instance, "_counted", {})))
+
+
+def remember_cover_group(sender, instance, **kwargs):
+    if not instance._state.adding and instance.pk is not None:
+        instance._counter_groups = counters.groups_of(Cover_tbl, [instance.pk])
+
+
+def regroup_cover(sender, instance, created, **kwargs):
+    """A cover moved to another region, district or enumerator takes its counts along."""
+    before = getattr(instance, "_counter_groups", set())
+    group = tuple(getattr(instance, name) for name in counters.GROUP_FIELDS)
+    if not created and before and before != {group}:
+        counters.recount(before | {group})
+
+
+def enrich_cover(sender, instance, **kwargs):
+    """Queues the farmer lookup that Cover_tbl.save() deferred."""
+    if instance.__dict__.pop("_farmer_details_pending", False):
+        jobs.enqueue("farmer.enrich", {"cover_id": instance.pk})
+
+
+def process_images(sender, instance, **kwargs):
+    """Queues newly uploaded images for re-encoding."""
+    loaded = instance.__dict__.setdefault("_loaded_files", {})
+    for field_name in media.IMAGE_FIELDS[sender]:
+        name = getattr(instance, field_name).name
+        if name and name != loaded.get(field_name) and not media.is_processed(name):
+            media.schedule(sender, instance.pk, field_name)
+        loaded[field_name] = name
+
+
+def release_images(sender, instance, **kwargs):
+    """Deletes a removed row's image files once the delete has committed."""
+    names = media.image_names(instance)
+    if names:
+        transaction.on_commit(lambda: jobs.enqueue("media.delete", {"names": names}))
+
+
+def connect():
+    for model in PORTAL_TABLES.values():
+        post_delete.connect(record_tombstone, sender=model, dispatch_uid=f"sync_tombstone_{model._meta.model_name}")
+        for signal in (post_save, post_delete, bulk_saved):
+            signal.connect(forget_versions, sender=model, dispatch_uid=f"conditional_get_{model._meta.model_name}")
+
+    for model in facts.SOURCE_MODELS:
+        post_save.connect(refresh_facts, sender=model, dispatch_uid=f"child_labour_fact_{model._meta.model_name}")
+        bulk_saved.connect(refresh_facts, sender=model, dispatch_uid=f"child_labour_fact_bulk_{model._meta.model_name}")
+    post_delete.connect(refresh_facts_after_delete, sender=ChildEducationDetailsTbl, dispatch_uid="child_labour_fact_details_delete")
+
+    for model in counters.SOURCES:
+        name = model._meta.model_name
+        pre_save.connect(remember_counts, sender=model, dispatch_uid=f"dashboard_counter_pre_save_{name}")
+        post_save.connect(count_saved, sender=model, dispatch_uid=f"dashboard_counter_save_{name}")
+        bulk_saving.connect(remember_bulk_groups, sender=model, dispatch_uid=f"dashboard_counter_pre_bulk_{name}")
+        bulk_saved.connect(count_bulk_saved, sender=model, dispatch_uid=f"dashboard_counter_bulk_{name}")
+        pre_delete.connect(remember_counts, sender=model, dispatch_uid=f"dashboard_counter_pre_delete_{name}")
+        post_delete.connect(count_deleted, sender=model, dispatch_uid=f"dashboard_counter_delete_{name}")
+    pre_save.connect(remember_cover_group, sender=Cover_tbl, dispatch_uid="dashboard_counter_cover_pre_save")
+    post_save.connect(regroup_cover, sender=Cover_tbl, dispatch_uid="dashboard_counter_cover_save")
+
+    for model in media.IMAGE_FIELDS:
+        post_save.connect(process_images, sender=model, dispatch_uid=f"media_{model._meta.model_name}")
+        post_delete.connect(release_images, sender=model, dispatch_uid=f"media_delete_{model._meta.model_name}")
+
+    post_save.connect(enrich_cover, sender=Cover_tbl, dispatch_uid="farmer_enrich_cover")
@@ -0,0 +1,120 @@
+"""
+Content-addressed file storage for survey media.
+
+Enumerators upload the same signature or photo to several records, and
+retries upload it again. This storage keeps one copy per distinct content:
+
+* every upload is hashed (SHA-256) while it is streamed to a temporary
+  file, and stored once as ``blobs/<ab>/<sha256>``;
+* the name Django asks for (``respondent_pictures/x.jpg``) becomes a hard
+  link to that blob, so names, URLs and ``open()`` work as with
+  FileSystemStorage, and the media pipeline's directories are unchanged;
+* the filesystem's link count is the reference count. ``delete()`` removes
+  the name, and the blob goes with the last name that points to it.
+
+Rows release their files through a post_delete signal (portal/signals.py),
+however they are deleted.
+
+Hard links need every name and blob on one filesystem, i.e. under
+MEDIA_ROOT. ``manage.py dedupe_media`` moves files saved before this
+storage was enabled into the blob store.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+
+BLOB_DIR = "blobs"
+
+
+def _digest_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def blob_path(self, digest):
+        return self.path(os.path.join(BLOB_DIR, digest[:2], digest))
+
+    def _spool(self, content):
+        """Streams ``content`` to a temporary file next to the blobs. Returns ``(path, sha256)``."""
+        directory = self.path(BLOB_DIR)
+        os.makedirs(directory, exist_ok=True)
+        digest = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".part")
+        with os.fdopen(fd, "wb") as f:
+            if hasattr(content, "seek"):
+                content.seek(0)
+            for chunk in content.chunks():
+                digest.update(chunk)
+                f.write(chunk)
+        if self.file_permissions_mode is not None:
+            os.chmod(tmp, self.file_permissions_mode)
+        return tmp, digest.hexdigest()
+
+    def _save(self, name, content):
+        tmp, digest = self._spool(content)
+        blob = self.blob_path(digest)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            while True:
+                try:
+                    os.link(tmp, blob)  # first copy of this content
+                except FileExistsError:
+                    pass
+                full_path = self.path(name)
+                os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                try:
+                    os.link(blob, full_path)
+                    return str(name).replace("\\", "/")
+                except FileExistsError:
+                    name = self.get_available_name(name)
+                except FileNotFoundError:
+                    continue  # the last other reference was deleted under us; store the blob again
+        finally:
+            os.unlink(tmp)
+
+    def delete(self, name):
+        if not name:
+            raise ValueError("The name must be given to delete().")
+        try:
+            blob = self.blob_path(_digest_file(self.path(name)))
+        except FileNotFoundError:
+            return
+        super().delete(name)
+        # Checked after the unlink, so of two names deleted at once the
+        # second always sees that only the blob itself is left.
+        try:
+            if os.stat(blob).st_nlink == 1:
+                os.unlink(blob)
+        except FileNotFoundError:
+            pass  # never stored as a blob, or another delete took it
+
+    def references(self, name):
+        """How many stored names share ``name``'s content."""
+        return os.stat(self.path(name)).st_nlink - 1
+
+    def adopt(self, name):
+        """
+        Moves a file saved by plain FileSystemStorage into the blob store,
+        sharing an existing blob when the content is already stored.
+        Returns True if it was deduplicated against an existing blob.
+        """
+        full_path = self.path(name)
+        if os.stat(full_path).st_nlink > 1:
+            return False
+        blob = self.blob_path(_digest_file(full_path))
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        try:
+            os.link(full_path, blob)
+            return False
+        except FileExistsError:
+            # Swap the name for a link to the existing blob, atomically.
+            tmp = f"{full_path}.{os.getpid()}.link"
+            os.link(blob, tmp)
+            os.replace(tmp, full_path)
+            return True
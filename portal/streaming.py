@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+from .filters import InvalidQuery, apply_list_params, trim
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def _iter_ndjson(rows, encoder):
+    for row in rows:
+        yield encoder.encode(row) + "\n"
+
+
+def _iter_json_array(rows, encoder):
+    yield "["
+    first = True
+    for row in rows:
+        yield ("" if first else ",\n") + encoder.encode(row)
+        first = False
+    yield "]"
+
+
+def streaming_response(request, queryset, serialize=None):
+    """
+    Streams a whole table for ``?stream=ndjson`` or ``?stream=json``.
+
+    Rows are pulled through ``.iterator(chunk_size=...)``, which on PostgreSQL
+    uses a server-side cursor, so only one chunk is held in memory at a time
+    and the first bytes go out before the last row is read. The list filters,
+    ``?fields=`` and ``?ordering=`` apply here as they do to paginated lists.
+    """
+    fmt = request.GET.get("stream")
+    if fmt not in STREAM_FORMATS:
+        return JsonResponse({"error": "stream must be one of: " + ", ".join(STREAM_FORMATS)}, status=400)
+
+    try:
+        queryset, ordering, fields = apply_list_params(request, queryset)
+    except InvalidQuery as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    if ordering is None:
+        queryset = queryset.order_by("id")
+    else:
+        name, descending = ordering
+        sign = "-" if descending else ""
+        queryset = queryset.order_by(f"{sign}{name}", f"{sign}id")
+
+    chunk_size = getattr(settings, "PORTAL_STREAM_CHUNK_SIZE", 2000)
+    # Rows are read after the view returns, outside any replica_reads() block,
+    # so pick the database now.
+    rows = queryset.using(queryset.db).iterator(chunk_size=chunk_size)
+    if serialize is not None:
+        rows = (serialize(row) for row in rows)
+    if fields is not None:
+        rows = (trim(row, fields) for row in rows)
+
+    encoder = DjangoJSONEncoder()
+    body = _iter_ndjson(rows, encoder) if fmt == "ndjson" else _iter_json_array(rows, encoder)
+    return StreamingHttpResponse(body, content_type=STREAM_FORMATS[fmt])
@@ -0,0 +1,246 @@
+"""
+Delta sync for the field tablets.
+
+Pull: ``GET /api/sync/pull/?since=<token>`` returns the rows changed since the
+token (ordered by ``updated_at, id``, at most SYNC_PULL_LIMIT per table) plus
+tombstones for deleted rows, and a new token. Clients keep pulling while
+``has_more`` is true.
+
+Cursors are built on the app-stamped ``updated_at``, which is set before
+the row commits. A transaction that stays open for a while (a push saving
+covers one by one, each with a farmer lookup) commits rows stamped earlier
+than rows other requests have already committed. So a pull only reads up to
+the start of the oldest transaction that is still writing, less
+SYNC_SAFETY_LAG_SECONDS for clock skew; a cursor never passes a row that is
+yet to commit.
+
+Tombstones are kept for SYNC_TOMBSTONE_TTL days (``manage.py
+purge_sync_tombstones``). A token issued longer ago than that may have
+missed deletes, so it is refused and the tablet pulls from scratch.
+
+Push: ``POST /api/sync/push/`` upserts batches keyed on ``client_uuid``, so
+re-sending a batch after a dropped connection updates the same rows instead
+of duplicating them. A row can point at a parent created offline with
+``<fk name>_uuid`` (e.g. ``consent_uuid``) instead of the server id.
+"""
+import base64
+import binascii
+import json
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .interview import SubmissionError, field_values, validation_messages
+from .models import SyncTombstone
+from .signals import bulk_saved
+from .tables import PORTAL_TABLES, TABLE_SLUGS
+
+TOMBSTONES = "_deleted"
+ISSUED = "_issued"  # the horizon the token was issued at, as a (time, 0) cursor
+
+
+class InvalidSyncToken(ValueError):
+    """Raised for a sync token we did not issue."""
+
+
+def encode_token(cursors):
+    raw = {slug: [ts.isoformat(), last_id] for slug, (ts, last_id) in cursors.items()}
+    return base64.urlsafe_b64encode(json.dumps(raw, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_token(token):
+    """Returns ``{table slug: (updated_at, id)}`` — where each table was read up to."""
+    if not token:
+        return {}
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        cursors = {slug: (parse_datetime(ts), int(last_id)) for slug, (ts, last_id) in raw.items()}
+    except (binascii.Error, ValueError, TypeError, AttributeError):
+        raise InvalidSyncToken("Invalid sync token")
+    if any(ts is None for ts, _ in cursors.values()):
+        raise InvalidSyncToken("Invalid sync token")
+    return cursors
+
+
+def _after(queryset, cursor, time_field):
+    if cursor is None:
+        return queryset
+    ts, last_id = cursor
+    return queryset.filter(Q(**{f"{time_field}__gt": ts}) | Q(**{time_field: ts, "id__gt": last_id}))
+
+
+def get_tombstone_ttl():
+    return timedelta(days=getattr(settings, "SYNC_TOMBSTONE_TTL", 90))
+
+
+def oldest_open_write():
+    """Start time of the oldest other transaction that has written something, or None."""
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        # Every session runs as the app's role, so their rows are all visible
+        # here. Autovacuum takes xids too, but never writes survey rows. The
+        # view is cached for the rest of a transaction unless cleared first.
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(
+            "SELECT min(xact_start) FROM pg_stat_activity "
+            "WHERE datname = current_database() AND backend_type = 'client backend' "
+            "AND backend_xid IS NOT NULL AND pid <> pg_backend_pid()"
+        )
+        return cursor.fetchone()[0]
+
+
+def get_horizon():
+    """
+    The latest ``updated_at`` a pull may read up to: rows stamped after it
+    may still be committed below a cursor placed now.
+    """
+    now = timezone.now()
+    oldest = oldest_open_write()
+    return min(now, oldest or now) - timedelta(seconds=getattr(settings, "SYNC_SAFETY_LAG_SECONDS", 2))
+
+
+def pull(token, slugs, limit=None):
+    limit = limit or getattr(settings, "SYNC_PULL_LIMIT", 500)
+    cursors = decode_token(token)
+    issued = cursors.pop(ISSUED, None)
+    if issued is not None and issued[0] < timezone.now() - get_tombstone_ttl():
+        raise InvalidSyncToken("Sync token expired; pull again without one")
+    horizon = get_horizon()
+
+    changes, has_more = {}, False
+    for slug in slugs:
+        queryset = _after(PORTAL_TABLES[slug].objects.filter(updated_at__lte=horizon), cursors.get(slug), "updated_at")
+        rows = list(queryset.order_by("updated_at", "id").values()[:limit + 1])
+        if len(rows) > limit:
+            rows, has_more = rows[:limit], True
+        if rows:
+            cursors[slug] = (rows[-1]["updated_at"], rows[-1]["id"])
+        changes[slug] = rows
+
+    queryset = _after(SyncTombstone.objects.filter(table__in=slugs, deleted_at__lte=horizon), cursors.get(TOMBSTONES), "deleted_at")
+    tombstones = list(queryset.order_by("deleted_at", "id").values("id", "table", "object_id", "client_uuid", "deleted_at")[:limit + 1])
+    if len(tombstones) > limit:
+        tombstones, has_more = tombstones[:limit], True
+    if tombstones:
+        cursors[TOMBSTONES] = (tombstones[-1]["deleted_at"], tombstones[-1]["id"])
+    deleted = {}
+    for row in tombstones:
+        deleted.setdefault(row["table"], []).append({"id": row["object_id"], "client_uuid": row["client_uuid"]})
+
+    # Everything deleted before the horizon has been read.
+    cursors[ISSUED] = (horizon, 0)
+    return {"changes": changes, "deleted": deleted, "token": encode_token(cursors), "has_more": has_more}
+
+
+def _parse_uuid(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _resolve_parent_uuids(model, rows):
+    """
+    Rewrites ``<fk>_uuid`` keys into ``<fk>_id`` with one query per parent table.
+    Raises SubmissionError for rows whose parent uuid matches no row.
+    """
+    errors = {}
+    for field in model._meta.concrete_fields:
+        if not field.is_relation or field.related_model not in TABLE_SLUGS:
+            continue
+        key = f"{field.name}_uuid"
+        wanted = {_parse_uuid(row[key]) for row in rows if row.get(key)}
+        if not wanted:
+            continue
+        found = dict(field.related_model.objects.filter(client_uuid__in=wanted).values_list("client_uuid", "id"))
+        for i, row in enumerate(rows):
+            if not row.get(key):
+                continue
+            parent_id = found.get(_parse_uuid(row[key]))
+            if parent_id is None:
+                errors.setdefault(i, []).append(f"{key} does not match any row.")
+            else:
+                row[field.attname] = parent_id
+    if errors:
+        raise SubmissionError(errors)
+
+
+def _push_table(model, rows):
+    """Validates and upserts one table's rows. Returns ``{client_uuid: id}``."""
+    errors = {}
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict) or _parse_uuid(row.get("client_uuid")) is None:
+            errors[i] = ["client_uuid is required and must be a UUID."]
+    if errors:
+        raise SubmissionError(errors)
+
+    _resolve_parent_uuids(model, rows)
+    existing = model.objects.in_bulk([_parse_uuid(row["client_uuid"]) for row in rows], field_name="client_uuid")
+
+    created, updated, touched = [], [], set()
+    for i, row in enumerate(rows):
+        values = field_values(model, row, exclude=("updated_at",))
+        values["client_uuid"] = _parse_uuid(row["client_uuid"])
+        instance = existing.get(values["client_uuid"])
+        if instance is None:
+            instance = model(**values)
+            created.append(instance)
+        else:
+            for attname, value in values.items():
+                setattr(instance, attname, value)
+            updated.append(instance)
+        touched.update(values)
+        try:
+            instance.full_clean(validate_unique=False)
+        except ValidationError as e:
+            errors[i] = validation_messages(e)
+    if errors:
+        raise SubmissionError(errors)
+
+    now = timezone.now()
+    if "save" in model.__dict__:
+        # Models with save() side effects (Cover_tbl's farmer lookup) are saved one by one.
+        for instance in created + updated:
+            instance.save()
+    else:
+        if created:
+            model.objects.bulk_create(created)
+            bulk_saved.send(sender=model, instances=created, created=True)
+        if updated:
+            for instance in updated:
+                instance.updated_at = now
+            names = [f.name for f in model._meta.concrete_fields if f.attname in touched and not f.primary_key]
+            model.objects.bulk_update(updated, names + ["updated_at"])
+            bulk_saved.send(sender=model, instances=updated, created=False)
+    return {str(instance.client_uuid): instance.pk for instance in created + updated}
+
+
+def push(changes):
+    """
+    Upserts ``{table slug: [rows]}`` in one transaction, parents first.
+    Raises SubmissionError ``{slug: {row index: errors}}`` and writes nothing
+    if a table fails validation.
+    """
+    unknown = [slug for slug in changes if slug not in PORTAL_TABLES]
+    if unknown:
+        raise SubmissionError({"tables": [f"Unknown table: {slug}" for slug in unknown]})
+
+    ids = {}
+    with transaction.atomic():
+        for slug, model in PORTAL_TABLES.items():
+            rows = changes.get(slug)
+            if not rows:
+                continue
+            try:
+                ids[slug] = _push_table(model, rows)
+            except SubmissionError as e:
+                raise SubmissionError({slug: e.errors})
+    return ids
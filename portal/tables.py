@@ -0,0 +1,44 @@
+from .models import (
+    Cover_tbl,
+    FarmerChild,
+    ConsentLocation_tbl,
+    FarmerIdentification_OwnerIdentificationTbl,
+    FarmerIdentification_Info_OnVisit_tbl,
+    WorkersInTheFarmTbl,
+    AdultInHouseholdTbl,
+    ChildHouseholdDetailsTbl,
+    AdultHouseholdMember,
+    ChildrenInHouseholdTbl,
+    ChildInHouseholdTbl,
+    ChildEducationDetailsTbl,
+    ChildRemediationTbl,
+    HouseholdSensitizationTbl,
+    EndOfCollection,
+)
+
+# Survey tables by the slug used in their API paths.
+# Parents come before children, so walking this in order is safe for inserts.
+PORTAL_TABLES = {
+    "child": FarmerChild,
+    "cover": Cover_tbl,
+    "consent-location": ConsentLocation_tbl,
+    "farmer-identification": FarmerIdentification_Info_OnVisit_tbl,
+    "owner-identification": FarmerIdentification_OwnerIdentificationTbl,
+    "workers-in-farm": WorkersInTheFarmTbl,
+    "adult-in-household": AdultInHouseholdTbl,
+    "adult-household-member": AdultHouseholdMember,
+    "children-in-household": ChildrenInHouseholdTbl,
+    "child-in-household": ChildInHouseholdTbl,
+    "child-household-details": ChildHouseholdDetailsTbl,
+    "child-education-details": ChildEducationDetailsTbl,
+    "child-remediation": ChildRemediationTbl,
+    "household-sensitization": HouseholdSensitizationTbl,
+    "end-of-collection": EndOfCollection,
+}
+
+TABLE_SLUGS = {model: slug for slug, model in PORTAL_TABLES.items()}
+
+
+def get_table(slug):
+    """Returns the model for an API table slug, or None."""
+    return PORTAL_TABLES.get(slug)
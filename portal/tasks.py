@@ -0,0 +1,49 @@
+"""
+Background tasks run by the job queue (portal/jobs.py).
+
+Each takes JSON-friendly keyword arguments: table slugs and ids rather than
+model instances, since the row may have changed by the time a worker picks
+the job up.
+"""
+from io import StringIO
+
+from django.core.management import call_command
+
+from . import farmer_api, media
+from .jobs import PermanentFailure, task
+from .models import Cover_tbl
+from .tables import get_table
+
+
+@task("farmer.enrich")
+def enrich_cover(cover_id):
+    """
+    Fills a cover's farmer details from the registry. Failed lookups (network
+    errors, 5xx, 429) raise ValidationError and are retried; an unknown
+    farmer code (a 404) fails the job.
+    """
+    cover = Cover_tbl.objects.filter(pk=cover_id).first()
+    if cover is None:
+        return
+    details = farmer_api.fetch_farmer_details(cover.farmer_code)
+    if details is None:
+        raise PermanentFailure(f"Farmer Code {cover.farmer_code} not found in external database.")
+    cover.apply_farmer_details(details)
+    cover.save()
+
+
+@task("media.process")
+def process_image(table, pk, field_name):
+    media.process_image(get_table(table), pk, field_name)
+
+
+@task("media.delete")
+def delete_files(names):
+    media.delete_files(names)
+
+
+@task("reports.rebuild")
+def rebuild_reports():
+    """Recomputes ChildLabourFact and DashboardCounter from the survey tables."""
+    call_command("rebuild_child_labour_facts", stdout=StringIO())
+    call_command("rebuild_dashboard_counters", stdout=StringIO())
@@ -1,3 +1,1486 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import json
+import os
+import signal
+import tempfile
+import time
+import uuid
+from io import BytesIO, StringIO
+from datetime import datetime, timedelta
+from itertools import count
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.db import connection, connections, models
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import classification, counters, facts, idempotency, jobs, media, pagination, storage, uploads, farmer_api, filters, sync
+from .db import describe_connection
+from .farmer_stub import SAMPLE_FARMERS, FarmerStubServer
+from .interview import INTERVIEW_TREE, SubmissionError
+from .models import (
+    AdultHouseholdMember,
+    BackgroundJob,
+    ChildEducationDetailsTbl,
+    ChildHouseholdDetailsTbl,
+    ChildInHouseholdTbl,
+    ChildLabourFact,
+    ChildRemediationTbl,
+    ChildrenInHouseholdTbl,
+    ConsentLocation_tbl,
+    Cover_tbl,
+    DashboardCounter,
+    EndOfCollection,
+    FarmerChild,
+    FarmerRegistry,
+    HouseholdSensitizationTbl,
+    IdempotencyKey,
+    SyncTombstone,
+    UploadSession,
+)
+from .signals import bulk_saved
+from .routers import STICKY_COOKIE, ReplicaRouter, reads_from_replica
+from .tables import TABLE_SLUGS
+
+
+class FarmerDetailsCacheTests(SimpleTestCase):
+    def test_lru_eviction(self):
+        cache = farmer_api.FarmerDetailsCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+
+    def test_ttl_expiry(self):
+        cache = farmer_api.FarmerDetailsCache(maxsize=2, ttl=60)
+        cache.set("a", 1, ttl=-1)
+        self.assertIsNone(cache.get("a"))
+
+
+@override_settings(FARMER_REGISTRY_MIRROR=False)
+class FarmerLookupTests(SimpleTestCase):
+    def setUp(self):
+        farmer_api.local_cache.clear()
+        self.stub = FarmerStubServer().start()
+        self.addCleanup(self.stub.stop)
+        self.addCleanup(farmer_api.local_cache.clear)
+
+    def test_repeat_lookup_hits_network_once(self):
+        with override_settings(FARMER_API_URL=self.stub.url):
+            first = farmer_api.fetch_farmer_details("FARM-0001")
+            second = farmer_api.fetch_farmer_details("FARM-0001")
+        self.assertEqual(first["region"], "Ashanti")
+        self.assertEqual(first, second)
+        self.assertEqual(self.stub.hits["FARM-0001"], 1)
+
+    def test_unknown_farmer_is_negatively_cached(self):
+        with override_settings(FARMER_API_URL=self.stub.url):
+            self.assertIsNone(farmer_api.fetch_farmer_details("NOPE"))
+            self.assertIsNone(farmer_api.fetch_farmer_details("NOPE"))
+        self.assertEqual(self.stub.hits["NOPE"], 1)
+
+    def test_failed_lookups_raise_and_are_not_cached(self):
+        self.stub.fail_with = 503
+        with override_settings(FARMER_API_URL=self.stub.url):
+            with self.assertRaisesMessage(ValidationError, "HTTP 503"):
+                farmer_api.fetch_farmer_details("FARM-0001")
+            self.stub.fail_with = None
+            self.assertEqual(farmer_api.fetch_farmer_details("FARM-0001")["region"], "Ashanti")
+        self.assertEqual(self.stub.hits["FARM-0001"], 2)
+        with self.assertRaisesMessage(ValidationError, "invalid JSON"):
+            farmer_api._read_response("FARM-0001", 200, lambda: json.loads("<html>"))
+
+    @override_settings(
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        FARMER_API_CACHE_ALIAS="default", FARMER_API_NEGATIVE_CACHE_TTL=60,
+    )
+    def test_shared_cache_misses_keep_the_negative_ttl(self):
+        caches["default"].set(farmer_api._cache_key("NOPE"), {})
+        self.assertIsNone(farmer_api.fetch_farmer_details("NOPE"))
+        expires_at, _ = farmer_api.local_cache._data["NOPE"]
+        self.assertLessEqual(expires_at - time.monotonic(), 60)
+        self.assertEqual(self.stub.hits["NOPE"], 0)
+
+    async def test_async_lookup_shares_the_cache(self):
+        with override_settings(FARMER_API_URL=self.stub.url):
+            first = await farmer_api.afetch_farmer_details("FARM-0002")
+            second = farmer_api.fetch_farmer_details("FARM-0002")
+        self.assertEqual(first["district"], "Sefwi Wiawso")
+        self.assertEqual(first, second)
+        self.assertEqual(self.stub.hits["FARM-0002"], 1)
+
+    def test_async_client_per_event_loop(self):
+        async def clients():
+            return farmer_api.get_async_client(), farmer_api.get_async_client()
+
+        first, again = asyncio.run(clients())
+        self.assertIs(first, again)
+        self.assertIsNot(asyncio.run(clients())[0], first)
+
+
+class FarmerRegistryTests(TestCase):
+    def setUp(self):
+        farmer_api.local_cache.clear()
+        farmers = {
+            code: dict(farmer, updated_at=f"2025-01-0{day}T10:00:00+00:00")
+            for day, (code, farmer) in enumerate(SAMPLE_FARMERS.items(), start=1)
+        }
+        self.stub = FarmerStubServer(farmers).start()
+        self.addCleanup(self.stub.stop)
+        self.addCleanup(farmer_api.local_cache.clear)
+        self.enterContext(override_settings(FARMER_API_URL=self.stub.url, FARMER_REGISTRY_URL=self.stub.registry_url))
+
+    def test_sync_command_mirrors_the_registry_incrementally(self):
+        call_command("sync_farmer_registry", "--page-size=1", stdout=StringIO())
+        self.assertEqual(
+            list(FarmerRegistry.objects.order_by("farmer_code").values_list("farmer_code", "region")),
+            [("FARM-0001", "Ashanti"), ("FARM-0002", "Western North")],
+        )
+        self.assertEqual(len(self.stub.registry_queries), 2)
+        self.assertNotIn("updated_since", self.stub.registry_queries[0])
+
+        self.stub.farmers["FARM-0001"].update(region="Eastern", updated_at="2025-02-01T10:00:00+00:00")
+        call_command("sync_farmer_registry", stdout=StringIO())
+        self.assertEqual(self.stub.registry_queries[-1]["updated_since"], "2025-01-02T10:00:00+00:00")
+        self.assertEqual(FarmerRegistry.objects.get(farmer_code="FARM-0001").region, "Eastern")
+
+    def test_mirror_hit_skips_the_network(self):
+        FarmerRegistry.objects.create(farmer_code="FARM-0001", region="Volta")
+        self.assertEqual(farmer_api.fetch_farmer_details("FARM-0001")["region"], "Volta")
+        self.assertEqual(self.stub.hits["FARM-0001"], 0)
+
+        # A miss goes to the API and is written through to the mirror.
+        self.assertEqual(farmer_api.fetch_farmer_details("FARM-0002")["region"], "Western North")
+        self.assertEqual(FarmerRegistry.objects.get(farmer_code="FARM-0002").region, "Western North")
+        self.assertEqual(self.stub.hits["FARM-0002"], 1)
+
+class SyncTokenTests(SimpleTestCase):
+    def test_round_trip(self):
+        cursors = {"cover": (datetime.fromisoformat("2025-01-01T10:00:00+00:00"), 42)}
+        self.assertEqual(sync.decode_token(sync.encode_token(cursors)), cursors)
+
+    def test_rejects_garbage(self):
+        with self.assertRaises(sync.InvalidSyncToken):
+            sync.decode_token("not-a-token")
+
+
+@override_settings(SYNC_SAFETY_LAG_SECONDS=0)
+class SyncTests(TestCase):
+    def test_push_and_pull(self):
+        child_uuid, cover_uuid = str(uuid.uuid4()), str(uuid.uuid4())
+        changes = {
+            "cover": [{"client_uuid": cover_uuid, "enumerator_name": "Kofi", "farmer_code": "FARM-0001", "FarmerChild_uuid": child_uuid}],
+            "child": [{"client_uuid": child_uuid, "name": "Ama"}],
+        }
+        with patch.object(farmer_api, "fetch_farmer_details", return_value={"region": "Ashanti"}):
+            ids = sync.push(changes)
+        cover = Cover_tbl.objects.get(pk=ids["cover"][cover_uuid])
+        self.assertEqual((cover.FarmerChild_id, cover.region), (ids["child"][child_uuid], "Ashanti"))
+
+        first = sync.pull(None, ["child", "cover"])
+        self.assertEqual([len(first["changes"][slug]) for slug in ("child", "cover")], [1, 1])
+        self.assertFalse(first["has_more"])
+
+        # A re-sent row updates the same record.
+        self.assertEqual(sync.push({"child": [{"client_uuid": child_uuid, "name": "Kofi"}]}), {"child": ids["child"]})
+        second = sync.pull(first["token"], ["child", "cover"])
+        self.assertEqual([row["name"] for row in second["changes"]["child"]], ["Kofi"])
+        self.assertEqual(second["changes"]["cover"], [])
+
+        cover.delete()
+        third = sync.pull(second["token"], ["child", "cover"])
+        self.assertEqual(third["deleted"], {"cover": [{"id": ids["cover"][cover_uuid], "client_uuid": uuid.UUID(cover_uuid)}]})
+
+        with self.assertRaises(SubmissionError):
+            sync.push({"child": [{"name": "no uuid"}]})
+
+    def test_unknown_parent_uuid_is_rejected(self):
+        child = {"client_uuid": str(uuid.uuid4()), "household_uuid": str(uuid.uuid4()), "child_first_name": "Ama"}
+        response = self.client.post("/api/sync/push/", {"changes": {"child-in-household": [child]}}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["error"], {"child-in-household": {"0": ["household_uuid does not match any row."]}})
+        self.assertFalse(ChildInHouseholdTbl.objects.exists())
+
+        # A nullable parent is not left empty either.
+        consent = {"client_uuid": str(uuid.uuid4()), "cover_uuid": "not-a-uuid"}
+        with self.assertRaises(SubmissionError) as raised:
+            sync.push({"consent-location": [consent]})
+        self.assertEqual(raised.exception.errors, {"consent-location": {0: ["cover_uuid does not match any row."]}})
+
+    def test_pulls_stop_at_the_oldest_open_write(self):
+        # A push still running on another connection.
+        other = type(connections["default"])(connection.settings_dict, alias="sync_test")
+        self.addCleanup(other.close)
+        other.set_autocommit(False)
+        try:
+            with other.cursor() as cursor:
+                cursor.execute("SELECT txid_current(), now()")
+                started = cursor.fetchone()[1]
+            self.assertLessEqual(sync.get_horizon(), started)
+        finally:
+            other.rollback()
+        self.assertGreater(sync.get_horizon(), started)
+
+    def test_old_tokens_and_tombstones_expire(self):
+        old = timezone.now() - timedelta(days=91)
+        with self.assertRaises(sync.InvalidSyncToken):
+            sync.pull(sync.encode_token({sync.ISSUED: (old, 0)}), ["child"])
+        tombstone = SyncTombstone.objects.create(table="child", object_id=1)
+        SyncTombstone.objects.filter(pk=tombstone.pk).update(deleted_at=old)
+        SyncTombstone.objects.create(table="child", object_id=2)
+        call_command("purge_sync_tombstones", stdout=StringIO())
+        self.assertEqual(list(SyncTombstone.objects.values_list("object_id", flat=True)), [2])
+
+
+class ListFilterTests(SimpleTestCase):
+    def test_cover_filter_joins_through_the_interview(self):
+        request = RequestFactory().get("/", {"region": "Ashanti", "year_birth__gte": "1990"})
+        queryset = filters.filter_queryset(request, AdultHouseholdMember.objects.all())
+        sql = str(queryset.query)
+        self.assertIn('"portal_cover_tbl"."region" = Ashanti', sql)
+        self.assertIn('"year_birth" >= 1990', sql)
+
+    def test_unknown_parameter_is_rejected(self):
+        request = RequestFactory().get("/", {"regoin": "Ashanti"})
+        with self.assertRaises(filters.InvalidQuery):
+            filters.filter_queryset(request, AdultHouseholdMember.objects.all())
+
+    def test_fields_projection(self):
+        request = RequestFactory().get("/", {"fields": "full_name", "ordering": "-year_birth"})
+        queryset, ordering, fields = filters.apply_list_params(request, AdultHouseholdMember.objects.values())
+        self.assertEqual(ordering, ("year_birth", True))
+        self.assertEqual(list(queryset.query.values_select), ["full_name", "id", "year_birth"])
+
+
+_sequence = count()
+
+
+def make_row(model, **values):
+    """Saves a ``model`` row with placeholder values for every required column, skipping validation and save()."""
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.null or field.has_default() or field.attname in values or field.name in values:
+            continue
+        if isinstance(field, models.DateTimeField):
+            values[field.name] = timezone.now()
+        elif isinstance(field, (models.IntegerField, models.DecimalField, models.FloatField)):
+            values[field.name] = 1
+        elif field.unique:
+            values[field.name] = f"{field.name}-{next(_sequence)}"
+    return model.objects.bulk_create([model(**values)])[0]
+
+
+
+def valid_values(model, exclude=(), **values):
+    """JSON values for every required column of ``model`` that pass full_clean()."""
+    for field in model._meta.concrete_fields:
+        if field.primary_key or field.null or field.blank or field.has_default() or field.name in exclude or field.name in values:
+            continue
+        if field.choices:
+            values[field.name] = field.choices[0][0]
+        elif isinstance(field, models.DateTimeField):
+            values[field.name] = timezone.now().isoformat()
+        elif isinstance(field, models.DateField):
+            values[field.name] = "2025-01-01"
+        elif isinstance(field, (models.IntegerField, models.DecimalField, models.FloatField)):
+            values[field.name] = 1
+        else:
+            values[field.name] = "x"
+    return values
+
+# conditional.py only caches in a cache every worker shares, which locmem isn't.
+shared_response_cache = override_settings(
+    CACHES={
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "responses": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.path.join(tempfile.gettempdir(), "gatherflow-test-responses"),
+        },
+    },
+    RESPONSE_CACHE_ALIAS="responses",
+)
+
+
+def clear_caches():
+    for backend in caches.all():
+        backend.clear()
+
+
+@shared_response_cache
+class QueryCountTests(TestCase):
+    """Every detail and list GET must cost one query, whatever the foreign keys."""
+
+    @classmethod
+    def setUpTestData(cls):
+        child = make_row(FarmerChild, name="Ama")
+        cover = make_row(Cover_tbl, FarmerChild=child)
+        cls.rows = {FarmerChild: child, Cover_tbl: cover}
+
+        def walk(tree, parent):
+            for _, model, fk_name, subtree in tree:
+                cls.rows[model] = make_row(model, **{fk_name: parent})
+                walk(subtree, cls.rows[model])
+
+        walk(INTERVIEW_TREE, cover)
+
+    def setUp(self):
+        clear_caches()
+
+    def test_detail_views(self):
+        for model, row in self.rows.items():
+            if model is ChildHouseholdDetailsTbl:
+                continue  # not routed
+            url = f"/api/{TABLE_SLUGS[model]}/{row.pk}/"
+            # The row's version, then the view's own query; repeats come from the cache.
+            with self.subTest(url=url), self.assertNumQueries(2):
+                self.assertEqual(self.client.get(url).status_code, 200)
+            with self.subTest(url=url), self.assertNumQueries(0):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_list_views(self):
+        for model in self.rows:
+            if model is ChildHouseholdDetailsTbl:
+                continue
+            url = f"/api/{TABLE_SLUGS[model]}/"
+            with self.subTest(url=url), self.assertNumQueries(2):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_batch_get(self):
+        child = self.rows[ChildInHouseholdTbl]
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/child-in-household/", {"ids": f"{child.pk},999999", "fields": "child_gender"})
+        self.assertEqual(response.json(), {"data": {str(child.pk): {"child_gender": ""}}, "missing": [999999]})
+        self.assertEqual(self.client.get("/api/child-in-household/", {"ids": "1,x"}).status_code, 400)
+
+    def test_fields_on_serialized_table(self):
+        details = self.rows[ChildEducationDetailsTbl]
+        for _ in range(4):
+            make_row(ChildEducationDetailsTbl, child=details.child)
+        url = "/api/child-education-details/"
+        params = {"fields": "id,child_father_location"}
+        with self.assertNumQueries(2):
+            rows = self.client.get(url, params).json()["data"]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {"id", "child_father_location"})
+        # The table's version is cached by now, leaving the rows query.
+        with self.assertNumQueries(1):
+            self.client.get(url, {**params, "ids": details.pk})
+        with self.assertNumQueries(1):
+            lines = b"".join(self.client.get(url, {**params, "stream": "ndjson"}).streaming_content).splitlines()
+        self.assertEqual(json.loads(lines[0]), {"id": details.pk, "child_father_location": details.child_father_location})
+
+    def test_interview_tree(self):
+        household = self.rows[ChildInHouseholdTbl].household
+        for _ in range(3):
+            child = make_row(ChildInHouseholdTbl, household=household)
+            make_row(ChildHouseholdDetailsTbl, child_in_household=child)
+        # The cover plus one query for each of the 13 tables below it.
+        with self.assertNumQueries(14):
+            response = self.client.get(f"/api/interview/{self.rows[Cover_tbl].pk}/")
+        tree = response.json()["data"]
+        consent = tree["consent_location"][0]
+        self.assertEqual(len(consent["child_in_household"][0]["children"]), 4)
+        self.assertEqual(len(consent["household_sensitization"][0]["end_of_collection"]), 1)
+
+    def test_admin_changelists_do_not_query_per_row(self):
+        self.client.force_login(get_user_model().objects.create_superuser("admin", "admin@example.com", "pw"))
+        for model, row in self.rows.items():
+            if not admin.site.is_registered(model):
+                continue
+            url = reverse(f"admin:portal_{model._meta.model_name}_changelist")
+            parents = {f.name: getattr(row, f.name) for f in model._meta.concrete_fields if f.is_relation}
+            with self.subTest(url=url):
+                self.client.get(url)  # warm up per-process caches (admin theme)
+                with CaptureQueriesContext(connection) as one_row:
+                    self.assertEqual(self.client.get(url).status_code, 200)
+                make_row(model, **parents)
+                make_row(model, **parents)
+                with CaptureQueriesContext(connection) as three_rows:
+                    self.client.get(url)
+                self.assertEqual(len(three_rows), len(one_row))
+
+
+class KeysetPaginationTests(TestCase):
+    url = "/api/child-in-household/"
+
+    @classmethod
+    def setUpTestData(cls):
+        household = make_row(ChildrenInHouseholdTbl)
+        cls.children = [make_row(ChildInHouseholdTbl, household=household, child_year_birth=year) for year in (2010, 2012, 2010, 2011, 2012, 2010, 2011)]
+
+    def walk(self, **params):
+        ids, cursor = [], None
+        while True:
+            page = self.client.get(self.url, {"page_size": 2, **params, **({"cursor": cursor} if cursor else {})}).json()
+            self.assertLessEqual(len(page["data"]), 2)
+            ids += [row["id"] for row in page["data"]]
+            cursor = page["next"]
+            if cursor is None:
+                return ids
+
+    def test_cursors_walk_every_row_once(self):
+        by_id = sorted(child.pk for child in self.children)
+        self.assertEqual(self.walk(), by_id)
+        # Birth years repeat, so id breaks the ties.
+        by_year = sorted(self.children, key=lambda child: (child.child_year_birth, child.pk))
+        self.assertEqual(self.walk(ordering="child_year_birth"), [child.pk for child in by_year])
+        self.assertEqual(self.walk(ordering="-child_year_birth"), [child.pk for child in reversed(by_year)])
+
+    def test_invalid_cursors_are_rejected(self):
+        tampered = pagination.encode_cursor(self.children[0].pk, "not a year")
+        for params in ({"cursor": "garbage"}, {"cursor": "eyJ4IjoxfQ"}, {"cursor": tampered, "ordering": "child_year_birth"}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+    @override_settings(PORTAL_MAX_PAGE_SIZE=3)
+    def test_page_size_is_clamped(self):
+        self.assertEqual(len(self.client.get(self.url, {"page_size": 1000}).json()["data"]), 3)
+        self.assertEqual(len(self.client.get(self.url, {"page_size": 0}).json()["data"]), 1)
+
+
+class StreamingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        child = make_row(FarmerChild, name="Ama")
+        cls.covers = [make_row(Cover_tbl, FarmerChild=child, enumerator_name=name) for name in ("Kofi", "Ama", "Yaw")]
+
+    def stream(self, fmt, **params):
+        return self.client.get("/api/cover/", {"stream": fmt, "fields": "id,enumerator_name", **params})
+
+    def test_formats(self):
+        expected = [{"id": cover.pk, "enumerator_name": cover.enumerator_name} for cover in self.covers]
+
+        response = self.stream("ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        self.assertEqual([json.loads(line) for line in b"".join(response.streaming_content).splitlines()], expected)
+
+        response = self.stream("json", ordering="-id")
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(json.loads(b"".join(response.streaming_content)), expected[::-1])
+
+        self.assertEqual(self.stream("xml").status_code, 400)
+
+    @override_settings(PORTAL_STREAM_CHUNK_SIZE=2)
+    def test_rows_are_read_through_a_server_side_cursor(self):
+        def open_cursors():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT count(*) FROM pg_cursors")
+                return cursor.fetchone()[0]
+
+        content = iter(self.stream("ndjson").streaming_content)
+        first = next(content)
+        self.assertEqual(open_cursors(), 1)
+        lines = [first, *content]
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(open_cursors(), 0)
+
+
+class InterviewSubmitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.farmer_child = make_row(FarmerChild, name="Ama")
+
+    def payload(self, *children):
+        def child(values):
+            return valid_values(ChildInHouseholdTbl, ("household",), **{
+                "child_year_birth": 2012, "education_details": [valid_values(ChildEducationDetailsTbl, ("child",))], **values,
+            })
+
+        return valid_values(Cover_tbl, client_id="c1", FarmerChild=self.farmer_child.pk, consent_location=[
+            valid_values(ConsentLocation_tbl, ("cover",), client_id="s1", child_in_household=[
+                valid_values(ChildrenInHouseholdTbl, ("consent",), children=[child(values) for values in children]),
+            ]),
+        ])
+
+    def submit(self, payload):
+        with patch.object(farmer_api, "fetch_farmer_details", return_value={"region": "Ashanti"}):
+            return self.client.post("/api/interview/submit/", payload, content_type="application/json")
+
+    def test_submit_maps_client_ids(self):
+        response = self.submit(self.payload({"client_id": "k1"}, {"client_id": "k2"}))
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()["ids"]
+        self.assertEqual(ids["cover"], {"c1": response.json()["id"]})
+        self.assertEqual(ConsentLocation_tbl.objects.get(pk=ids["consent_location"]["s1"]).cover_id, ids["cover"]["c1"])
+        children = ChildInHouseholdTbl.objects.filter(pk__in=ids["children"].values())
+        self.assertEqual(len({child.household_id for child in children}), 1)
+        self.assertEqual(
+            set(ChildEducationDetailsTbl.objects.values_list("child_id", flat=True)),
+            {ids["children"]["k1"], ids["children"]["k2"]},
+        )
+
+    def test_bad_child_writes_nothing(self):
+        response = self.submit(self.payload({}, {"child_year_birth": 1990}))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("child_year_birth", response.json()["error"]["cover.consent_location[0].child_in_household[0].children[1]"])
+        self.assertFalse(Cover_tbl.objects.exists())
+
+        # A child rejected by the database rolls back the rows already inserted above it.
+        client_uuid = str(uuid.uuid4())
+        response = self.submit(self.payload({"client_uuid": client_uuid}, {"client_uuid": client_uuid}))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("client_uuid", response.json()["error"])
+        self.assertFalse(Cover_tbl.objects.exists())
+        self.assertFalse(ConsentLocation_tbl.objects.exists())
+
+class BulkWriteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.household = make_row(ChildrenInHouseholdTbl)
+
+    def child(self, n, **extra):
+        return {
+            "household": self.household.pk, "child_declared_in_cover": "yes", "child_identifier": n,
+            "child_can_be_surveyed": "yes", "child_first_name": "Ama", "child_surname": "Mensah",
+            "child_gender": "Girl", "child_year_birth": 2012, "child_birth_certificate": "Yes", **extra,
+        }
+
+    def post(self, method, body):
+        return self.client.generic(method, "/api/bulk/child-in-household/", json.dumps(body), content_type="application/json")
+
+    def test_roster_round_trip(self):
+        # Parent lookup and one INSERT, plus SAVEPOINT/RELEASE around the write,
+        # then two SELECTs, an upsert and an UPDATE to refresh and classify the
+        # children's ChildLabourFact rows, and one SELECT for the dashboard
+        # counters (these children have no cover, so nothing is counted).
+        with self.assertNumQueries(9):
+            response = self.post("POST", [self.child(n) for n in range(1, 20)])
+        self.assertEqual(response.status_code, 201)
+        ids = response.json()["ids"]
+        self.assertEqual(len(ids), 19)
+
+        response = self.post("PUT", [{"id": pk, "child_gender": "Boy"} for pk in ids[:5]])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(ChildInHouseholdTbl.objects.filter(child_gender="Boy").count(), 5)
+
+        response = self.post("DELETE", ids[:3] + [999999])
+        self.assertEqual(response.json()["missing"], [999999])
+        self.assertEqual(ChildInHouseholdTbl.objects.count(), 16)
+
+    def test_errors_are_reported_per_row_and_nothing_is_written(self):
+        response = self.post("POST", [self.child(1), self.child(2, child_gender="X"), self.child(3, household=999999)])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["error"]
+        self.assertEqual(sorted(errors), ["1", "2"])
+        self.assertIn("child_gender", errors["1"])
+        self.assertIn("household", errors["2"])
+        self.assertFalse(ChildInHouseholdTbl.objects.exists())
+
+    def test_unique_clashes_are_reported_per_row(self):
+        taken, repeated = str(uuid.uuid4()), str(uuid.uuid4())
+        existing = self.post("POST", [self.child(1, client_uuid=taken)]).json()["ids"][0]
+        response = self.post("POST", [self.child(2, client_uuid=repeated), self.child(3, client_uuid=taken), self.child(4, client_uuid=repeated)])
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["error"]
+        self.assertEqual(sorted(errors), ["1", "2"])
+        self.assertEqual(errors["1"]["client_uuid"], ["Child in household tbl with this Client uuid already exists."])
+        self.assertEqual(ChildInHouseholdTbl.objects.count(), 1)
+
+        # A row keeping its own value is not a clash; taking another row's is.
+        other = self.post("POST", [self.child(2)]).json()["ids"][0]
+        self.assertEqual(self.post("PUT", [{"id": existing, "client_uuid": taken}]).status_code, 200)
+        response = self.post("PUT", [{"id": other, "client_uuid": taken}])
+        self.assertEqual(list(response.json()["error"]), ["0"])
+
+
+@override_settings(FARMER_REGISTRY_MIRROR=False)
+class AsyncTableViewTests(TestCase):
+    def setUp(self):
+        farmer_api.local_cache.clear()
+        self.stub = FarmerStubServer().start()
+        self.addCleanup(self.stub.stop)
+        self.addCleanup(farmer_api.local_cache.clear)
+
+    async def test_cover_crud(self):
+        child = await FarmerChild.objects.acreate(name="Ama")
+        body = json.dumps({"enumerator_name": "Kofi", "farmer_code": "FARM-0001", "FarmerChild": child.pk})
+        with override_settings(FARMER_API_URL=self.stub.url):
+            response = await self.async_client.post("/api/async/cover/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        pk = response.json()["id"]
+
+        response = await self.async_client.get(f"/api/async/cover/{pk}/")
+        self.assertEqual(response.json()["data"]["region"], "Ashanti")
+        response = await self.async_client.get("/api/async/cover/", {"region": "Ashanti", "fields": "farmer_code"})
+        self.assertEqual(response.json(), {"data": [{"farmer_code": "FARM-0001"}], "next": None})
+
+        response = await self.async_client.put(f"/api/async/cover/{pk}/", json.dumps({"enumerator_name": "Yaw"}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.delete(f"/api/async/cover/{pk}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(await Cover_tbl.objects.filter(pk=pk).aexists())
+        self.assertEqual(self.stub.hits["FARM-0001"], 1)
+
+    async def test_unknown_farmer_is_a_validation_error(self):
+        child = await FarmerChild.objects.acreate(name="Ama")
+        body = json.dumps({"enumerator_name": "Kofi", "farmer_code": "NOPE", "FarmerChild": child.pk})
+        with override_settings(FARMER_API_URL=self.stub.url):
+            response = await self.async_client.post("/api/async/cover/", body, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(FARMER_DETAILS_IN_BACKGROUND=True, JOB_BACKEND="database")
+    async def test_background_farmer_lookups_are_queued(self):
+        child = await FarmerChild.objects.acreate(name="Ama")
+        body = json.dumps({"enumerator_name": "Kofi", "farmer_code": "NOPE", "FarmerChild": child.pk})
+        with override_settings(FARMER_API_URL=self.stub.url):
+            response = await self.async_client.post("/api/async/cover/", body, content_type="application/json")
+            self.assertEqual(response.status_code, 201)
+            pk = response.json()["id"]
+            body = json.dumps({"farmer_code": "FARM-0001"})
+            response = await self.async_client.put(f"/api/async/cover/{pk}/", body, content_type="application/json")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual((self.stub.hits["NOPE"], self.stub.hits["FARM-0001"]), (0, 0))
+        payloads = [job.payload async for job in BackgroundJob.objects.filter(name="farmer.enrich")]
+        self.assertEqual(payloads, [{"cover_id": pk}, {"cover_id": pk}])
+
+
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.consent = make_row(ConsentLocation_tbl)
+
+    def body(self, **values):
+        fields = ["school_fees_owed", "parent_remediation", "parent_remediation_other", "community_remediation", "community_remediation_other"]
+        return json.dumps({"consent": self.consent.pk, **dict.fromkeys(fields, "no"), **values})
+
+    def post(self, key, **values):
+        return self.client.post("/api/child-remediation/", self.body(**values), content_type="application/json", HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_is_replayed(self):
+        first = self.post("k1")
+        self.assertEqual(first.status_code, 201)
+        retry = self.post("k1")
+        self.assertEqual((retry.status_code, retry.json()), (201, first.json()))
+        self.assertEqual(retry[idempotency.REPLAYED_HEADER], "true")
+        self.assertEqual(ChildRemediationTbl.objects.count(), 1)
+        self.assertEqual(self.post("k1", school_fees_owed="yes").status_code, 422)
+
+    def test_in_progress_and_abandoned_requests(self):
+        request = RequestFactory().post("/api/child-remediation/", self.body(), content_type="application/json")
+        fingerprint = idempotency.request_fingerprint(request)
+        record = IdempotencyKey.objects.create(key="k2", path="/api/child-remediation/", fingerprint=fingerprint)
+        self.assertEqual(self.post("k2").status_code, 409)
+
+        # The worker running it died: once it's stale, a retry runs the view.
+        IdempotencyKey.objects.filter(pk=record.pk).update(created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.post("k2").status_code, 201)
+        self.assertEqual(self.post("k2")[idempotency.REPLAYED_HEADER], "true")
+
+    def test_multipart_upload_larger_than_the_body_limit(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, DATA_UPLOAD_MAX_MEMORY_SIZE=1024))
+
+        def upload(color):
+            photo = image_upload("respondent.jpg", (400, 400), color=color, quality=95)
+            self.assertGreater(photo.size, 1024)
+            return self.client.post("/api/end-of-collection/", {"feedback_enum": "ok", "picture_of_respondent": photo}, HTTP_IDEMPOTENCY_KEY="k3")
+
+        first = upload("red")
+        self.assertEqual(first.status_code, 201)
+        retry = upload("red")
+        self.assertEqual((retry.json(), retry[idempotency.REPLAYED_HEADER]), (first.json(), "true"))
+        self.assertEqual(upload("blue").status_code, 422)
+        self.assertEqual(EndOfCollection.objects.count(), 1)
+
+
+class ConnectionPoolTests(TestCase):
+    def test_unpooled_stats(self):
+        self.assertEqual(self.client.get("/api/db/pool/").status_code, 401)
+        User = get_user_model()
+        self.client.force_login(User.objects.create_user("enumerator", password="pw"))
+        self.assertEqual(self.client.get("/api/db/pool/").status_code, 403)
+
+        self.client.force_login(User.objects.create_user("ops", password="pw", is_staff=True))
+        response = self.client.get("/api/db/pool/")
+        default = response.json()["databases"]["default"]
+        self.assertIsNone(default["pool"])
+        self.assertEqual(default["conn_max_age"], connection.settings_dict["CONN_MAX_AGE"])
+
+    def test_pool_counters(self):
+        settings_dict = {**connection.settings_dict, "CONN_MAX_AGE": 0, "OPTIONS": {"pool": {"min_size": 1, "max_size": 2}}}
+        pooled = type(connections["default"])(settings_dict, alias="pool_test")
+        self.addCleanup(pooled.close_pool)
+        for _ in range(3):
+            pooled.ensure_connection()
+            pooled.close()
+
+        stats = describe_connection(pooled)["pool"]
+        self.assertEqual(stats["max_size"], 2)
+        self.assertEqual(stats["requests_num"], 3)
+        self.assertLessEqual(stats["pool_size"], 2)
+
+
+@shared_response_cache
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        clear_caches()
+        self.child = FarmerChild.objects.create(name="Ama")
+
+    def test_detail_revalidation(self):
+        url = f"/api/child/{self.child.pk}/"
+        response = self.client.get(url)
+        etag = response["ETag"]
+        self.assertIn("Last-Modified", response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"])
+        self.assertEqual(response.status_code, 304)
+
+        self.child.name = "Kofi"
+        self.child.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Kofi")
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_list_changes_on_insert_and_delete(self):
+        etag = self.client.get("/api/child/")["ETag"]
+        self.assertEqual(self.client.get("/api/child/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertNotEqual(self.client.get("/api/child/", {"page_size": 1})["ETag"], etag)
+
+        other = FarmerChild.objects.create(name="Kofi")
+        response = self.client.get("/api/child/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.json()["data"]), 2)
+
+        etag = response["ETag"]
+        other.delete()
+        response = self.client.get("/api/child/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 1)
+        self.assertEqual(self.client.get(f"/api/child/{other.pk}/").status_code, 404)
+
+    def test_list_changes_when_an_older_stamped_row_commits(self):
+        FarmerChild.objects.filter(pk=self.child.pk).update(updated_at=timezone.now() + timedelta(hours=1))
+        etag = self.client.get("/api/child/")["ETag"]
+
+        # Saved by a transaction that started before the latest save but committed after it.
+        FarmerChild.objects.create(name="Kofi")
+        response = self.client.get("/api/child/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 2)
+
+    def test_filtered_list_follows_joined_tables(self):
+        cover = make_row(Cover_tbl, FarmerChild=self.child, region="")
+        make_row(ConsentLocation_tbl, cover=cover)
+        url = "/api/consent-location/"
+        response = self.client.get(url, {"region": "Ashanti"})
+        self.assertEqual(response.json()["data"], [])
+        etag = response["ETag"]
+
+        cover = Cover_tbl.objects.get(pk=cover.pk)
+        cover.region = "Ashanti"
+        cover.save()
+        response = self.client.get(url, {"region": "Ashanti"}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["data"]), 1)
+
+    @override_settings(RESPONSE_CACHE_ALIAS="default")
+    def test_per_process_cache_is_not_used(self):
+        url = f"/api/child/{self.child.pk}/"
+        etag = self.client.get(url)["ETag"]
+        # A write in another worker: its forget() would never reach this process.
+        FarmerChild.objects.filter(pk=self.child.pk).update(name="Kofi", updated_at=timezone.now())
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "Kofi")
+
+
+def image_upload(name, size, mode="RGB", color="red", **save_options):
+    buffer = BytesIO()
+    Image.new(mode, size, color).save(buffer, format="PNG" if name.endswith(".png") else "JPEG", **save_options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+@override_settings(JOB_BACKEND="inline", MEDIA_MAX_DIMENSION=800, MEDIA_THUMBNAIL_SIZE=100)
+class MediaProcessingTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name))
+
+    def test_uploads_are_reencoded_after_commit(self):
+        exif = Image.Exif()
+        exif[0x8825] = {1: "N", 2: (5.0, 36.0, 0.0)}  # GPS position
+        photo = image_upload("respondent.jpg", (3000, 2000), exif=exif, quality=95)
+        signature = image_upload("signature.png", (1200, 400), mode="RGBA", color=(0, 0, 0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/end-of-collection/", {
+                "feedback_enum": "ok", "picture_of_respondent": photo, "signature_producer": signature,
+            })
+        record = EndOfCollection.objects.get(pk=response.json()["id"])
+
+        self.assertTrue(media.is_processed(record.picture_of_respondent.name))
+        with default_storage.open(record.picture_of_respondent.name) as f, Image.open(f) as image:
+            self.assertEqual((image.format, image.size), ("JPEG", (800, 533)))
+            self.assertEqual(len(image.getexif()), 0)
+        with default_storage.open(media.thumbnail_name(record.picture_of_respondent.name)) as f, Image.open(f) as image:
+            self.assertEqual((image.format, image.size), ("WEBP", (100, 67)))
+        with default_storage.open(record.signature_producer.name) as f, Image.open(f) as image:
+            self.assertEqual((image.format, image.mode), ("PNG", "1"))
+        self.assertEqual(len(default_storage.listdir("respondent_pictures")[1]), 0)  # original removed
+
+        data = self.client.get(f"/api/end-of-collection/{record.pk}/").json()
+        self.assertTrue(data["picture_of_respondent_thumbnail"].endswith(".thumb.webp"))
+        self.assertIsNone(media.process_image(EndOfCollection, record.pk, "picture_of_respondent"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/end-of-collection/{record.pk}/")
+        self.assertEqual(default_storage.listdir("respondent_pictures/processed")[1], [])
+
+    def test_command_processes_backlog(self):
+        row = make_row(HouseholdSensitizationTbl, picture_sensitization=default_storage.save("sensitization/a.jpg", image_upload("a.jpg", (400, 300))))
+        self.assertEqual(media.unprocessed(HouseholdSensitizationTbl, "picture_sensitization").count(), 1)
+        call_command("process_media", stdout=StringIO())
+        row.refresh_from_db()
+        self.assertEqual(row.picture_sensitization.name, "sensitization/processed/a.jpg")
+        self.assertFalse(media.unprocessed(HouseholdSensitizationTbl, "picture_sensitization").exists())
+
+    def test_only_new_uploads_are_queued(self):
+        row = HouseholdSensitizationTbl.objects.get(pk=make_row(HouseholdSensitizationTbl).pk)
+        row.picture_sensitization = default_storage.save("sensitization/a.jpg", image_upload("a.jpg", (400, 300)))
+        row.save()
+        queued = BackgroundJob.objects.filter(name="media.process")
+        self.assertEqual(queued.count(), 1)
+
+        row.save()
+        row = HouseholdSensitizationTbl.objects.get(pk=row.pk)
+        row.save()
+        self.assertEqual(queued.count(), 1)
+
+        row.picture_sensitization = default_storage.save("sensitization/b.jpg", image_upload("b.jpg", (400, 300)))
+        row.save()
+        self.assertEqual(queued.count(), 2)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, STORAGES={
+            "default": {"BACKEND": "portal.storage.ContentAddressedStorage"},
+            "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+        }))
+        self.signature = image_upload("signature.png", (300, 100)).read()
+
+    def blobs(self):
+        return [name for _, _, files in os.walk(os.path.join(default_storage.location, storage.BLOB_DIR)) for name in files]
+
+    def test_identical_uploads_share_a_blob_until_the_last_delete(self):
+        ids = [
+            self.client.post("/api/end-of-collection/", {
+                "feedback_enum": "ok", "signature_producer": SimpleUploadedFile("signature.png", self.signature),
+            }).json()["id"]
+            for _ in range(2)
+        ]
+        run_due_jobs()  # re-encoding gives identical signatures identical output
+        first, second = EndOfCollection.objects.filter(pk__in=ids).order_by("pk")
+        self.assertNotEqual(first.signature_producer.name, second.signature_producer.name)
+        self.assertEqual(default_storage.references(first.signature_producer.name), 2)
+        self.assertEqual(len(self.blobs()), 1)
+        with default_storage.open(first.signature_producer.name) as f:
+            content = f.read()
+
+        # The files are deleted by a background job.
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/end-of-collection/{first.pk}/")
+        run_due_jobs()
+        with default_storage.open(second.signature_producer.name) as f:
+            self.assertEqual(f.read(), content)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/end-of-collection/{second.pk}/")
+        run_due_jobs()
+        self.assertEqual(self.blobs(), [])
+
+    def test_every_kind_of_delete_releases_files(self):
+        sensitization = make_row(HouseholdSensitizationTbl)
+        rows = [
+            make_row(EndOfCollection, sensitization=sensitization, signature_producer=default_storage.save("producer_signatures/s.png", ContentFile(self.signature)))
+            for _ in range(3)
+        ]
+        self.assertEqual(default_storage.references(rows[0].signature_producer.name), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.generic("DELETE", "/api/bulk/end-of-collection/", json.dumps([rows[0].pk]), content_type="application/json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/async/end-of-collection/{rows[1].pk}/")
+        with self.captureOnCommitCallbacks(execute=True):
+            sensitization.delete()  # cascades to the last row
+        run_due_jobs()
+        self.assertEqual(self.blobs(), [])
+        self.assertEqual(default_storage.listdir("producer_signatures")[1], [])
+
+    def test_concurrent_deletes_of_the_last_names_free_the_blob(self):
+        names = [default_storage.save("producer_signatures/s.png", ContentFile(self.signature)) for _ in range(2)]
+        unlink = os.unlink
+
+        def delete_both(path):
+            # The other name is deleted after this delete started but before it unlinks.
+            if path == default_storage.path(names[0]):
+                default_storage.delete(names[1])
+            unlink(path)
+
+        with patch("django.core.files.storage.filesystem.os.remove", side_effect=delete_both):
+            default_storage.delete(names[0])
+        self.assertEqual(self.blobs(), [])
+
+    def test_dedupe_existing_files(self):
+        plain = FileSystemStorage()
+        names = [plain.save(f"producer_signatures/{n}.png", ContentFile(self.signature)) for n in range(3)]
+        call_command("dedupe_media", stdout=StringIO())
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertEqual(default_storage.references(names[0]), 3)
+
+
+def run_due_jobs():
+    """What ``manage.py run_jobs --once`` does, minus the connection recycling a TestCase can't have."""
+    while jobs.run_claimed(jobs.claim("test-worker")):
+        pass
+
+
+calls = []
+
+
+@jobs.task("tests.flaky")
+def flaky_task(failures):
+    calls.append(failures)
+    if len(calls) <= failures:
+        raise RuntimeError("try again")
+
+
+@jobs.task("tests.slow")
+def slow_task(seconds):
+    time.sleep(seconds)
+
+
+@jobs.task("tests.terminate")
+def terminate_task():
+    os.kill(os.getpid(), signal.SIGTERM)
+    calls.append("terminated")
+
+
+@override_settings(JOB_BACKEND="database")
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def run_due(self):
+        return jobs.run_claimed(jobs.claim("test-worker"))
+
+    def test_retries_with_backoff_then_succeeds(self):
+        job = jobs.enqueue("tests.flaky", {"failures": 1})
+        with self.assertLogs("portal.jobs", "WARNING"):
+            job = self.run_due()
+        self.assertEqual((job.status, job.attempts), (BackgroundJob.QUEUED, 1))
+        self.assertIn("try again", job.last_error)
+        self.assertIsNone(self.run_due())  # not due until the backoff has passed
+
+        BackgroundJob.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        job = self.run_due()
+        self.assertEqual((job.status, job.attempts, job.last_error), (BackgroundJob.DONE, 2, ""))
+
+        self.client.force_login(get_user_model().objects.create_user("ops", password="pw", is_staff=True))
+        response = self.client.get(f"/api/jobs/{job.pk}/")
+        self.assertEqual(response.json()["status"], "done")
+        self.assertEqual(len(self.client.get("/api/jobs/", {"status": "done"}).json()["data"]), 1)
+
+    def test_jobs_are_visible_to_staff_and_their_requester(self):
+        User = get_user_model()
+        owner, other = User.objects.create_user("owner"), User.objects.create_user("other")
+        request = RequestFactory().post("/")
+        request.user = owner
+        job = jobs.JobRequesterMiddleware(lambda request: jobs.enqueue("tests.flaky", {"failures": 0}))(request)
+        self.assertEqual(job.requested_by, owner)
+        url = f"/api/jobs/{job.pk}/"
+
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertEqual(self.client.get("/api/jobs/").json()["data"], [])
+        self.client.force_login(owner)
+        self.assertEqual(self.client.get(url).json()["id"], job.pk)
+        self.client.force_login(User.objects.create_user("ops", is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_gives_up_after_max_attempts(self):
+        jobs.enqueue("tests.flaky", {"failures": 5}, max_attempts=1)
+        with self.assertLogs("portal.jobs", "ERROR"):
+            self.assertEqual(self.run_due().status, BackgroundJob.FAILED)
+        with self.assertRaises(ValueError):
+            jobs.enqueue("tests.missing")
+
+    def test_stale_jobs_are_requeued(self):
+        job = jobs.enqueue("tests.flaky", {"failures": 0})
+        jobs.claim("dead-worker")
+        BackgroundJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(self.run_due().status, BackgroundJob.DONE)
+
+        # A job that keeps killing its worker stops once its attempts are used up.
+        job = jobs.enqueue("tests.flaky", {"failures": 0}, max_attempts=1)
+        jobs.claim("dead-worker")
+        BackgroundJob.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        with self.assertLogs("portal.jobs", "ERROR"):
+            self.assertEqual(jobs.requeue_stale(), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, BackgroundJob.FAILED)
+
+    @override_settings(JOB_HEARTBEAT_SECONDS=0.01)
+    def test_running_jobs_heartbeat(self):
+        jobs.enqueue("tests.slow", {"seconds": 0.2})
+        with patch.object(jobs, "beat") as beat:
+            self.assertEqual(self.run_due().status, BackgroundJob.DONE)
+        self.assertGreater(beat.call_count, 1)
+
+    def test_sigterm_lets_the_current_job_finish(self):
+        first = jobs.enqueue("tests.terminate")
+        second = jobs.enqueue("tests.flaky", {"failures": 0})
+        handler = signal.getsignal(signal.SIGTERM)
+        # close_old_connections would close the TestCase's connection.
+        with patch("portal.management.commands.run_jobs.close_old_connections"):
+            call_command("run_jobs", once=True, stdout=StringIO())
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.status, calls), (BackgroundJob.DONE, ["terminated"]))
+        self.assertEqual(second.status, BackgroundJob.QUEUED)
+        self.assertEqual(signal.getsignal(signal.SIGTERM), handler)
+
+    @override_settings(FARMER_DETAILS_IN_BACKGROUND=True)
+    def test_farmer_details_are_fetched_by_a_job(self):
+        cover = Cover_tbl(FarmerChild=make_row(FarmerChild, name="Ama"), enumerator_name="Kofi", farmer_code="FARM-0001")
+        with patch.object(farmer_api, "fetch_farmer_details", return_value={"region": "Ashanti"}) as fetch:
+            cover.save()
+            fetch.assert_not_called()
+            run_due_jobs()
+        cover.refresh_from_db()
+        self.assertEqual(cover.region, "Ashanti")
+
+    @override_settings(FARMER_DETAILS_IN_BACKGROUND=True)
+    def test_registry_errors_are_retried_and_unknown_farmers_fail(self):
+        cover = Cover_tbl(FarmerChild=make_row(FarmerChild, name="Ama"), enumerator_name="Kofi", farmer_code="FARM-0001")
+        cover.save()
+        outage = ValidationError("Farmer lookup for FARM-0001 failed: HTTP 503")
+        with patch.object(farmer_api, "fetch_farmer_details", side_effect=outage), self.assertLogs("portal.jobs", "WARNING"):
+            self.assertEqual(self.run_due().status, BackgroundJob.QUEUED)
+        BackgroundJob.objects.update(run_after=timezone.now())
+        with patch.object(farmer_api, "fetch_farmer_details", return_value=None), self.assertLogs("portal.jobs", "ERROR"):
+            self.assertEqual(self.run_due().status, BackgroundJob.FAILED)
+
+    def test_cover_views_look_farmers_up_synchronously_by_default(self):
+        body = {"FarmerChild": make_row(FarmerChild, name="Ama").pk, "enumerator_name": "Kofi", "farmer_code": "NOPE"}
+        with patch.object(farmer_api, "fetch_farmer_details", return_value=None):
+            response = self.client.post("/api/cover/", json.dumps(body), content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BackgroundJob.objects.exists())
+
+
+class DroppedStream:
+    """A request body whose connection drops after ``limit`` bytes."""
+
+    def __init__(self, data, limit):
+        self.data, self.limit, self.position = data, limit, 0
+
+    def read(self, size):
+        if self.position >= self.limit:
+            raise OSError("connection reset")
+        chunk = self.data[self.position:min(self.position + size, self.limit)]
+        self.position += len(chunk)
+        return chunk
+
+
+@override_settings(JOB_BACKEND="inline")
+class ResumableUploadTests(TestCase):
+    def setUp(self):
+        for name in ("MEDIA_ROOT", "UPLOAD_TEMP_DIR"):
+            directory = tempfile.TemporaryDirectory()
+            self.addCleanup(directory.cleanup)
+            self.enterContext(override_settings(**{name: directory.name}))
+        self.record = make_row(EndOfCollection)
+        self.photo = image_upload("respondent.jpg", (1000, 800)).read()
+
+    def patch(self, url, offset, data):
+        return self.client.generic("PATCH", url, data, content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_upload_resumes_after_a_dropped_connection(self):
+        response = self.client.post("/api/uploads/", {
+            "table": "end-of-collection", "id": self.record.pk, "field": "picture_of_respondent",
+            "filename": "respondent.jpg", "length": len(self.photo),
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        url = response["Location"]
+
+        # The first chunk is cut off after 1000 bytes; those are kept.
+        session = uploads.append(response.json()["id"], 0, DroppedStream(self.photo, 1000), 4000)
+        self.assertEqual(session.offset, 1000)
+        self.assertEqual(self.client.head(url)["Upload-Offset"], "1000")
+        self.assertEqual(self.patch(url, 0, self.photo).status_code, 409)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.patch(url, 1000, self.photo[1000:])
+        self.assertTrue(response.json()["complete"])
+        self.record.refresh_from_db()
+        self.assertTrue(media.is_processed(self.record.picture_of_respondent.name))
+        self.assertEqual(os.listdir(uploads.upload_dir()), [])
+
+    def test_chunks_are_written_outside_the_row_lock(self):
+        session = uploads.start({"table": "end-of-collection", "id": self.record.pk, "field": "picture_of_respondent",
+                                 "filename": "respondent.jpg", "length": len(self.photo)})
+        depth = len(connection.atomic_blocks)
+
+        class WatchedStream(DroppedStream):
+            def read(stream, size):
+                stream.depths.append(len(connection.atomic_blocks))
+                if stream.claim is None:
+                    stream.claim = UploadSession.objects.get(pk=session.pk).claimed_at
+                return super().read(size)
+
+        stream = WatchedStream(self.photo, 2000)
+        stream.depths, stream.claim = [], None
+        self.assertEqual(uploads.append(session.pk, 0, stream, 2000).offset, 2000)
+        self.assertEqual(set(stream.depths), {depth})
+        self.assertIsNotNone(stream.claim)
+
+        # Another request is still writing: a racing PATCH is turned away until its claim goes stale.
+        UploadSession.objects.filter(pk=session.pk).update(claimed_at=timezone.now())
+        url = f"/api/uploads/{session.pk}/"
+        self.assertEqual(self.patch(url, 2000, self.photo[2000:3000]).status_code, 409)
+        UploadSession.objects.filter(pk=session.pk).update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.patch(url, 2000, self.photo[2000:3000]).json()["offset"], 3000)
+
+    def test_invalid_uploads_are_rejected(self):
+        body = {"table": "end-of-collection", "id": self.record.pk, "field": "feedback_enum", "filename": "a.jpg", "length": 10}
+        self.assertEqual(self.client.post("/api/uploads/", body, content_type="application/json").status_code, 400)
+        body.update(field="signature_producer", length=10 ** 12)
+        self.assertEqual(self.client.post("/api/uploads/", body, content_type="application/json").status_code, 413)
+        body.update(id=999999, length=10)
+        self.assertEqual(self.client.post("/api/uploads/", body, content_type="application/json").status_code, 404)
+
+        body.update(id=self.record.pk)
+        url = self.client.post("/api/uploads/", body, content_type="application/json")["Location"]
+        self.assertEqual(self.patch(url, 0, b"x" * 11).status_code, 413)
+        self.client.delete(url)
+        self.assertFalse(UploadSession.objects.exists())
+
+    def upload(self, data):
+        session = uploads.start({"table": "end-of-collection", "id": self.record.pk, "field": "picture_of_respondent",
+                                 "filename": "respondent.jpg", "length": len(data)})
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.patch(f"/api/uploads/{session.pk}/", 0, data)
+
+    def test_a_replaced_image_is_deleted(self):
+        self.upload(self.photo)
+        self.record.refresh_from_db()
+        first = media.image_names(self.record)
+        self.assertTrue(all(default_storage.exists(name) for name in first))
+
+        self.assertTrue(self.upload(image_upload("again.jpg", (600, 400)).read()).json()["complete"])
+        self.record.refresh_from_db()
+        second = media.image_names(self.record)
+        self.assertEqual(len(second), 2)
+        self.assertFalse(set(first) & set(second))
+        self.assertFalse(any(default_storage.exists(name) for name in first))
+        self.assertTrue(all(default_storage.exists(name) for name in second))
+
+    def test_a_failed_patch_releases_its_claim(self):
+        session = uploads.start({"table": "end-of-collection", "id": self.record.pk, "field": "picture_of_respondent",
+                                 "filename": "respondent.jpg", "length": len(self.photo)})
+        self.record.delete()
+        url = f"/api/uploads/{session.pk}/"
+        self.assertEqual(self.patch(url, 0, self.photo).status_code, 410)
+        self.assertIsNone(UploadSession.objects.get(pk=session.pk).claimed_at)
+        # The retry is told the same thing rather than that the upload is busy.
+        self.assertEqual(self.patch(url, 0, self.photo).status_code, 410)
+
+
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+        self.seen = []
+
+        @reads_from_replica
+        def view(request):
+            self.seen.append(self.router.db_for_read(Cover_tbl))
+            if request.GET.get("write"):
+                self.router.db_for_write(Cover_tbl)
+                self.seen.append(self.router.db_for_read(Cover_tbl))
+            return JsonResponse({})
+
+        self.view = view
+
+    @override_settings(REPLICA_DATABASE="replica")
+    def test_reads_go_to_the_replica_until_a_write(self):
+        self.view(self.factory.get("/", {"write": "1"}))
+        self.assertEqual(self.seen, ["replica", None])
+        self.assertIsNone(self.router.db_for_read(Cover_tbl))
+
+    @override_settings(REPLICA_DATABASE="replica")
+    def test_client_sticks_to_the_primary_after_writing(self):
+        response = self.view(self.factory.post("/"))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        request = self.factory.get("/")
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        self.view(request)
+        self.assertEqual(self.seen, [None, None])
+
+    def test_no_replica_configured(self):
+        self.view(self.factory.get("/"))
+        self.assertEqual(self.seen, [None])
+        self.assertNotIn(STICKY_COOKIE, self.view(self.factory.post("/")).cookies)
+
+
+class ChildLabourFactTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cover = make_row(Cover_tbl, FarmerChild=make_row(FarmerChild, name="Ama"), region="Ashanti", district="Obuasi")
+        cls.consent = make_row(ConsentLocation_tbl, cover=cover)
+        cls.household = make_row(ChildrenInHouseholdTbl, consent=cls.consent)
+
+    def add_child(self, year_birth=2012, **details):
+        child = make_row(ChildInHouseholdTbl, household=self.household, child_can_be_surveyed="yes", child_year_birth=year_birth)
+        hours = dict.fromkeys(["total_hours_light_work_school", "total_hours_light_work_non_school", "total_hours_school_days", "total_hours_non_school_days"], 0)
+        row = make_row(ChildEducationDetailsTbl, child=child, **{**hours, **details})
+        return child, row
+
+    def test_facts_follow_writes(self):
+        child, details = self.add_child(
+            work_on_cocoa="yes", tasks_done_in_7days="felling_trees,handling_agrochemicals,none",
+            agrochemicals_applied="no", suffered_injury="yes", child_educated=1,
+            total_hours_school_days=3, total_hours_non_school_days=5,
+        )
+        bulk_saved.send(sender=ChildEducationDetailsTbl, instances=[details])
+        fact = ChildLabourFact.objects.get(child=child)
+        self.assertEqual((fact.region, fact.district, fact.surveyed), ("Ashanti", "Obuasi", True))
+        self.assertEqual((fact.worked_on_cocoa, fact.hazardous_tasks_7days, fact.agrochemical_exposure), (True, 2, True))
+        self.assertEqual((fact.injured, fact.enrolled_in_school, fact.hazardous_work_hours), (True, True, 8))
+
+        self.consent.interview_start_time = datetime.fromisoformat("2025-03-01T09:00:00+00:00")
+        self.consent.save()
+        fact.refresh_from_db()
+        self.assertEqual(fact.interview_start_time, self.consent.interview_start_time)
+
+        details.delete()
+        fact.refresh_from_db()
+        self.assertIsNone(fact.worked_on_cocoa)
+        child.delete()
+        self.assertFalse(ChildLabourFact.objects.exists())
+
+    def test_rebuild_and_list(self):
+        for _ in range(3):
+            self.add_child(work_on_cocoa="no", heavy_tasks_12months="night_work")
+        call_command("rebuild_child_labour_facts", batch_size=2, stdout=StringIO())
+        self.assertEqual(ChildLabourFact.objects.filter(hazardous_tasks_12months=1).count(), 3)
+
+        response = self.client.get("/api/facts/child-labour/", {"region": "Ashanti", "fields": "worked_on_cocoa"})
+        self.assertEqual(response.json()["data"], [{"worked_on_cocoa": False}] * 3)
+
+    def test_classification(self):
+        year = timezone.now().year
+        children = {
+            "young": self.add_child(year - 8, performed_tasks=["sweeping"], total_hours_light_work_school=2),
+            "light": self.add_child(year - 13, total_hours_light_work_school=10),
+            "long_hours": self.add_child(year - 13, total_hours_light_work_school=12, total_hours_light_work_non_school=8),
+            "hazardous": self.add_child(year - 16, heavy_tasks_12months="night_work"),
+            "idle": self.add_child(year - 13, work_on_cocoa="no"),
+        }
+        undetailed = make_row(ChildInHouseholdTbl, household=self.household, child_year_birth=year - 10)
+        ids = [child.pk for child, _ in children.values()] + [undetailed.pk]
+        with self.assertNumQueries(4):
+            facts.refresh_children(ids)
+
+        result = {
+            fact.child_id: (fact.classification, fact.classification_reasons)
+            for fact in ChildLabourFact.objects.all()
+        }
+        expected = {
+            "young": ("child_labour", ["below_light_work_age", "worked"]),
+            "light": ("light_work", ["worked"]),
+            "long_hours": ("child_labour", ["light_work_hours_exceeded", "worked"]),
+            "hazardous": ("hazardous_work", ["hazardous_task_12months"]),
+            "idle": ("no_issue", []),
+        }
+        for name, (child, _) in children.items():
+            self.assertEqual(result[child.pk], expected[name], name)
+        self.assertEqual(result[undetailed.pk], ("", []))
+
+        with override_settings(CHILD_LABOUR_LIGHT_WORK_MAX_HOURS=20):
+            self.assertEqual(classification.stale_facts().count(), 6)
+            call_command("reclassify_children", stdout=StringIO())
+            self.assertFalse(classification.stale_facts().exists())
+        fact = ChildLabourFact.objects.get(child=children["long_hours"][0])
+        self.assertEqual(fact.classification, "light_work")
+
+
+class DashboardIndexTests(TestCase):
+    def test_dashboard_queries_use_indexes(self):
+        out = StringIO()
+        call_command("explain_dashboard", "--seed=1000", stdout=out)
+        report = out.getvalue()
+        self.assertIn("0 sequential scan(s)", report)
+        for index in ("cover_region_district_idx", "cover_society_code_idx", "consent_unavailable_idx", "child_gender_birth_idx", "child_unavailable_idx"):
+            self.assertIn(index, report)
+        self.assertFalse(Cover_tbl.objects.exists())  # the seeded rows are rolled back
+
+class DashboardCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cover = make_row(Cover_tbl, FarmerChild=make_row(FarmerChild, name="Ama"), region="Ashanti", district="Obuasi", enumerator_code="ENUM-1")
+        cls.household = make_row(ChildrenInHouseholdTbl, consent=make_row(ConsentLocation_tbl, cover=cls.cover))
+
+    def counts(self):
+        return {
+            (c.region, c.metric, c.dimension): c.count
+            for c in DashboardCounter.objects.exclude(count=0)
+        }
+
+    def add_consent(self, **values):
+        consent = ConsentLocation_tbl(cover=self.cover, interview_start_time=timezone.now(), **values)
+        for field in ConsentLocation_tbl._meta.concrete_fields:
+            if isinstance(field, models.IntegerField) and not field.primary_key and not field.null and getattr(consent, field.attname) is None:
+                setattr(consent, field.attname, 1)
+        consent.save()
+        return consent
+
+    def test_counters_follow_writes(self):
+        consent = self.add_consent(farmer_available="No", reason_unavailable="Travelled")
+        self.assertEqual(self.counts(), {("Ashanti", "interviews_started", ""): 1, ("Ashanti", "farmers_unavailable", "Travelled"): 1})
+
+        consent.reason_unavailable = "Sick"
+        consent.save()
+        self.assertEqual(self.counts()[("Ashanti", "farmers_unavailable", "Sick")], 1)
+        self.assertNotIn(("Ashanti", "farmers_unavailable", "Travelled"), self.counts())
+
+        children = [
+            make_row(ChildInHouseholdTbl, household=self.household, child_can_be_surveyed=surveyed)
+            for surveyed in ("yes", "yes", "no")
+        ]
+        bulk_saved.send(sender=ChildInHouseholdTbl, instances=children, created=True)
+        self.assertEqual(self.counts()[("Ashanti", "children_surveyed", "")], 2)
+        self.assertEqual(self.counts()[("Ashanti", "children_unavailable", counters.UNSPECIFIED)], 1)
+
+        children[0].delete()
+        self.assertEqual(self.counts()[("Ashanti", "children_surveyed", "")], 1)
+        consent.delete()
+        self.assertEqual(self.counts(), {("Ashanti", "children_surveyed", ""): 1, ("Ashanti", "children_unavailable", "unspecified"): 1})
+
+        cover = Cover_tbl.objects.get(pk=self.cover.pk)
+        cover.region = "Western"
+        cover.save()
+        # Moving the cover recounts its groups from scratch, which picks up
+        # the consent row that was inserted behind the signals' back.
+        self.assertEqual(self.counts(), {
+            ("Western", "interviews_started", ""): 1,
+            ("Western", "children_surveyed", ""): 1,
+            ("Western", "children_unavailable", "unspecified"): 1,
+        })
+
+    def test_bulk_updates_recount_the_groups_rows_leave(self):
+        western = make_row(Cover_tbl, FarmerChild=make_row(FarmerChild, name="Kwame"), region="Western", district="Tarkwa", enumerator_code="ENUM-2")
+        household = make_row(ChildrenInHouseholdTbl, consent=make_row(ConsentLocation_tbl, cover=western))
+        url = "/api/bulk/child-in-household/"
+        child = valid_values(ChildInHouseholdTbl, household=self.household.pk, child_can_be_surveyed="yes", child_year_birth=2012)
+        pk = self.client.post(url, json.dumps([child]), content_type="application/json").json()["ids"][0]
+        self.assertEqual(self.counts(), {("Ashanti", "children_surveyed", ""): 1})
+
+        response = self.client.put(url, json.dumps([{"id": pk, "household": household.pk}]), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        # Both groups are recounted, which also picks up the consent rows made by make_row().
+        self.assertEqual(self.counts(), {
+            ("Ashanti", "interviews_started", ""): 1,
+            ("Western", "interviews_started", ""): 1,
+            ("Western", "children_surveyed", ""): 1,
+        })
+
+    def test_stats_and_rebuild(self):
+        self.add_consent(farmer_available="Yes")
+        make_row(EndOfCollection, sensitization=make_row(HouseholdSensitizationTbl, consent=self.household.consent))
+        DashboardCounter.objects.filter(metric="interviews_started").update(count=5)
+
+        call_command("rebuild_dashboard_counters", stdout=StringIO())
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/stats/", {"group_by": "region", "district": "Obuasi"})
+        self.assertEqual(response.json()["data"], [{
+            "region": "Ashanti", "interviews_started": 2, "farmers_unavailable": {}, "interviews_completed": 1,
+            "children_surveyed": 0, "children_unavailable": {},
+        }])
+        self.assertEqual(self.client.get("/api/stats/", {"group_by": "farmer_code"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/stats/", {"society_code": "S1"}).status_code, 400)
+
+
+@override_settings(EXPORT_API_TOKEN="export-secret")
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cover = make_row(Cover_tbl, FarmerChild=make_row(FarmerChild, name="Ama"), region="Ashanti", farmer_code="FARM-0042")
+        make_row(Cover_tbl, FarmerChild=make_row(FarmerChild, name="Kofi"), region="Western")
+        consent = make_row(ConsentLocation_tbl, cover=cover, community_name="Adansi")
+        household = make_row(ChildrenInHouseholdTbl, consent=consent)
+        year = timezone.now().year
+        for age in (8, 16):
+            child = make_row(ChildInHouseholdTbl, household=household, child_can_be_surveyed="yes", child_year_birth=year - age)
+            make_row(ChildEducationDetailsTbl, child=child, heavy_tasks_12months="night_work" if age == 16 else "")
+        facts.refresh_children(ChildInHouseholdTbl.objects.values_list("pk", flat=True))
+        cls.staff = get_user_model().objects.create_user("analyst", password="x", is_staff=True)
+
+    def download(self, path, **params):
+        response = self.client.get(path, params, HTTP_AUTHORIZATION="Bearer export-secret")
+        self.assertEqual(response.status_code, 200)
+        return response, b"".join(response.streaming_content)
+
+    @override_settings(EXPORT_CHUNK_SIZE=1)
+    def test_children_parquet_is_typed(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.client.force_login(self.staff)
+        response = self.client.get("/api/export/children/")
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="children.parquet"')
+        parquet = pq.ParquetFile(BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(parquet.metadata.num_row_groups, 2)  # one per chunk
+        table = parquet.read()
+        self.assertEqual(table.schema.field("child_id").type, pa.int64())
+        self.assertEqual(table.schema.field("classification").type, pa.dictionary(pa.int32(), pa.string()))
+        self.assertTrue(pa.types.is_timestamp(table.schema.field("interview_start_time").type))
+        self.assertEqual(table.column("farmer_code").to_pylist(), ["FARM-0042"] * 2)
+        self.assertEqual(table.column("community_name").to_pylist(), ["Adansi"] * 2)
+        self.assertEqual(sorted(table.column("classification").to_pylist()), ["child_labour", "hazardous_work"])
+
+    def test_table_csv_is_filtered(self):
+        response, body = self.download("/api/export/cover/", format="csv", region="Ashanti")
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        rows = list(csv.reader(StringIO(gzip.decompress(body).decode())))
+        header, data = rows[0], rows[1:]
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0][header.index("farmer_code")], "FARM-0042")
+
+    def test_rejects_anonymous_and_bad_requests(self):
+        self.assertEqual(self.client.get("/api/export/cover/").status_code, 401)
+        self.assertEqual(self.client.get("/api/export/cover/", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get("/api/export/nonsense/").status_code, 404)
+        self.assertEqual(self.client.get("/api/export/cover/", {"format": "xlsx"}).status_code, 400)
+
+    def test_command_writes_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            call_command("export_survey", "cover", "children", format="csv", output_dir=directory, stdout=StringIO())
+            self.assertEqual(sorted(os.listdir(directory)), ["children.csv.gz", "cover.csv.gz"])
+            with gzip.open(os.path.join(directory, "children.csv.gz"), "rt") as f:
+                self.assertEqual(len(list(csv.reader(f))), 3)
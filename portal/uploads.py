@@ -0,0 +1,185 @@
+"""
+Resumable, chunked image uploads, modelled on the tus protocol.
+
+A tablet on a patchy connection uploads a photo in three steps:
+
+1. ``POST /api/uploads/`` with ``{"table", "id", "field", "filename",
+   "length"}`` opens an UploadSession for one image column of one row and
+   returns its id (and a ``Location`` header).
+2. ``PATCH /api/uploads/<id>/`` with an ``Upload-Offset`` header and the
+   next bytes of the file as the body appends them. If the connection drops,
+   ``HEAD /api/uploads/<id>/`` returns the ``Upload-Offset`` the server
+   holds, and the tablet carries on from there.
+3. The PATCH that brings the offset to ``length`` attaches the file to the
+   row, which queues it for re-encoding (portal/media.py). The image it
+   replaces, if any, is deleted once that commits.
+
+Chunks are streamed from the request straight to a temporary file in
+UPLOAD_TEMP_DIR, never read into memory whole. Bytes received before a
+connection dropped are kept. The session row is only locked to check and
+claim the offset, and again to record the new one, so a slow upload does
+not hold a database connection while its bytes trickle in. A second PATCH
+arriving while a chunk is being written gets a 409; a PATCH that fails
+releases its claim, and a claim older than UPLOAD_CLAIM_TIMEOUT seconds
+belongs to a request that died and is taken over. Sessions older than
+UPLOAD_SESSION_TTL seconds are removed by ``manage.py purge_upload_sessions``.
+"""
+import os
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from . import jobs, media
+from .models import UploadSession
+from .tables import TABLE_SLUGS, get_table
+
+OFFSET_HEADER = "Upload-Offset"
+LENGTH_HEADER = "Upload-Length"
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    """An upload request that can't be honoured; ``status`` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def upload_dir():
+    path = getattr(settings, "UPLOAD_TEMP_DIR", None) or os.path.join(tempfile.gettempdir(), "gatherflow-uploads")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def temp_path(session):
+    return os.path.join(upload_dir(), f"{session.pk}.part")
+
+
+def get_ttl():
+    return timedelta(seconds=getattr(settings, "UPLOAD_SESSION_TTL", 24 * 60 * 60))
+
+
+def start(data):
+    """Opens an UploadSession from the JSON body of a create request."""
+    try:
+        model = get_table(data["table"])
+        field_name, filename, length = data["field"], data["filename"], int(data["length"])
+        object_id = int(data["id"])
+    except (KeyError, TypeError, ValueError):
+        raise UploadError("table, id, field, filename and length are required")
+    if field_name not in media.IMAGE_FIELDS.get(model, ()):
+        raise UploadError(f"{data['table']}.{field_name} does not take uploads")
+    if not 0 < length <= getattr(settings, "UPLOAD_MAX_BYTES", 50 * 1024 * 1024):
+        raise UploadError("length is out of range", status=413)
+    if not model.objects.filter(pk=object_id).exists():
+        raise UploadError(f"{data['table']} #{object_id} does not exist", status=404)
+
+    session = UploadSession.objects.create(
+        table=TABLE_SLUGS[model], object_id=object_id, field_name=field_name,
+        filename=os.path.basename(str(filename))[:255] or "upload", length=length,
+    )
+    open(temp_path(session), "wb").close()
+    return session
+
+
+def _copy(stream, target, count):
+    """Copies up to ``count`` bytes from ``stream``; a dropped connection just ends the copy early."""
+    while count > 0:
+        try:
+            chunk = stream.read(min(READ_SIZE, count))
+        except OSError:
+            break
+        if not chunk:
+            break
+        target.write(chunk)
+        count -= len(chunk)
+
+
+def _claim(session_id, offset, content_length):
+    """Checks a PATCH against the session and marks the session as being written to."""
+    with transaction.atomic():
+        # The row lock serialises claims, e.g. a retry racing the original.
+        session = UploadSession.objects.select_for_update().filter(pk=session_id).first()
+        if session is None:
+            raise UploadError("Unknown upload", status=404)
+        if session.completed_at is not None:
+            raise UploadError("Upload already complete", status=409)
+        now = timezone.now()
+        claim_timeout = timedelta(seconds=getattr(settings, "UPLOAD_CLAIM_TIMEOUT", 300))
+        if session.claimed_at is not None and session.claimed_at > now - claim_timeout:
+            raise UploadError("Another request is writing to this upload", status=409)
+        if offset != session.offset:
+            raise UploadError(f"{OFFSET_HEADER} must be {session.offset}", status=409)
+        if content_length > session.length - session.offset:
+            raise UploadError("Chunk runs past the upload length", status=413)
+        if session.offset and not os.path.exists(temp_path(session)):
+            raise UploadError("Upload expired", status=410)
+        session.claimed_at = now
+        session.save(update_fields=["claimed_at"])
+    return session
+
+
+def append(session_id, offset, stream, content_length):
+    """
+    Appends the request body to the session's file at ``offset``, which
+    must match the bytes already received. Returns the updated session.
+    """
+    session = _claim(session_id, offset, content_length)
+    claimed_at = session.claimed_at
+    path = temp_path(session)
+    try:
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as target:
+            # Drop anything past the recorded offset, e.g. from a write whose record was lost.
+            target.seek(session.offset)
+            target.truncate()
+            _copy(stream, target, content_length)
+            received = target.tell()
+
+        with transaction.atomic():
+            session = UploadSession.objects.select_for_update().filter(pk=session.pk).first()
+            if session is None or session.claimed_at != claimed_at:
+                raise UploadError("The upload was cancelled or taken over while this chunk was written", status=409)
+            session.offset = received
+            session.claimed_at = None
+            session.save(update_fields=["offset", "claimed_at"])
+            if session.offset == session.length:
+                finish(session)
+    except BaseException:
+        # Otherwise a retry would get a 409 until the claim times out.
+        UploadSession.objects.filter(pk=session.pk, claimed_at=claimed_at).update(claimed_at=None)
+        raise
+    return session
+
+
+def finish(session):
+    """Attaches the completed file to its row and drops the temporary file."""
+    model = get_table(session.table)
+    instance = model.objects.filter(pk=session.object_id).first()
+    if instance is None:
+        raise UploadError(f"{session.table} #{session.object_id} no longer exists", status=410)
+    path = temp_path(session)
+    replaced = media.image_names(instance, [session.field_name])
+    with open(path, "rb") as f:
+        getattr(instance, session.field_name).save(session.filename, File(f), save=False)
+    instance.save(update_fields=[session.field_name, "updated_at"])
+    if replaced:
+        transaction.on_commit(lambda: jobs.enqueue("media.delete", {"names": replaced}))
+    session.completed_at = timezone.now()
+    session.save(update_fields=["completed_at"])
+    transaction.on_commit(lambda: os.path.exists(path) and os.remove(path))
+
+
+def cancel(session):
+    path = temp_path(session)
+    if os.path.exists(path):
+        os.remove(path)
+    session.delete()
+
+
+def expired():
+    return UploadSession.objects.filter(created_at__lt=timezone.now() - get_ttl())
@@ -1,18 +1,31 @@
 from django.urls import path
+from .async_views import async_table_view
 from .views import (
     adult_household_member_view,
     adult_in_household_view,
+    bulk_view,
     ChildEducationDetailsView,
     ChildRemediationView,
+    child_labour_facts_view,
     child_in_household_view,
     children_in_household_view,
     ConsentLocationView,
     cover_view,
+    db_pool_view,
     EndOfCollectionView,
+    export_view,
     farmer_child_view,
     farmer_identification_view,
     HouseholdSensitizationView,
+    interview_detail_view,
+    job_view,
+    interview_submit_view,
     owner_identification_view,
+    stats_view,
+    sync_pull_view,
+    sync_push_view,
+    upload_create_view,
+    upload_view,
     workers_in_farm_view,
 )
 
@@ -75,4 +88,39 @@ urlpatterns = [
     # End of Collection endpoints
     path('end-of-collection/', EndOfCollectionView.as_view(), name='end_of_collection_list'),
     path('end-of-collection/<int:id>/', EndOfCollectionView.as_view(), name='end_of_collection_detail'),
+
+    # Full interview: POST or GET the whole nested household interview in one request
+    path('interview/submit/', interview_submit_view, name='interview-submit'),
+    path('interview/<int:cover_id>/', interview_detail_view, name='interview-detail'),
+
+    # Bulk writes: a JSON array of rows (or ids for DELETE) for one table
+    path('bulk/<slug:table>/', bulk_view, name='bulk'),
+
+    # Async CRUD for every table (serve with an ASGI server to benefit)
+    path('async/<slug:table>/', async_table_view, name='async-table-list'),
+    path('async/<slug:table>/<int:pk>/', async_table_view, name='async-table-detail'),
+
+    # Resumable uploads: open with POST, then PATCH chunks at Upload-Offset (HEAD to resume)
+    path('uploads/', upload_create_view, name='upload-create'),
+    path('uploads/<uuid:upload_id>/', upload_view, name='upload-detail'),
+
+    # Offline tablet sync: pull changes since a token, push batches keyed on client_uuid
+    path('sync/pull/', sync_pull_view, name='sync-pull'),
+    path('sync/push/', sync_push_view, name='sync-push'),
+
+    # Reporting: one precomputed row per surveyed child
+    path('facts/child-labour/', child_labour_facts_view, name='child-labour-facts'),
+
+    # Dashboard counts per region, district and enumerator
+    path('stats/', stats_view, name='stats'),
+
+    # Analyst exports: a table or the per-child sheet as Parquet or gzip CSV (staff or EXPORT_API_TOKEN)
+    path('export/<slug:source>/', export_view, name='export'),
+
+    # Background job status
+    path('jobs/', job_view, name='job-list'),
+    path('jobs/<int:job_id>/', job_view, name='job-detail'),
+
+    # Database connection pool stats for the answering worker
+    path('db/pool/', db_pool_view, name='db-pool'),
 ]
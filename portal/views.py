@@ -2,11 +2,14 @@ import json
 from datetime import datetime
 
 import requests
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.core.files.storage import default_storage
 from django.db import IntegrityError
-from django.http import JsonResponse
+from django.views.decorators.http import require_GET, require_POST
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
 from django.utils.dateparse import parse_datetime
 from django.utils.decorators import method_decorator
 from django.views import View
@@ -25,16 +28,34 @@ from .models import (
     ChildrenInHouseholdTbl,
     ChildInHouseholdTbl,
     ChildEducationDetailsTbl,
+    ChildLabourFact,
     ChildRemediationTbl,
     HouseholdSensitizationTbl,
     EndOfCollection,
+    UploadSession,
+    BackgroundJob,
 )
+from . import counters, export, media, uploads
+from .bulk import bulk_create_rows, bulk_delete_rows, bulk_update_rows
+from .conditional import conditional_get
+from .db import connection_stats
+from .filters import InvalidQuery, filter_queryset
+from .idempotency import idempotent
+from .interview import SubmissionError, get_interview, submit_interview
+from .pagination import paginated_response
+from .routers import reads_from_replica
+from .streaming import streaming_response
+from .sync import InvalidSyncToken, pull, push
+from .tables import PORTAL_TABLES, get_table
 
 
 ###########################################################################################
 # COVER QUESTIONNAIRE VIEWS
 ###########################################################################################
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(Cover_tbl)
 def cover_view(request, cover_id=None):
     """Handles CRUD operations for Cover_tbl model"""
     if request.method == "GET":
@@ -57,8 +78,9 @@ def cover_view(request, cover_id=None):
             }
             return JsonResponse(data, status=200)
         else:
-            covers = Cover_tbl.objects.all().values()
-            return JsonResponse(list(covers), safe=False, status=200)
+            if request.GET.get("stream"):
+                return streaming_response(request, Cover_tbl.objects.values())
+            return paginated_response(request, Cover_tbl.objects.values())
 
     elif request.method == "POST":
         try:
@@ -76,9 +98,10 @@ def cover_view(request, cover_id=None):
                 risk_classification=data.get("risk_classification", ""),
                 client=data.get("client", ""),
                 num_farmer_children=data.get("num_farmer_children", 0),
+                FarmerChild_id=data.get("FarmerChild"),
             )
             return JsonResponse({"message": "Cover created", "id": cover.id}, status=201)
-        except (KeyError, json.JSONDecodeError, ValidationError) as e:
+        except (KeyError, json.JSONDecodeError, ValidationError, IntegrityError) as e:
             return JsonResponse({"error": str(e)}, status=400)
 
     elif request.method == "PUT":
@@ -107,6 +130,9 @@ def cover_view(request, cover_id=None):
 
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(FarmerChild)
 def farmer_child_view(request, child_id=None):
     """Handles CRUD operations for FarmerChild model"""
     if request.method == "GET":
@@ -114,15 +140,11 @@ def farmer_child_view(request, child_id=None):
             child = get_object_or_404(FarmerChild, id=child_id)
             data = {
                 "id": child.id,
-                "cover": child.cover.id,
                 "name": child.name,
-                "age": child.age,
-                "gender": child.gender
             }
             return JsonResponse(data, status=200)
         else:
-            children = FarmerChild.objects.all().values()
-            return JsonResponse(list(children), safe=False, status=200)
+            return paginated_response(request, FarmerChild.objects.values())
 
     elif request.method == "POST":
         try:
@@ -168,6 +190,9 @@ def farmer_child_view(request, child_id=None):
 # CONSENT AND LOCATION MODEL
 ###########################################################################################
 
+@method_decorator(reads_from_replica, name='dispatch')
+@method_decorator(idempotent, name='post')
+@method_decorator(conditional_get(ConsentLocation_tbl), name='get')
 class ConsentLocationView(View):
     def get(self, request, consent_id=None):
         if consent_id:
@@ -188,8 +213,7 @@ class ConsentLocationView(View):
             }
             return JsonResponse(data)
         else:
-            consents = ConsentLocation_tbl.objects.all().values()
-            return JsonResponse(list(consents), safe=False)
+            return paginated_response(request, ConsentLocation_tbl.objects.values())
 
     def post(self, request):
         try:
@@ -245,6 +269,9 @@ class ConsentLocationView(View):
 #################################################################################
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(FarmerIdentification_Info_OnVisit_tbl)
 def farmer_identification_view(request, pk=None):
     if request.method == "GET":
         if pk:
@@ -262,8 +289,7 @@ def farmer_identification_view(request, pk=None):
             }
             return JsonResponse(data, status=200)
         else:
-            farmers = FarmerIdentification_Info_OnVisit_tbl.objects.all().values()
-            return JsonResponse(list(farmers), safe=False, status=200)
+            return paginated_response(request, FarmerIdentification_Info_OnVisit_tbl.objects.values())
 
     elif request.method == "POST":
         try:
@@ -319,13 +345,16 @@ def farmer_identification_view(request, pk=None):
 
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(FarmerIdentification_OwnerIdentificationTbl)
 def owner_identification_view(request, pk=None):
     if request.method == "GET":
         if pk:
             owner_identification = get_object_or_404(FarmerIdentification_OwnerIdentificationTbl, pk=pk)
             data = {
                 "id": owner_identification.id,
-                "owner_identification": owner_identification.owner_identification.id if owner_identification.owner_identification else None,
+                "owner_identification": owner_identification.owner_identification_id,
                 "name_owner": owner_identification.name_owner,
                 "first_name_owner": owner_identification.first_name_owner,
                 "nationality_owner": owner_identification.nationality_owner,
@@ -335,8 +364,7 @@ def owner_identification_view(request, pk=None):
             }
             return JsonResponse(data, status=200)
         else:
-            owners = FarmerIdentification_OwnerIdentificationTbl.objects.all().values()
-            return JsonResponse(list(owners), safe=False, status=200)
+            return paginated_response(request, FarmerIdentification_OwnerIdentificationTbl.objects.values())
 
     elif request.method == "POST":
         try:
@@ -393,13 +421,16 @@ def owner_identification_view(request, pk=None):
 ##################################################################################
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(WorkersInTheFarmTbl)
 def workers_in_farm_view(request, pk=None):
     if request.method == "GET":
         if pk:
             worker = get_object_or_404(WorkersInTheFarmTbl, pk=pk)
             data = {
                 "id": worker.id,
-                "workers_in_farm": worker.workers_in_farm.id if worker.workers_in_farm else None,
+                "workers_in_farm": worker.workers_in_farm_id,
                 "recruited_workers": worker.recruited_workers,
                 "worker_recruitment_type": worker.worker_recruitment_type,
                 "worker_agreement_type": worker.worker_agreement_type,
@@ -423,8 +454,7 @@ def workers_in_farm_view(request, pk=None):
             }
             return JsonResponse(data, status=200)
         else:
-            workers = WorkersInTheFarmTbl.objects.all().values()
-            return JsonResponse(list(workers), safe=False, status=200)
+            return paginated_response(request, WorkersInTheFarmTbl.objects.values())
 
     elif request.method == "POST":
         try:
@@ -493,6 +523,9 @@ def workers_in_farm_view(request, pk=None):
 #########################################################################################
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(AdultInHouseholdTbl)
 def adult_in_household_view(request, id=None):
     if request.method == 'GET':
         if id:
@@ -500,14 +533,14 @@ def adult_in_household_view(request, id=None):
             adult = get_object_or_404(AdultInHouseholdTbl, id=id)
             data = {
                 'id': adult.id,
-                'consent_id': adult.consent.id if adult.consent else None,
+                'consent_id': adult.consent_id,
                 'total_adults': adult.total_adults,
             }
+            return JsonResponse({'data': data}, status=200)
         else:
-            # Retrieve all records
-            adults = AdultInHouseholdTbl.objects.all().values('id', 'consent_id', 'total_adults')
-            data = list(adults)
-        return JsonResponse({'data': data}, status=200)
+            # Retrieve one page of records
+            adults = AdultInHouseholdTbl.objects.values('id', 'consent_id', 'total_adults')
+            return paginated_response(request, adults)
 
     elif request.method == 'POST':
         try:
@@ -565,6 +598,9 @@ def adult_in_household_view(request, id=None):
 
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(AdultHouseholdMember)
 def adult_household_member_view(request, id=None):
     if request.method == 'GET':
         if id:
@@ -572,7 +608,7 @@ def adult_household_member_view(request, id=None):
             member = get_object_or_404(AdultHouseholdMember, id=id)
             data = {
                 'id': member.id,
-                'household_id': member.household.id,
+                'household_id': member.household_id,
                 'full_name': member.full_name,
                 'relationship': member.relationship,
                 'relationship_other': member.relationship_other,
@@ -585,15 +621,15 @@ def adult_household_member_view(request, id=None):
                 'main_work': member.main_work,
                 'main_work_other': member.main_work_other,
             }
+            return JsonResponse({'data': data}, status=200)
         else:
-            # Retrieve all records
-            members = AdultHouseholdMember.objects.all().values(
+            # Retrieve one page of records
+            members = AdultHouseholdMember.objects.values(
                 'id', 'household_id', 'full_name', 'relationship', 'relationship_other',
                 'gender', 'nationality', 'country_origin', 'country_origin_other',
                 'year_birth', 'birth_certificate', 'main_work', 'main_work_other'
             )
-            data = list(members)
-        return JsonResponse({'data': data}, status=200)
+            return paginated_response(request, members)
 
     elif request.method == 'POST':
         try:
@@ -710,6 +746,9 @@ def adult_household_member_view(request, id=None):
 #################################################################################
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(ChildrenInHouseholdTbl)
 def children_in_household_view(request, id=None):
     if request.method == 'GET':
         if id:
@@ -717,17 +756,17 @@ def children_in_household_view(request, id=None):
             child_household = get_object_or_404(ChildrenInHouseholdTbl, id=id)
             data = {
                 'id': child_household.id,
-                'consent_id': child_household.consent.id if child_household.consent else None,
+                'consent_id': child_household.consent_id,
                 'children_present': child_household.children_present,
                 'num_children_5_to_17': child_household.num_children_5_to_17,
             }
+            return JsonResponse({'data': data}, status=200)
         else:
-            # Retrieve all records
-            child_households = ChildrenInHouseholdTbl.objects.all().values(
+            # Retrieve one page of records
+            child_households = ChildrenInHouseholdTbl.objects.values(
                 'id', 'consent_id', 'children_present', 'num_children_5_to_17'
             )
-            data = list(child_households)
-        return JsonResponse({'data': data}, status=200)
+            return paginated_response(request, child_households)
 
     elif request.method == 'POST':
         try:
@@ -798,6 +837,9 @@ def children_in_household_view(request, id=None):
 
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(ChildInHouseholdTbl)
 def child_in_household_view(request, id=None):
     if request.method == 'GET':
         if id:
@@ -805,7 +847,7 @@ def child_in_household_view(request, id=None):
             child = get_object_or_404(ChildInHouseholdTbl, id=id)
             data = {
                 'id': child.id,
-                'household_id': child.household.id,
+                'household_id': child.household_id,
                 'child_declared_in_cover': child.child_declared_in_cover,
                 'child_identifier': child.child_identifier,
                 'child_can_be_surveyed': child.child_can_be_surveyed,
@@ -820,17 +862,19 @@ def child_in_household_view(request, id=None):
                 'child_birth_certificate': child.child_birth_certificate,
                 'child_birth_certificate_reason': child.child_birth_certificate_reason,
             }
+            return JsonResponse({'data': data}, status=200)
         else:
-            # Retrieve all records
-            children = ChildInHouseholdTbl.objects.all().values(
+            # Retrieve one page of records
+            children = ChildInHouseholdTbl.objects.values(
                 'id', 'household_id', 'child_declared_in_cover', 'child_identifier',
                 'child_can_be_surveyed', 'child_unavailability_reason', 'child_not_avail',
                 'who_answers_child_unavailable', 'who_answers_child_unavailable_other',
                 'child_first_name', 'child_surname', 'child_gender', 'child_year_birth',
                 'child_birth_certificate', 'child_birth_certificate_reason'
             )
-            data = list(children)
-        return JsonResponse({'data': data}, status=200)
+            if request.GET.get('stream'):
+                return streaming_response(request, children)
+            return paginated_response(request, children)
 
     elif request.method == 'POST':
         try:
@@ -943,6 +987,9 @@ def child_in_household_view(request, id=None):
 ############################################
 
 @csrf_exempt
+@reads_from_replica
+@idempotent
+@conditional_get(ChildHouseholdDetailsTbl)
 def child_household_details(request, id=None):
     if request.method == "POST":
         try:
@@ -994,8 +1041,7 @@ def child_household_details(request, id=None):
             return JsonResponse(data, status=200)
         
         else:
-            children = ChildHouseholdDetailsTbl.objects.all().values()
-            return JsonResponse(list(children), safe=False, status=200)
+            return paginated_response(request, ChildHouseholdDetailsTbl.objects.values())
     
     elif request.method == "PUT":
         child = get_object_or_404(ChildHouseholdDetailsTbl, id=id)
@@ -1021,17 +1067,20 @@ def child_household_details(request, id=None):
 ############################################
 
 
+@method_decorator(reads_from_replica, name='dispatch')
+@method_decorator(idempotent, name='post')
+@method_decorator(conditional_get(ChildEducationDetailsTbl), name='get')
 class ChildEducationDetailsView(View):
     def get(self, request, *args, **kwargs):
-        """Retrieve all records or a specific record if an ID is provided."""
+        """Retrieve one page of records or a specific record if an ID is provided."""
         child_id = kwargs.get('id')
         if child_id:
             child = get_object_or_404(ChildEducationDetailsTbl, id=child_id)
             return JsonResponse(self.serialize_child(child), safe=False)
         
-        children = ChildEducationDetailsTbl.objects.all()
-        children_data = [self.serialize_child(child) for child in children]
-        return JsonResponse(children_data, safe=False)
+        if request.GET.get('stream'):
+            return streaming_response(request, ChildEducationDetailsTbl.objects.all(), self.serialize_child)
+        return paginated_response(request, ChildEducationDetailsTbl.objects.all(), self.serialize_child)
 
     @csrf_exempt
     def post(self, request, *args, **kwargs):
@@ -1075,6 +1124,7 @@ class ChildEducationDetailsView(View):
         """Helper function to serialize the child object."""
         return {
             'id': child.id,
+            'child_id': child.child_id,
             'child_father_location': child.child_father_location,
             'child_father_country': child.child_father_country,
             'child_father_country_other': child.child_father_country_other,
@@ -1141,6 +1191,7 @@ class ChildEducationDetailsView(View):
             'help_child_health': child.help_child_health,
             'help_child_health_other': child.help_child_health_other,
             'child_photo': child.child_photo.url if child.child_photo else None,  # Handle image field properly
+            'child_photo_thumbnail': media.thumbnail_url(child.child_photo),
         }
 
 ####################################################################################################
@@ -1148,6 +1199,9 @@ class ChildEducationDetailsView(View):
 ####################################################################################################
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(reads_from_replica, name='dispatch')
+@method_decorator(idempotent, name='post')
+@method_decorator(conditional_get(ChildRemediationTbl), name='get')
 class ChildRemediationView(View):
     
     def get(self, request, remediation_id=None):
@@ -1155,7 +1209,7 @@ class ChildRemediationView(View):
             remediation = get_object_or_404(ChildRemediationTbl, id=remediation_id)
             data = {
                 "id": remediation.id,
-                "consent": remediation.consent.id if remediation.consent else None,
+                "consent": remediation.consent_id,
                 "school_fees_owed": remediation.school_fees_owed,
                 "parent_remediation": remediation.parent_remediation,
                 "parent_remediation_other": remediation.parent_remediation_other,
@@ -1164,8 +1218,7 @@ class ChildRemediationView(View):
             }
             return JsonResponse(data, status=200)
         
-        all_remediations = ChildRemediationTbl.objects.all().values()
-        return JsonResponse(list(all_remediations), safe=False, status=200)
+        return paginated_response(request, ChildRemediationTbl.objects.values())
     
     def post(self, request):
         try:
@@ -1207,13 +1260,16 @@ class ChildRemediationView(View):
 # Household Sensitization Assessment
 ####################################################################################################
 
+@method_decorator(reads_from_replica, name='dispatch')
+@method_decorator(idempotent, name='post')
+@method_decorator(conditional_get(HouseholdSensitizationTbl), name='get')
 class HouseholdSensitizationView(View):
     def get(self, request, sensitization_id=None):
         if sensitization_id:
             sensitization = get_object_or_404(HouseholdSensitizationTbl, pk=sensitization_id)
             data = {
                 "id": sensitization.id,
-                "consent": sensitization.consent.id if sensitization.consent else None,
+                "consent": sensitization.consent_id,
                 "sensitized_good_parenting": sensitization.sensitized_good_parenting,
                 "sensitized_child_protection": sensitization.sensitized_child_protection,
                 "sensitized_safe_labour": sensitization.sensitized_safe_labour,
@@ -1221,12 +1277,12 @@ class HouseholdSensitizationView(View):
                 "number_of_male_adults": sensitization.number_of_male_adults,
                 "picture_of_respondent": sensitization.picture_of_respondent,
                 "picture_sensitization": sensitization.picture_sensitization.url if sensitization.picture_sensitization else None,
+                "picture_sensitization_thumbnail": media.thumbnail_url(sensitization.picture_sensitization),
                 "feedback_observations": sensitization.feedback_observations,
             }
             return JsonResponse(data, status=200)
         
-        sensitizations = HouseholdSensitizationTbl.objects.all().values()
-        return JsonResponse(list(sensitizations), safe=False, status=200)
+        return paginated_response(request, HouseholdSensitizationTbl.objects.values())
 
     def post(self, request):
         try:
@@ -1272,6 +1328,9 @@ class HouseholdSensitizationView(View):
 ####################################################################################################
 
 @method_decorator(csrf_exempt, name='dispatch')
+@method_decorator(reads_from_replica, name='dispatch')
+@method_decorator(idempotent, name='post')
+@method_decorator(conditional_get(EndOfCollection), name='get')
 class EndOfCollectionView(View):
     
     def get(self, request, id=None):
@@ -1279,17 +1338,17 @@ class EndOfCollectionView(View):
             record = get_object_or_404(EndOfCollection, id=id)
             data = {
                 'id': record.id,
-                'sensitization': record.sensitization.id if record.sensitization else None,
+                'sensitization': record.sensitization_id,
                 'feedback_enum': record.feedback_enum,
                 'picture_of_respondent': record.picture_of_respondent.url if record.picture_of_respondent else None,
+                'picture_of_respondent_thumbnail': media.thumbnail_url(record.picture_of_respondent),
                 'signature_producer': record.signature_producer.url if record.signature_producer else None,
                 'end_gps': record.end_gps,
                 'end_time': record.end_time,
             }
             return JsonResponse(data, status=200)
         else:
-            records = EndOfCollection.objects.all().values()
-            return JsonResponse(list(records), safe=False, status=200)
+            return paginated_response(request, EndOfCollection.objects.values())
     
     def post(self, request):
         data = request.POST
@@ -1319,11 +1378,269 @@ class EndOfCollectionView(View):
     
     def delete(self, request, id):
         record = get_object_or_404(EndOfCollection, id=id)
-        
-        if record.picture_of_respondent:
-            default_storage.delete(record.picture_of_respondent.path)
-        if record.signature_producer:
-            default_storage.delete(record.signature_producer.path)
-        
         record.delete()
         return JsonResponse({'message': 'Record deleted'}, status=204)
+
+
+####################################################################################################
+# Full Interview
+####################################################################################################
+
+@csrf_exempt
+@require_POST
+@reads_from_replica
+@idempotent
+def interview_submit_view(request):
+    """Creates a whole household interview (cover and every nested section) in one transaction."""
+    try:
+        data = json.loads(request.body)
+        cover, ids = submit_interview(data)
+        return JsonResponse({"message": "Interview submitted", "id": cover.id, "ids": ids}, status=201)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+    except SubmissionError as e:
+        return JsonResponse({"error": e.errors}, status=400)
+    except ValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except IntegrityError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@require_GET
+@reads_from_replica
+def interview_detail_view(request, cover_id):
+    """Returns the whole household interview for one cover as a nested tree."""
+    try:
+        return JsonResponse({"data": get_interview(cover_id)}, status=200)
+    except Cover_tbl.DoesNotExist:
+        return JsonResponse({"error": "Interview not found"}, status=404)
+
+
+####################################################################################################
+# Bulk Roster Writes
+####################################################################################################
+
+@csrf_exempt
+@reads_from_replica
+@idempotent
+def bulk_view(request, table):
+    """POST creates, PUT updates and DELETE removes many rows of one table from a JSON array."""
+    model = get_table(table)
+    if model is None:
+        return JsonResponse({"error": f"Unknown table: {table}"}, status=404)
+    if request.method not in ("POST", "PUT", "DELETE"):
+        return JsonResponse({"error": "Method not allowed"}, status=405)
+
+    try:
+        data = json.loads(request.body)
+        if request.method == "POST":
+            ids = bulk_create_rows(model, data)
+            return JsonResponse({"message": f"{len(ids)} rows created", "ids": ids}, status=201)
+        elif request.method == "PUT":
+            updated = bulk_update_rows(model, data)
+            return JsonResponse({"message": f"{updated} rows updated"}, status=200)
+        else:
+            deleted, missing = bulk_delete_rows(model, data)
+            return JsonResponse({"message": f"{len(deleted)} rows deleted", "deleted": deleted, "missing": missing}, status=200)
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+    except SubmissionError as e:
+        return JsonResponse({"error": e.errors}, status=400)
+    except ValidationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    except IntegrityError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+####################################################################################################
+# Resumable Uploads
+####################################################################################################
+
+def _upload_response(session, status=200):
+    response = JsonResponse(
+        {"id": str(session.pk), "offset": session.offset, "length": session.length, "complete": session.completed_at is not None},
+        status=status,
+    )
+    response[uploads.OFFSET_HEADER] = str(session.offset)
+    response[uploads.LENGTH_HEADER] = str(session.length)
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@csrf_exempt
+@require_POST
+@idempotent
+def upload_create_view(request):
+    """Opens a resumable upload for one image column of one row."""
+    try:
+        session = uploads.start(json.loads(request.body))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({"error": str(e)}, status=e.status)
+    response = _upload_response(session, status=201)
+    response["Location"] = reverse("upload-detail", args=[session.pk])
+    return response
+
+
+@csrf_exempt
+def upload_view(request, upload_id):
+    """HEAD/GET report the offset received so far, PATCH appends a chunk, DELETE abandons the upload."""
+    if request.method == "PATCH":
+        try:
+            offset = int(request.headers[uploads.OFFSET_HEADER])
+            content_length = int(request.headers.get("Content-Length") or 0)
+        except (KeyError, ValueError):
+            return JsonResponse({"error": f"{uploads.OFFSET_HEADER} and Content-Length headers are required"}, status=400)
+        try:
+            session = uploads.append(upload_id, offset, request, content_length)
+        except uploads.UploadError as e:
+            return JsonResponse({"error": str(e)}, status=e.status)
+        return _upload_response(session)
+
+    session = get_object_or_404(UploadSession, pk=upload_id)
+    if request.method in ("GET", "HEAD"):
+        return _upload_response(session)
+    if request.method == "DELETE":
+        uploads.cancel(session)
+        return JsonResponse({"message": "Upload cancelled"}, status=200)
+    return JsonResponse({"error": "Method not allowed"}, status=405)
+
+
+####################################################################################################
+# Offline Sync
+####################################################################################################
+
+@require_GET
+def sync_pull_view(request):
+    """Returns every row changed since ?since=<token>, optionally limited to ?tables=a,b."""
+    tables = request.GET.get("tables")
+    slugs = [slug for slug in tables.split(",") if slug] if tables else list(PORTAL_TABLES)
+    unknown = [slug for slug in slugs if slug not in PORTAL_TABLES]
+    if unknown:
+        return JsonResponse({"error": f"Unknown tables: {', '.join(unknown)}"}, status=400)
+    try:
+        return JsonResponse(pull(request.GET.get("since"), slugs), status=200)
+    except InvalidSyncToken as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+@csrf_exempt
+@require_POST
+@reads_from_replica
+def sync_push_view(request):
+    """Upserts {"changes": {table: [rows]}} by client_uuid; safe to retry."""
+    try:
+        data = json.loads(request.body)
+        ids = push(data.get("changes") or {})
+        return JsonResponse({"message": "Changes applied", "ids": ids}, status=200)
+    except (json.JSONDecodeError, AttributeError):
+        return JsonResponse({"error": "Invalid JSON data"}, status=400)
+    except SubmissionError as e:
+        return JsonResponse({"error": e.errors}, status=400)
+    except IntegrityError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+
+####################################################################################################
+# Reporting
+####################################################################################################
+
+@require_GET
+@reads_from_replica
+def child_labour_facts_view(request):
+    """Lists ChildLabourFact rows: one per child, with the interview keys and labour indicators."""
+    queryset = ChildLabourFact.objects.values()
+    if request.GET.get("stream"):
+        return streaming_response(request, queryset)
+    return paginated_response(request, queryset)
+
+
+@require_GET
+@reads_from_replica
+def stats_view(request):
+    """
+    Dashboard counts per region, district and enumerator, read from the
+    DashboardCounter rollups. Filter with ``?region=``, ``?district=`` and
+    ``?enumerator_code=``; ``?group_by=region,district`` sums over the rest.
+    """
+    params = request.GET.copy()
+    group_by = params.pop("group_by", [",".join(counters.GROUP_FIELDS)])[-1].split(",")
+    unknown = (set(params) | set(group_by)) - set(counters.GROUP_FIELDS)
+    if unknown:
+        return JsonResponse({"error": f"Unknown parameter or group: {', '.join(sorted(unknown))}"}, status=400)
+    filters = {name: params[name] for name in params}
+    return JsonResponse({"data": counters.stats(filters, group_by)}, status=200)
+
+
+####################################################################################################
+# Analyst Exports
+####################################################################################################
+
+def _export_allowed(request):
+    """Staff users, or scripts sending ``Authorization: Bearer <EXPORT_API_TOKEN>``."""
+    token = getattr(settings, "EXPORT_API_TOKEN", None)
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if token and scheme.lower() == "bearer" and constant_time_compare(credentials.strip(), token):
+        return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+@require_GET
+@reads_from_replica
+def export_view(request, source):
+    """Streams a table, or the per-child sheet, as Parquet (default) or ``?format=csv`` (gzip)."""
+    if not _export_allowed(request):
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    try:
+        queryset, columns = export.get_source(source)
+    except export.ExportError as e:
+        return JsonResponse({"error": str(e)}, status=404)
+    fmt = request.GET.get("format", "parquet")
+    try:
+        queryset = filter_queryset(request, queryset)
+        # The rows are read after the view returns, so pick the database now.
+        chunks = export.iter_export(queryset.using(queryset.db), columns, fmt)
+    except (export.ExportError, InvalidQuery) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    content_type, extension = export.FORMATS[fmt]
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{source}{extension}"'
+    return response
+
+
+####################################################################################################
+# Background Jobs
+####################################################################################################
+
+@require_GET
+def job_view(request, job_id=None):
+    """
+    Status of one background job, or a page of jobs (filter with e.g. ?status=failed).
+    Staff see every job; other users only the jobs their own requests queued.
+    """
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    queryset = BackgroundJob.objects.all()
+    if not request.user.is_staff:
+        queryset = queryset.filter(requested_by=request.user)
+    queryset = queryset.values(
+        "id", "name", "status", "attempts", "max_attempts", "run_after", "last_error", "created_at", "finished_at"
+    )
+    if job_id:
+        return JsonResponse(get_object_or_404(queryset, pk=job_id), status=200)
+    return paginated_response(request, queryset)
+
+
+####################################################################################################
+# Database Connections
+####################################################################################################
+
+@require_GET
+def db_pool_view(request):
+    """Connection pool (or persistent connection) stats for the worker that serves the request. Staff only."""
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "Authentication required"}, status=401)
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Staff access required"}, status=403)
+    return JsonResponse(connection_stats(), status=200)